@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for batched scenario classification
+
+Compares HybridClassifier.classify one text at a time (one model.encode
+call per dialog) against classify_batch (length-sorted batches), checks
+that both pick the same scenarios, and reports dialogs/sec for each.
+Requires sentence-transformers unless --no-semantic is given.
+
+Usage:
+    python benchmarks/bench_classify.py data/processed/unique_dialogs.jsonl
+    python benchmarks/bench_classify.py dialogs.jsonl --limit 100000 --batch-size 128
+"""
+
+import argparse
+import logging
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from dialog_io import iter_dialogs
+from scenario_classifier import HybridClassifier
+
+CONFIG_PATH = str(Path(__file__).parent.parent / "config" / "settings.yaml")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched classification")
+    parser.add_argument("dialogs_file", type=str, help="jsonl/json dialogs to classify")
+    parser.add_argument("--limit", type=int, default=10000, help="Dialogs to classify")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Texts per encode call (default: from config)")
+    parser.add_argument("--no-semantic", action="store_true",
+                        help="Keyword classification only")
+    parser.add_argument("--config", type=str, default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    texts = [d['text'] for d in islice(iter_dialogs(args.dialogs_file), args.limit)]
+    # Without the embedding cache, or the batched pass would only read what
+    # the per-text pass cached
+    classifier = HybridClassifier(args.config, use_semantic=not args.no_semantic,
+                                  embedding_cache=False)
+
+    start = time.perf_counter()
+    single = [classifier.classify(text) for text in texts]
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = classifier.classify_batch(texts, show_progress=False, batch_size=args.batch_size)
+    after = time.perf_counter() - start
+
+    # Batched inference pads differently, so embeddings may differ in the last bits
+    agree = sum(a.scenario == b.scenario for a, b in zip(single, batched))
+
+    print(f"Dialogs:   {len(texts)} (semantic: {classifier.use_semantic})")
+    print(f"Per text:  {len(texts) / before:,.0f} dialogs/sec")
+    print(f"Batched:   {len(texts) / after:,.0f} dialogs/sec "
+          f"(batch size {args.batch_size or classifier.batch_size})")
+    print(f"Speedup:   {before / after:.2f}x")
+    print(f"Agreement: {agree / max(1, len(texts)):.2%} same scenario")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for SubtitleParser.clean_text
+
+Compares the compiled cleaning engine against the original per-call
+re.sub loop, checks that both produce identical output, and reports
+lines/sec for each.
+
+Usage:
+    python benchmarks/bench_clean_text.py
+    python benchmarks/bench_clean_text.py --srt-dir data/raw --repeat 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from dialog_extractor import SubtitleParser
+
+
+# Representative subtitle lines: mostly plain dialog, some markup
+SAMPLE_LINES = [
+    "¿Qué haces aquí?",
+    "No lo sé, la verdad.",
+    "Vamos a cenar esta noche, ¿te apetece?",
+    "- ¿Quedamos mañana?\n- Sí, claro.",
+    "<i>Buenos días, ¿qué tal?</i>",
+    "{\\an8}Mi madre está en casa.",
+    "[MÚSICA] Ostras, qué frío hace.",
+    "(SUSPIRA) Lo siento mucho...",
+    "♪ Y la noche es nuestra ♪",
+    "Pues no sé qué decirte!!!",
+    "Subtítulos por http://example.com",
+    "## Te quiero, nena.",
+    "42",
+    "Apa, vamos, que llegamos tarde.",
+]
+
+
+def legacy_clean_text(text: str) -> str:
+    """The original clean_text: nine uncompiled re.sub passes per line."""
+    cleaned = text
+
+    for pattern in SubtitleParser.CLEANING_PATTERNS:
+        cleaned = re.sub(pattern, '', cleaned, flags=re.MULTILINE | re.IGNORECASE)
+
+    cleaned = re.sub(r'\s+', ' ', cleaned)
+    cleaned = cleaned.strip()
+    cleaned = re.sub(r'([.!?])\1+', r'\1', cleaned)
+
+    return cleaned
+
+
+def load_lines(srt_dir: str, num_lines: int, seed: int) -> List[str]:
+    """Load subtitle contents from SRT files, or sample the built-in lines."""
+    if srt_dir:
+        parser = SubtitleParser()
+        lines = []
+        for srt_file in sorted(Path(srt_dir).glob("*.srt")):
+            lines.extend(sub.content for sub in parser.parse_srt_file(str(srt_file)))
+            if len(lines) >= num_lines:
+                break
+        return lines[:num_lines]
+
+    rng = random.Random(seed)
+    return [rng.choice(SAMPLE_LINES) for _ in range(num_lines)]
+
+
+def time_lines_per_sec(fn, lines: List[str], repeat: int) -> float:
+    """Best-of-N throughput of fn over all lines."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SubtitleParser.clean_text")
+    parser.add_argument("--srt-dir", type=str, default=None,
+                        help="Take lines from SRT files in this directory")
+    parser.add_argument("--num-lines", type=int, default=100_000,
+                        help="Number of lines to clean per run")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per implementation (best is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lines = load_lines(args.srt_dir, args.num_lines, args.seed)
+    if not lines:
+        print("No lines to benchmark")
+        return
+
+    subtitle_parser = SubtitleParser()
+
+    mismatches = [
+        line for line in lines
+        if legacy_clean_text(line) != subtitle_parser.clean_text(line)
+    ]
+    if mismatches:
+        print(f"Output differs on {len(mismatches)} lines, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+
+    before = time_lines_per_sec(legacy_clean_text, lines, args.repeat)
+    after = time_lines_per_sec(subtitle_parser.clean_text, lines, args.repeat)
+
+    print(f"Lines:   {len(lines)} (outputs identical)")
+    print(f"Before:  {before:,.0f} lines/sec")
+    print(f"After:   {after:,.0f} lines/sec")
+    print(f"Speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
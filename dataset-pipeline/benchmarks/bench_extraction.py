@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark suite
+
+Runs each extraction stage over an SRT corpus (by default a seeded
+synthetic one from synthetic_corpus.py) and reports files/sec, cues/sec
+and peak RSS per stage, plus a per-function profile of serial extraction.
+Each stage runs in a fresh process so its peak RSS is its own.
+
+Results are saved as JSON; pass an earlier result with --compare to see
+the change in throughput and memory between versions.
+
+Stages:
+    scan           read_srt_file + scan_srt_file (mmap, encoding, block scan)
+    extract        extract_to_store (scan, clean and filter lines)
+    markers        CatalanMarkerDetector.detect_markers over extracted dialogs
+    batch          batch_extract_dialogs, serial
+    batch_workers  batch_extract_dialogs with --workers processes
+
+Usage:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --files 50 --cues 3000 --workers 8
+    python benchmarks/bench_extraction.py --srt-dir data/raw
+    python benchmarks/bench_extraction.py --compare benchmarks/results/extraction_old.json
+"""
+
+import argparse
+import cProfile
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import pstats
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCH_DIR = Path(__file__).parent
+PIPELINE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(PIPELINE_DIR / "src"))
+sys.path.insert(0, str(BENCH_DIR))
+
+from synthetic_corpus import generate_corpus
+
+CONFIG_PATH = str(PIPELINE_DIR / "config" / "settings.yaml")
+STAGES = ["scan", "extract", "markers", "batch", "batch_workers"]
+
+# Slowdown (fraction) reported as a regression by --compare
+DEFAULT_TOLERANCE = 0.10
+
+
+def _peak_rss_mb(who: int) -> float:
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _quiet():
+    # The pipeline modules log every file at INFO
+    logging.disable(logging.INFO)
+
+
+def _scan(paths: List[str], config_path: str) -> Dict:
+    from dialog_extractor import SubtitleParser
+
+    parser = SubtitleParser(config_path)
+    cues = 0
+    for path in paths:
+        source = parser.read_srt_file(path)
+        try:
+            cues += len(parser.scan_srt_file(path, source))
+        finally:
+            source.close()
+    return {"cues": cues}
+
+
+def _extract(paths: List[str], config_path: str) -> Dict:
+    from dialog_extractor import SubtitleParser
+    from dialog_store import DialogStore
+
+    parser = SubtitleParser(config_path)
+    store = DialogStore()
+    for path in paths:
+        parser.extract_to_store(path, store)
+    return {"dialogs": len(store)}
+
+
+def _markers(paths: List[str], config_path: str) -> Dict:
+    from dialog_extractor import CatalanMarkerDetector, SubtitleParser
+    from dialog_store import DialogStore
+
+    parser = SubtitleParser(config_path)
+    store = DialogStore()
+    for path in paths:
+        parser.extract_to_store(path, store)
+    texts = [store.text(i) for i in range(len(store))]
+
+    detector = CatalanMarkerDetector(config_path)
+    start = time.perf_counter()
+    tagged = sum(1 for text in texts if detector.detect_markers(text))
+    # Only detection is timed; extraction above is setup
+    return {"dialogs": len(texts), "tagged": tagged, "seconds": time.perf_counter() - start}
+
+
+def _batch(srt_dir: str, config_path: str, workers: int) -> Dict:
+    from dialog_extractor import batch_extract_dialogs
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        count = batch_extract_dialogs(
+            srt_dir, str(Path(tmp_dir) / "dialogs.jsonl"), config_path, workers=workers
+        )
+    return {"dialogs": count}
+
+
+def run_stage(stage: str, paths: List[str], srt_dir: str, config_path: str,
+              workers: int) -> Dict:
+    """Run one stage (in a fresh process) and measure it."""
+    _quiet()
+    start = time.perf_counter()
+    if stage == "scan":
+        result = _scan(paths, config_path)
+    elif stage == "extract":
+        result = _extract(paths, config_path)
+    elif stage == "markers":
+        result = _markers(paths, config_path)
+    elif stage == "batch":
+        result = _batch(srt_dir, config_path, 1)
+    else:
+        result = _batch(srt_dir, config_path, workers)
+    elapsed = result.pop("seconds", time.perf_counter() - start)
+
+    result["seconds"] = elapsed
+    result["peak_rss_mb"] = round(_peak_rss_mb(resource.RUSAGE_SELF), 1)
+    if stage == "batch_workers":
+        result["workers"] = workers
+        result["worker_peak_rss_mb"] = round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    return result
+
+
+def profile_extraction(paths: List[str], config_path: str, top: int) -> List[Dict]:
+    """Per-function time of serial extraction (scan, clean, merge, markers)."""
+    _quiet()
+    from dialog_extractor import CatalanMarkerDetector, SubtitleParser, _extract_file
+
+    parser = SubtitleParser(config_path)
+    detector = CatalanMarkerDetector(config_path)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for path in paths:
+        _extract_file(parser, detector, path)
+    profiler.disable()
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if filename.startswith(str(PIPELINE_DIR)):
+            filename = os.path.relpath(filename, PIPELINE_DIR)
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4),
+        })
+    rows.sort(key=lambda row: -row["tottime"])
+    return rows[:top]
+
+
+def _in_fresh_process(fn, *args):
+    """Call fn(*args) in a new interpreter so peak RSS is not shared."""
+    # Executor workers (unlike multiprocessing.Pool's) may start their own pool
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def _count_cues(paths: List[str]) -> int:
+    from srt_scanner import SrtBuffer
+
+    cues = 0
+    for path in paths:
+        with SrtBuffer.open(path) as subtitles:
+            cues += sum(1 for _ in subtitles.records(strict=False))
+    return cues
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PIPELINE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results: Dict, baseline: Dict, tolerance: float) -> int:
+    """Print per-stage changes against a baseline; returns the number of regressions."""
+    regressions = 0
+    print(f"\nCompared to {baseline.get('revision') or 'baseline'} ({baseline.get('timestamp')}):")
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        speed = current["cues_per_sec"] / previous["cues_per_sec"]
+        memory = current["peak_rss_mb"] - previous["peak_rss_mb"]
+        flag = ""
+        if speed < 1 - tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {stage:14} {speed:6.2f}x speed  {memory:+8.1f} MB peak RSS{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dialog extraction")
+    parser.add_argument("--srt-dir", type=str, default=None,
+                        help="Benchmark the SRT files in this directory instead of a synthetic corpus")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic files to generate")
+    parser.add_argument("--cues", type=int, default=2000, help="Average cues per synthetic file")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic corpus seed")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Worker processes for the batch_workers stage")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES),
+                        help="Comma-separated stages to run")
+    parser.add_argument("--profile-top", type=int, default=25,
+                        help="Functions listed in the profile (0 to skip profiling)")
+    parser.add_argument("--config", type=str, default=CONFIG_PATH)
+    parser.add_argument("--output", type=str, default=None,
+                        help="Results JSON (default: benchmarks/results/extraction_<time>.json)")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Slowdown reported as a regression by --compare")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.srt_dir:
+            srt_dir = args.srt_dir
+            paths = sorted(str(f) for f in Path(srt_dir).glob("*.srt"))
+            corpus = {"srt_dir": srt_dir}
+        else:
+            srt_dir = tmp_dir
+            paths = generate_corpus(tmp_dir, args.files, args.cues, args.seed)
+            corpus = {"synthetic": True, "files": args.files, "cues": args.cues, "seed": args.seed}
+
+        if not paths:
+            print("No SRT files to benchmark")
+            return
+
+        num_cues = _count_cues(paths)
+        corpus.update({
+            "num_files": len(paths),
+            "num_cues": num_cues,
+            "megabytes": round(sum(Path(p).stat().st_size for p in paths) / 1e6, 2),
+        })
+        print(f"Corpus: {len(paths)} files, {num_cues:,} cues, {corpus['megabytes']} MB")
+
+        results = {
+            "benchmark": "extraction",
+            "revision": _git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": corpus,
+            "stages": {},
+        }
+
+        for stage in stages:
+            result = _in_fresh_process(
+                run_stage, stage, paths, srt_dir, args.config, args.workers
+            )
+            result["files_per_sec"] = round(len(paths) / result["seconds"], 2)
+            result["cues_per_sec"] = round(num_cues / result["seconds"], 1)
+            if "dialogs" in result:
+                result["dialogs_per_sec"] = round(result["dialogs"] / result["seconds"], 1)
+            result["seconds"] = round(result["seconds"], 4)
+            results["stages"][stage] = result
+            print(f"  {stage:14} {result['seconds']:8.3f}s  {result['files_per_sec']:8.1f} files/sec  "
+                  f"{result['cues_per_sec']:10,.0f} cues/sec  {result['peak_rss_mb']:7.1f} MB peak RSS")
+
+        if args.profile_top > 0:
+            results["profile"] = _in_fresh_process(
+                profile_extraction, paths, args.config, args.profile_top
+            )
+            print("\nTop functions by own time (serial extraction):")
+            for row in results["profile"][:10]:
+                print(f"  {row['tottime']:8.3f}s {row['calls']:9}  {row['function']}")
+
+    output = args.output or str(
+        BENCH_DIR / "results" / f"extraction_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_results(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the SRT scanner
+
+Compares srt.parse (decode the whole file, build srt.Subtitle objects)
+against the memory-mapped SrtBuffer scanner (records with integer
+millisecond times, text decoded per block), checks that both produce the
+same subtitles, and reports subtitles/sec and MB/sec for each.
+
+Usage:
+    python benchmarks/bench_srt_parse.py
+    python benchmarks/bench_srt_parse.py --srt-dir data/raw --repeat 5
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+import srt
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from srt_scanner import SrtBuffer, detect_encoding, format_srt_timestamp
+
+
+SAMPLE_TEXTS = [
+    "¿Qué haces aquí?",
+    "- ¿Quedamos mañana?\n- Sí, claro.",
+    "<i>Buenos días, ¿qué tal?</i>",
+    "Apa, vamos, que llegamos tarde.",
+    "[MÚSICA]",
+]
+
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def write_sample_files(directory: Path, num_files: int, blocks_per_file: int) -> List[str]:
+    """Write synthetic SRT files for when no corpus directory is given."""
+    paths = []
+    for file_number in range(num_files):
+        blocks = []
+        for i in range(blocks_per_file):
+            start = i * 2500
+            blocks.append(
+                f"{i + 1}\n{format_srt_timestamp(start)} --> "
+                f"{format_srt_timestamp(start + 2000)}\n"
+                f"{SAMPLE_TEXTS[(i + file_number) % len(SAMPLE_TEXTS)]}\n"
+            )
+        path = directory / f"sample_{file_number}.srt"
+        path.write_text("\n".join(blocks), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def parse_with_srt(path: str) -> List[Tuple]:
+    """The previous path: read, decode, srt.parse."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    content = raw.decode(detect_encoding(raw))
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return [
+        (sub.index, sub.start // _ONE_MS, sub.end // _ONE_MS, sub.content)
+        for sub in srt.parse(content)
+    ]
+
+
+def parse_with_scanner(path: str) -> List[Tuple]:
+    """mmap + SrtBuffer records, decoding each block's text."""
+    with SrtBuffer.open(path) as subtitles:
+        return [
+            (record.index, record.start_ms, record.end_ms, subtitles.text(record))
+            for record in subtitles
+        ]
+
+
+def time_parse(fn, paths: List[str], repeat: int) -> Tuple[float, int]:
+    """Best-of-N wall time to parse every file, and the subtitle count."""
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(len(fn(path)) for path in paths)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SRT parsing")
+    parser.add_argument("--srt-dir", type=str, default=None,
+                        help="Parse the SRT files in this directory (e.g. data/raw)")
+    parser.add_argument("--num-files", type=int, default=200,
+                        help="Synthetic files to generate when --srt-dir is not given")
+    parser.add_argument("--blocks", type=int, default=1000,
+                        help="Subtitles per synthetic file")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.srt_dir:
+            paths = sorted(str(f) for f in Path(args.srt_dir).glob("*.srt"))
+        else:
+            paths = write_sample_files(Path(tmp_dir), args.num_files, args.blocks)
+
+        if not paths:
+            print("No SRT files to benchmark")
+            return
+
+        # Files srt.parse rejects are skipped by the extractor either way
+        valid_paths = []
+        for path in paths:
+            try:
+                expected = parse_with_srt(path)
+            except srt.SRTParseError:
+                continue
+            if parse_with_scanner(path) != expected:
+                print(f"Output differs on {path}")
+                sys.exit(1)
+            valid_paths.append(path)
+
+        total_mb = sum(Path(p).stat().st_size for p in valid_paths) / 1e6
+        before, count = time_parse(parse_with_srt, valid_paths, args.repeat)
+        after, _ = time_parse(parse_with_scanner, valid_paths, args.repeat)
+
+    print(f"Files:     {len(valid_paths)} ({total_mb:.1f} MB, {count} subtitles, outputs identical)")
+    print(f"srt.parse: {count / before:,.0f} subtitles/sec ({total_mb / before:.1f} MB/sec)")
+    print(f"Scanner:   {count / after:,.0f} subtitles/sec ({total_mb / after:.1f} MB/sec)")
+    print(f"Speedup:   {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
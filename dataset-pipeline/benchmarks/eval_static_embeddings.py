@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Accuracy and speed of static embeddings against the full model
+
+Classifies the ground-truth lines of the model eval set with the
+sentence-transformer (torch backend) and with the distilled static word
+vectors, both against the full model's scenario prototypes, and reports
+each one's accuracy, the accuracy delta, how often the two agree, and
+sentences/sec. The static table is distilled first if needed.
+
+Usage:
+    python benchmarks/eval_static_embeddings.py
+    python benchmarks/eval_static_embeddings.py --eval-file data/eval/model_eval_ground_truth.json --repeat 20
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+PIPELINE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(PIPELINE_DIR / "src"))
+
+from scenario_classifier import SemanticClassifier
+
+
+def time_classify(classifier: SemanticClassifier, texts, repeat: int):
+    """Best-of-N wall time to classify texts (embedding cache off), and the results."""
+    best = float('inf')
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = classifier.classify_batch(texts)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate static embeddings against the full model")
+    parser.add_argument("--eval-file", type=str,
+                        default=str(PIPELINE_DIR / "data" / "eval" / "model_eval_ground_truth.json"))
+    parser.add_argument("--config", type=str, default=str(PIPELINE_DIR / "config" / "settings.yaml"))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per backend (best is reported)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with open(args.config, 'r') as f:
+        classification_config = yaml.safe_load(f).get('classification', {})
+    with open(args.eval_file, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+
+    texts = [item['ground_truth'] for item in items]
+    labels = [item['scenario'] for item in items]
+
+    full = SemanticClassifier(batch_size=classification_config.get('batch_size', 64))
+    static = SemanticClassifier(
+        backend="static",
+        backend_config=classification_config.get('static', {})
+    )
+
+    full_time, full_results = time_classify(full, texts, args.repeat)
+    static_time, static_results = time_classify(static, texts, args.repeat)
+
+    full_accuracy = sum(r.scenario == label for r, label in zip(full_results, labels)) / len(labels)
+    static_accuracy = sum(r.scenario == label for r, label in zip(static_results, labels)) / len(labels)
+    agreement = sum(a.scenario == b.scenario for a, b in zip(full_results, static_results)) / len(labels)
+
+    print(f"Eval set:   {len(texts)} lines ({args.eval_file})")
+    print(f"Full model: {full_accuracy:.1%} accuracy, {len(texts) / full_time:,.0f} sentences/sec")
+    print(f"Static:     {static_accuracy:.1%} accuracy, {len(texts) / static_time:,.0f} sentences/sec")
+    print(f"Delta:      {(static_accuracy - full_accuracy) * 100:+.1f} points accuracy, "
+          f"{full_time / static_time:.0f}x faster")
+    print(f"Agreement:  {agreement:.1%} same scenario as the full model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Seeded generator for synthetic Spanish SRT corpora
+
+Writes subtitle files that look like the ones in data/raw: "Title_Year_ID.srt"
+names, thousands of cues per file, HTML and SSA tags, bracket and
+parenthetical annotations, music notes, speaker dashes, Catalan markers,
+CRLF line endings and a mix of encodings (UTF-8, UTF-8 with BOM, cp1252,
+latin-1, UTF-16). The same seed always produces the same files.
+
+Usage:
+    python benchmarks/synthetic_corpus.py /tmp/corpus --files 50 --cues 2000
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import List
+
+SUBJECTS = ["Mi madre", "Tu hermano", "El nen", "La abuela", "Marc", "Laia", "Jordi", "Mi padre"]
+VERBS = ["está en", "viene de", "se queda en", "trabaja en", "vuelve a", "ha ido a"]
+PLACES = ["casa", "Barcelona", "la playa", "el trabajo", "la escuela", "Girona", "el mercado"]
+
+LINES = [
+    "¿Qué haces aquí?",
+    "No lo sé, la verdad.",
+    "Vamos a cenar esta noche, ¿te apetece?",
+    "¡Hola! ¿Cómo estás, nen?",
+    "Ostras, qué frío hace.",
+    "Apa, vamos, que llegamos tarde.",
+    "Lo siento mucho, de verdad.",
+    "Hasta luego, cuídate mucho.",
+    "Estoy de acuerdo contigo.",
+    "Creo que tienes razón, home.",
+    "Necesito que me ayudes, por favor.",
+    "Te quiero mucho, ¿sabes?",
+    "¿Quedamos mañana por la tarde?",
+    "Pues no sé qué decirte.",
+    "Me hace mucha ilusión verte.",
+    "¿Qué pasa?",
+    "Vale.",
+]
+
+ANNOTATIONS = ["[MÚSICA]", "[RISAS]", "(SUSPIRA)", "(GRITA)", "[APLAUSOS]", "(EN CATALÁN)"]
+SPEAKERS = ["NARRADOR:", "MARC:", "LAIA:"]
+ENCODINGS = ["utf-8", "utf-8-sig", "cp1252", "latin-1", "utf-16"]
+
+
+def _timestamp(ms: int) -> str:
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def random_cue_text(rng: random.Random) -> str:
+    """One cue's text, with the kinds of markup real subtitles carry."""
+    roll = rng.random()
+    if roll < 0.35:
+        text = rng.choice(LINES)
+    elif roll < 0.6:
+        text = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(PLACES)}."
+    elif roll < 0.7:
+        text = f"- {rng.choice(LINES)}\n- {rng.choice(LINES)}"
+    elif roll < 0.77:
+        text = f"<i>{rng.choice(LINES)}</i>"
+    elif roll < 0.82:
+        text = f"{{\\an8}}{rng.choice(LINES)}"
+    elif roll < 0.88:
+        text = f"{rng.choice(ANNOTATIONS)} {rng.choice(LINES)}"
+    elif roll < 0.92:
+        text = f"♪ {rng.choice(LINES)} ♪"
+    elif roll < 0.95:
+        text = rng.choice(ANNOTATIONS)
+    elif roll < 0.97:
+        text = rng.choice(SPEAKERS)
+    elif roll < 0.99:
+        text = f"{rng.choice(LINES)}.. {rng.choice(LINES)}!!"
+    else:
+        text = "Subtítulos por http://www.example.com"
+
+    if rng.random() < 0.2:
+        # Split long cues over two lines
+        words = text.split(' ')
+        if len(words) > 4 and '\n' not in text:
+            middle = len(words) // 2
+            text = ' '.join(words[:middle]) + '\n' + ' '.join(words[middle:])
+
+    return text
+
+
+def generate_srt(rng: random.Random, num_cues: int) -> str:
+    """Text of one SRT file with num_cues cues."""
+    blocks = []
+    time_ms = rng.randint(1000, 60000)
+
+    for index in range(1, num_cues + 1):
+        start = time_ms
+        end = start + rng.randint(700, 5000)
+        time_ms = end + rng.choice([40, 120, 300, 800, 1500, 2500, 6000])
+        blocks.append(
+            f"{index}\n{_timestamp(start)} --> {_timestamp(end)}\n{random_cue_text(rng)}\n"
+        )
+
+    return "\n".join(blocks)
+
+
+def generate_corpus(
+    output_dir: str,
+    num_files: int = 20,
+    cues_per_file: int = 1500,
+    seed: int = 42,
+    encodings: List[str] = ENCODINGS
+) -> List[str]:
+    """
+    Write a synthetic SRT corpus.
+
+    Args:
+        output_dir: Directory for the SRT files (created if needed)
+        num_files: Number of files
+        cues_per_file: Average cues per file (each file varies by +/-25%)
+        seed: Random seed; the same seed gives byte-identical files
+        encodings: Encodings to rotate through
+
+    Returns:
+        Paths of the written files, sorted
+    """
+    rng = random.Random(seed)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for file_number in range(num_files):
+        num_cues = max(1, int(cues_per_file * rng.uniform(0.75, 1.25)))
+        content = generate_srt(rng, num_cues)
+        if rng.random() < 0.3:
+            content = content.replace('\n', '\r\n')
+
+        encoding = encodings[file_number % len(encodings)]
+        title = f"Pelicula Sintetica {file_number}"
+        year = 1990 + file_number % 35
+        path = output_path / f"{title}_{year}_{100000 + file_number}.srt"
+        path.write_bytes(content.encode(encoding, errors='replace'))
+        paths.append(str(path))
+
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Spanish SRT corpus")
+    parser.add_argument("output_dir", type=str)
+    parser.add_argument("--files", type=int, default=20, help="Number of SRT files")
+    parser.add_argument("--cues", type=int, default=1500, help="Average cues per file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output_dir, args.files, args.cues, args.seed)
+    print(f"Wrote {len(paths)} SRT files to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
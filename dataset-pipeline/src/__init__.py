@@ -5,10 +5,17 @@ For building LLM fine-tuning datasets from movie subtitles.
 
 from .subtitle_downloader import OpenSubtitlesClient, OPUSCorpusDownloader
 from .dialog_extractor import SubtitleParser, DialogEntry, batch_extract_dialogs
+from .dialog_io import DialogWriter, iter_dialogs
+from .dialog_store import DialogStore, DialogView
+from .deduplicator import MinHashDeduplicator, deduplicate_dialogs
+from .embedding_cache import EmbeddingCache
+from .knn_index import IVFIndex
+from .classifier_service import ClassifierClient, ClassifierService
 from .scenario_classifier import (
     KeywordClassifier,
     SemanticClassifier,
     HybridClassifier,
+    build_knn_index,
     classify_dialogs
 )
 from .dataset_formatter import DatasetFormatter, EvalSetGenerator, process_dataset
@@ -19,9 +26,20 @@ __all__ = [
     'SubtitleParser',
     'DialogEntry',
     'batch_extract_dialogs',
+    'DialogWriter',
+    'iter_dialogs',
+    'DialogStore',
+    'DialogView',
+    'MinHashDeduplicator',
+    'deduplicate_dialogs',
+    'EmbeddingCache',
+    'IVFIndex',
+    'ClassifierClient',
+    'ClassifierService',
     'KeywordClassifier',
     'SemanticClassifier',
     'HybridClassifier',
+    'build_knn_index',
     'classify_dialogs',
     'DatasetFormatter',
     'EvalSetGenerator',
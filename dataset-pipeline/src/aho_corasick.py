@@ -0,0 +1,132 @@
+"""
+Aho-Corasick Module
+Multi-pattern string matching with word-boundary semantics.
+
+Finds every occurrence of every pattern in a single left-to-right pass over
+the text, so cost is proportional to the text length (plus matches) rather
+than to the number of patterns.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+def is_word_char(char: str) -> bool:
+    """Same definition of a word character as the re module's \\w."""
+    return char.isalnum() or char == '_'
+
+
+def is_word_boundary(text: str, pos: int) -> bool:
+    """True where re's \\b would match at position pos of text."""
+    before = pos > 0 and is_word_char(text[pos - 1])
+    after = pos < len(text) and is_word_char(text[pos])
+    return before != after
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a set of string patterns.
+
+    Patterns are added with add() (or the constructor) and get consecutive
+    integer ids. The automaton is (re)built lazily on the first search after
+    patterns change.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: List[str] = []
+
+        # Trie: goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._terminal: List[List[int]] = [[]]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+        self._built = True
+
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def add(self, pattern: str) -> int:
+        """Add a pattern and return its id."""
+        if not pattern:
+            raise ValueError("Cannot add an empty pattern")
+
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._terminal.append([])
+            state = next_state
+
+        pattern_id = len(self.patterns)
+        self.patterns.append(pattern)
+        self._terminal[state].append(pattern_id)
+        self._built = False
+        return pattern_id
+
+    def build(self):
+        """Compute failure links and merged outputs (breadth-first)."""
+        num_states = len(self._goto)
+        self._fail = [0] * num_states
+        self._outputs = [()] * num_states
+        self._outputs[0] = tuple(self._terminal[0])
+
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._outputs[state] = tuple(self._terminal[state])
+
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+
+                self._outputs[child] = (
+                    tuple(self._terminal[child]) + self._outputs[self._fail[child]]
+                )
+                queue.append(child)
+
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (start, end, pattern_id) for every occurrence, overlaps included.
+
+        Matches are ordered by end position.
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        patterns = self.patterns
+        state = 0
+
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if outputs[state]:
+                end = i + 1
+                for pattern_id in outputs[state]:
+                    yield end - len(patterns[pattern_id]), end, pattern_id
+
+    def iter_word_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Like iter_matches, but only occurrences that re's r'\\b' + pattern +
+        r'\\b' would accept (boundaries checked on both sides).
+        """
+        for start, end, pattern_id in self.iter_matches(text):
+            if is_word_boundary(text, start) and is_word_boundary(text, end):
+                yield start, end, pattern_id
@@ -20,6 +20,11 @@ from dataclasses import dataclass, asdict
 from typing import List, Optional
 import hashlib
 
+try:
+    from .srt_scanner import SrtBuffer, format_srt_timestamp
+except ImportError:
+    from srt_scanner import SrtBuffer, format_srt_timestamp
+
 
 @dataclass
 class SubtitleEntry:
@@ -60,17 +65,6 @@ def check_ffmpeg():
         return False
 
 
-def time_to_seconds(time_str: str) -> float:
-    """Convert SRT timestamp (HH:MM:SS,mmm) to seconds."""
-    # Handle both comma and period as decimal separator
-    time_str = time_str.replace(',', '.')
-    parts = time_str.split(':')
-    hours = int(parts[0])
-    minutes = int(parts[1])
-    seconds = float(parts[2])
-    return hours * 3600 + minutes * 60 + seconds
-
-
 def seconds_to_ffmpeg_time(seconds: float) -> str:
     """Convert seconds to FFmpeg time format (HH:MM:SS.mmm)."""
     hours = int(seconds // 3600)
@@ -83,48 +77,25 @@ def parse_srt(srt_path: str) -> List[SubtitleEntry]:
     """Parse an SRT file and return list of subtitle entries."""
     entries = []
 
-    with open(srt_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-
-    # Split by double newline (subtitle blocks)
-    blocks = re.split(r'\n\s*\n', content.strip())
-
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) < 3:
-            continue
-
-        try:
-            # First line is index
-            index = int(lines[0].strip())
-
-            # Second line is timestamp
-            timestamp_match = re.match(
-                r'(\d{2}:\d{2}:\d{2}[,\.]\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2}[,\.]\d{3})',
-                lines[1].strip()
-            )
-            if not timestamp_match:
+    with SrtBuffer.open(srt_path) as subtitles:
+        # Skip garbled blocks rather than rejecting the whole file
+        for record in subtitles.records(strict=False):
+            if record.index is None:
                 continue
 
-            start_time = timestamp_match.group(1)
-            end_time = timestamp_match.group(2)
-
-            # Remaining lines are text
-            text = ' '.join(lines[2:]).strip()
-            # Remove HTML tags
+            # Text lines joined into one line, without HTML tags
+            text = ' '.join(subtitles.text(record).split('\n')).strip()
             text = re.sub(r'<[^>]+>', '', text)
 
             if text:
                 entries.append(SubtitleEntry(
-                    index=index,
-                    start_time=start_time,
-                    end_time=end_time,
+                    index=record.index,
+                    start_time=format_srt_timestamp(record.start_ms),
+                    end_time=format_srt_timestamp(record.end_ms),
                     text=text,
-                    start_seconds=time_to_seconds(start_time),
-                    end_seconds=time_to_seconds(end_time),
+                    start_seconds=record.start_ms / 1000,
+                    end_seconds=record.end_ms / 1000,
                 ))
-        except (ValueError, IndexError):
-            continue
 
     return entries
 
@@ -0,0 +1,316 @@
+"""
+Classifier Service Module
+Resident classification daemon with a localhost HTTP API.
+
+Loading torch, the sentence-transformer and the scenario prototypes takes
+far longer than classifying a batch, so the service keeps one
+HybridClassifier warm and serves requests over HTTP on localhost:
+
+    POST /classify   {"texts": [...]}  ->  {"results": [...]}
+    GET  /health     service settings (semantic, backend, config hash)
+    GET  /stats      request counts, batch sizes and p50/p99 latency
+
+Requests that arrive together are coalesced into micro-batches: a batch
+is classified once it holds max_batch texts or its first request has
+waited max_wait_ms. With classification.service.auto_connect set,
+classify_dialogs uses a running service when its settings match (see
+scenario_classifier.connect_to_service).
+"""
+
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib import error, request
+import logging
+import yaml
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Latencies kept for the p50/p99 report
+_LATENCY_WINDOW = 10000
+
+
+def config_fingerprint(config: Dict) -> str:
+    """Hash of the config that determines classification results."""
+    classification = {
+        key: value for key, value in (config.get('classification') or {}).items()
+        if key != 'service'
+    }
+    sections = {
+        'personal_social_scenarios': config.get('personal_social_scenarios'),
+        'classification': classification,
+    }
+    payload = json.dumps(sections, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class _PendingRequest:
+    """One request's texts, waiting for its slice of a micro-batch."""
+
+    __slots__ = ('texts', 'submitted', 'done', 'results', 'error')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.results: Optional[List] = None
+        self.error: Optional[Exception] = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent classify requests into batches for one worker thread.
+    """
+
+    def __init__(self, classify_batch: Callable[[List[str]], List], max_batch: int = 256,
+                 max_wait_ms: float = 5.0):
+        self.classify_batch = classify_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=_LATENCY_WINDOW)
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+
+        self._worker = threading.Thread(target=self._run, name="classifier-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> List:
+        """Classify texts (blocks until their batch is done)."""
+        pending = _PendingRequest(texts)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            size = len(first.texts)
+            deadline = first.submitted + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                size += len(pending.texts)
+
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingRequest]):
+        texts = [text for pending in batch for text in pending.texts]
+        try:
+            results = self.classify_batch(texts)
+        except Exception as e:
+            logger.exception("Classification batch failed")
+            for pending in batch:
+                pending.error = e
+                pending.done.set()
+            return
+
+        finished = time.perf_counter()
+        offset = 0
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            for pending in batch:
+                pending.results = results[offset:offset + len(pending.texts)]
+                offset += len(pending.texts)
+                self.latencies.append(finished - pending.submitted)
+
+        for pending in batch:
+            pending.done.set()
+
+    def stats(self) -> Dict:
+        """Request counts and latency percentiles (milliseconds)."""
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            stats = {
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "mean_batch_texts": self.texts / self.batches if self.batches else 0.0,
+            }
+        if len(latencies):
+            stats["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+                "window": len(latencies),
+            }
+        return stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ClassifierService"
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, self.server.info)
+        elif self.path == '/stats':
+            self._reply(200, self.server.batcher.stats())
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/classify':
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            texts = json.loads(self.rfile.read(length))['texts']
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("'texts' must be a list of strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"Bad request: {e}"})
+            return
+
+        try:
+            results = self.server.batcher.submit(texts)
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, {"results": [asdict(result) for result in results]})
+
+    def _reply(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class ClassifierService(ThreadingHTTPServer):
+    """HTTP server around a warm classifier and its micro-batcher."""
+
+    daemon_threads = True
+
+    def __init__(self, classifier, config: Dict, host: str = "127.0.0.1", port: int = 8765,
+                 max_batch: int = 256, max_wait_ms: float = 5.0):
+        super().__init__((host, port), _Handler)
+        self.classifier = classifier
+        self.batcher = MicroBatcher(
+            lambda texts: classifier.classify_batch(texts, show_progress=False),
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms
+        )
+        self.info = {
+            "status": "ok",
+            "use_semantic": classifier.use_semantic,
+            "backend": classifier.backend,
+            "config_hash": config_fingerprint(config),
+        }
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        self.classifier.close()
+
+
+def serve(
+    config_path: str = "config/settings.yaml",
+    use_semantic: bool = True,
+    backend: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None
+):
+    """
+    Run the classifier service until interrupted.
+
+    Args:
+        config_path: Path to configuration file
+        use_semantic: Whether to use semantic classification
+        backend: Embedding backend (default: from config)
+        host: Address to listen on (default: classification.service.host)
+        port: Port to listen on (default: classification.service.port)
+    """
+    try:
+        from .scenario_classifier import HybridClassifier
+    except ImportError:
+        from scenario_classifier import HybridClassifier
+
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    service_config = (config.get('classification') or {}).get('service', {})
+
+    classifier = HybridClassifier(config_path, use_semantic=use_semantic, backend=backend)
+    service = ClassifierService(
+        classifier,
+        config,
+        host=host or service_config.get('host', "127.0.0.1"),
+        port=port or service_config.get('port', 8765),
+        max_batch=service_config.get('max_batch', 256),
+        max_wait_ms=service_config.get('max_wait_ms', 5.0)
+    )
+
+    logger.info(f"Classifier service listening on http://{service.server_address[0]}:{service.server_address[1]}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Shutting down; {json.dumps(service.batcher.stats())}")
+    finally:
+        service.server_close()
+
+
+class ClassifierClient:
+    """Minimal client for a running ClassifierService."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, timeout: float = 600.0):
+        self.url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        data = None if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        req = request.Request(
+            self.url + path,
+            data=data,
+            headers={'Content-Type': 'application/json; charset=utf-8'}
+        )
+        with request.urlopen(req, timeout=timeout or self.timeout) as response:
+            return json.loads(response.read())
+
+    def health(self, timeout: float = 0.5) -> Optional[Dict]:
+        """Service settings, or None if no service is reachable."""
+        try:
+            return self._request('/health', timeout=timeout)
+        except (OSError, ValueError, error.URLError):
+            return None
+
+    def stats(self) -> Dict:
+        return self._request('/stats')
+
+    def classify(self, texts: List[str]) -> List[Dict]:
+        """Classify texts; returns ClassificationResult fields as dicts."""
+        return self._request('/classify', {"texts": texts})['results']
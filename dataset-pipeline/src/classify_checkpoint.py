@@ -0,0 +1,81 @@
+"""
+Classification Checkpoint Module
+Records how far a classify run has got, so an interrupted run resumes
+after the last finished chunk instead of starting over.
+
+The checkpoint is stored next to the output and rewritten after every
+chunk: how many input dialogs are done, the output's size and record
+count at that point, and the running scenario counts. It also stores
+the run's settings (input file, config hash, semantic/backend); a
+checkpoint written with other settings is ignored. The number of worker
+processes is not a setting: it doesn't change the output, so a run can
+be resumed with more or fewer workers.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the checkpoint contents change
+CHECKPOINT_VERSION = 1
+
+
+class ClassificationCheckpoint:
+    """Progress of one classify run, stored next to its output."""
+
+    def __init__(self, output_file: str, settings: Dict):
+        output_path = Path(output_file)
+        self.output_path = output_path
+        self.path = output_path.with_name(output_path.stem + '.checkpoint.json')
+        self.settings = settings
+
+    def load(self) -> Optional[Dict]:
+        """
+        State saved by an interrupted run with the same settings, or None.
+
+        Returns:
+            Dict with dialogs_done, output_offset, output_count,
+            scenario_counts and cascade_stats
+        """
+        if not self.path.exists():
+            return None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+        if data.get('version') != CHECKPOINT_VERSION or data.get('settings') != self.settings:
+            logger.info("Classification settings or input changed, not resuming")
+            return None
+        if not self.output_path.exists() or self.output_path.stat().st_size < data['output_offset']:
+            logger.warning(f"{self.output_path} is shorter than its checkpoint, not resuming")
+            return None
+        return data
+
+    def save(self, dialogs_done: int, output_offset: int, output_count: int,
+             scenario_counts: Dict[str, int], cascade_stats: Dict[str, int]):
+        """Record progress (after the output has been flushed up to output_offset)."""
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "settings": self.settings,
+            "dialogs_done": dialogs_done,
+            "output_offset": output_offset,
+            "output_count": output_count,
+            "scenario_counts": scenario_counts,
+            "cascade_stats": cascade_stats,
+        }
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        """Delete the checkpoint once the run has finished."""
+        self.path.unlink(missing_ok=True)
@@ -13,6 +13,11 @@ from datetime import datetime
 import logging
 import yaml
 
+try:
+    from .dialog_io import iter_dialogs
+except ImportError:
+    from dialog_io import iter_dialogs
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -468,8 +473,7 @@ def process_dataset(
     - Scenario-specific eval sets
     """
     # Load classified dialogs
-    with open(classified_dialogs_file, 'r', encoding='utf-8') as f:
-        dialogs = json.load(f)
+    dialogs = list(iter_dialogs(classified_dialogs_file))
 
     logger.info(f"Loaded {len(dialogs)} classified dialogs")
 
@@ -0,0 +1,321 @@
+"""
+Deduplicator Module
+Removes near-duplicate dialogs between extraction and classification.
+
+The same film often appears several times in data/raw (different uploads
+and release cuts), and generic lines repeat across thousands of files.
+Dialogs are compared with MinHash signatures over character shingles of
+their normalized text; LSH banding finds candidate duplicates without
+comparing every pair, and candidates are confirmed by estimated Jaccard
+similarity. The first occurrence of each cluster is kept.
+
+Dialogs are streamed from and to disk. The LSH index only tracks a bounded
+number of kept dialogs: when it is full the oldest half is dropped, while
+dialogs that keep getting duplicated are refreshed and stay tracked.
+"""
+
+import json
+import re
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import yaml
+import numpy as np
+
+try:
+    from .dialog_io import DialogWriter, iter_dialogs
+except ImportError:
+    from dialog_io import DialogWriter, iter_dialogs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dialogs whose signatures are computed together in one numpy pass
+_SIGNATURE_BATCH = 1024
+
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f]+')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = _COMBINING_MARKS.sub('', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose LSH threshold
+    (1 / bands) ** (1 / rows) is closest to the similarity threshold.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class MinHasher:
+    """Computes MinHash signatures of texts, many at a time."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 4, seed: int = 42):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        # Hash functions h(x) = ((a * x + b) mod 2^64) >> 32 (multiply-add-shift),
+        # one row per permutation
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * 2 + 1
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingle_hashes(self, text: str) -> List[int]:
+        """CRC32 of each distinct character shingle of the normalized text."""
+        normalized = normalize_text(text)
+        k = self.shingle_size
+        if len(normalized) <= k:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+        return [zlib.crc32(s.encode('utf-8')) for s in shingles]
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """Signatures of texts as a (len(texts), num_perm) uint32 array."""
+        hashes = []
+        offsets = []
+        for text in texts:
+            offsets.append(len(hashes))
+            hashes.extend(self.shingle_hashes(text))
+
+        values = np.array(hashes, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            permuted = ((self._a * values + self._b) >> np.uint64(32)).astype(np.uint32)
+        return np.minimum.reduceat(permuted, offsets, axis=1).T.copy()
+
+
+class _LshGeneration:
+    """One generation of the LSH index: band buckets plus kept signatures."""
+
+    def __init__(self, num_bands: int):
+        # Per band: band key -> clusters with that band (usually just one)
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(num_bands)]
+        # cluster id -> (signature bytes, dialog id, text)
+        self.entries: Dict[int, Tuple[bytes, str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def candidates(self, band_keys: List[int]) -> Iterator[int]:
+        """Clusters sharing at least one band key, each once."""
+        seen = set()
+        for bucket, key in zip(self.buckets, band_keys):
+            for cluster_id in bucket.get(key, ()):
+                if cluster_id not in seen:
+                    seen.add(cluster_id)
+                    yield cluster_id
+
+    def add(self, cluster_id: int, band_keys: List[int], entry: Tuple[bytes, str, str]):
+        for bucket, key in zip(self.buckets, band_keys):
+            bucket.setdefault(key, []).append(cluster_id)
+        self.entries[cluster_id] = entry
+
+
+class MinHashDeduplicator:
+    """
+    Streaming near-duplicate filter.
+
+    Call is_duplicate() on dialogs in order (or use filter()); the first
+    dialog of each cluster is kept and later near-duplicates are dropped.
+    """
+
+    def __init__(self, config_path: str = "config/settings.yaml"):
+        with open(config_path, 'r') as f:
+            self.config = yaml.safe_load(f)
+
+        dedup_config = self.config.get('deduplication', {})
+        self.threshold = dedup_config.get('similarity_threshold', 0.8)
+        self.max_tracked = dedup_config.get('max_tracked_dialogs', 500000)
+        self.report_clusters = dedup_config.get('report_clusters', 100)
+
+        self.hasher = MinHasher(
+            num_perm=dedup_config.get('num_perm', 64),
+            shingle_size=dedup_config.get('shingle_size', 4),
+            seed=dedup_config.get('seed', 42)
+        )
+        self.num_bands, self.rows = choose_bands(self.hasher.num_perm, self.threshold)
+
+        self._current = _LshGeneration(self.num_bands)
+        self._previous = _LshGeneration(self.num_bands)
+        self._next_cluster_id = 0
+
+        self.total = 0
+        self.removed = 0
+        # cluster id -> [kept id, kept text, removed count, removed examples]
+        self.clusters: Dict[int, list] = {}
+
+    def _band_keys(self, signature: bytes) -> List[int]:
+        width = self.rows * 4  # uint32 values
+        return [
+            hash(signature[band * width:(band + 1) * width])
+            for band in range(self.num_bands)
+        ]
+
+    def _find_cluster(self, signature: np.ndarray, band_keys: List[int]) -> Optional[int]:
+        """Cluster of a kept dialog similar enough to this signature, if any."""
+        min_agreement = self.threshold * self.hasher.num_perm
+        for generation in (self._current, self._previous):
+            for cluster_id in generation.candidates(band_keys):
+                kept_signature, kept_id, kept_text = generation.entries[cluster_id]
+                agreement = np.count_nonzero(np.frombuffer(kept_signature, np.uint32) == signature)
+                if agreement >= min_agreement:
+                    if generation is self._previous:
+                        # Still being duplicated: keep it in the newest generation
+                        self._add_to_current(cluster_id, kept_signature, kept_id, kept_text)
+                    return cluster_id
+        return None
+
+    def _add_to_current(self, cluster_id: int, signature: bytes, dialog_id: str, text: str):
+        if len(self._current) >= max(1, self.max_tracked // 2):
+            self._previous = self._current
+            self._current = _LshGeneration(self.num_bands)
+        self._current.add(cluster_id, self._band_keys(signature), (signature, dialog_id, text))
+
+    def check(self, dialog: Dict, signature: np.ndarray) -> bool:
+        """Record a dialog with a precomputed signature; True if it is a duplicate."""
+        self.total += 1
+        signature_bytes = signature.tobytes()
+        cluster_id = self._find_cluster(signature, self._band_keys(signature_bytes))
+
+        if cluster_id is None:
+            cluster_id = self._next_cluster_id
+            self._next_cluster_id += 1
+            self._add_to_current(cluster_id, signature_bytes, dialog.get('id', ''), dialog['text'])
+            return False
+
+        self.removed += 1
+        self._record_removal(cluster_id, dialog)
+        return True
+
+    def is_duplicate(self, dialog: Dict) -> bool:
+        """Check a single dialog (see filter() for batched signatures)."""
+        return self.check(dialog, self.hasher.signatures([dialog['text']])[0])
+
+    def filter(self, dialogs) -> Iterator[Dict]:
+        """Yield the dialogs that are not near-duplicates of earlier ones."""
+        batch = []
+        for dialog in dialogs:
+            batch.append(dialog)
+            if len(batch) >= _SIGNATURE_BATCH:
+                yield from self._filter_batch(batch)
+                batch = []
+        if batch:
+            yield from self._filter_batch(batch)
+
+    def _filter_batch(self, batch: List[Dict]) -> Iterator[Dict]:
+        signatures = self.hasher.signatures([d['text'] for d in batch])
+        for dialog, signature in zip(batch, signatures):
+            if not self.check(dialog, signature):
+                yield dialog
+
+    def _record_removal(self, cluster_id: int, dialog: Dict):
+        cluster = self.clusters.get(cluster_id)
+        if cluster is None:
+            entry = (self._current.entries.get(cluster_id)
+                     or self._previous.entries.get(cluster_id))
+            cluster = [entry[1], entry[2], 0, []]
+            self.clusters[cluster_id] = cluster
+
+        cluster[2] += 1
+        if len(cluster[3]) < 3:
+            cluster[3].append({"id": dialog.get('id', ''), "text": dialog['text']})
+
+        # Keep cluster stats bounded; large clusters outlive the pruning
+        limit = max(10000, 20 * self.report_clusters)
+        if len(self.clusters) > limit:
+            largest = sorted(self.clusters.items(), key=lambda c: -c[1][2])[:limit // 2]
+            self.clusters = dict(largest)
+
+    def report(self) -> Dict:
+        """Summary of the run plus the largest clusters removed."""
+        largest = sorted(self.clusters.values(), key=lambda c: -c[2])[:self.report_clusters]
+        return {
+            "total": self.total,
+            "kept": self.total - self.removed,
+            "removed": self.removed,
+            "similarity_threshold": self.threshold,
+            "num_perm": self.hasher.num_perm,
+            "bands": self.num_bands,
+            "rows_per_band": self.rows,
+            "clusters": [
+                {
+                    "kept_id": kept_id,
+                    "kept_text": kept_text,
+                    "removed": removed,
+                    "examples": examples,
+                }
+                for kept_id, kept_text, removed, examples in largest
+            ],
+        }
+
+
+def deduplicate_dialogs(
+    dialogs_file: str,
+    output_file: str,
+    config_path: str = "config/settings.yaml",
+    report_file: Optional[str] = None
+) -> Dict:
+    """
+    Remove near-duplicate dialogs from a dialogs file.
+
+    Args:
+        dialogs_file: Path to jsonl/json file with extracted dialogs
+        output_file: Path to save the remaining dialogs
+        config_path: Path to configuration file
+        report_file: Optional path for a JSON report of removed clusters
+
+    Returns:
+        The deduplication report
+    """
+    deduplicator = MinHashDeduplicator(config_path)
+
+    with DialogWriter(output_file) as writer:
+        writer.write_many(deduplicator.filter(iter_dialogs(dialogs_file)))
+
+    report = deduplicator.report()
+    logger.info(
+        f"Kept {report['kept']} of {report['total']} dialogs "
+        f"({report['removed']} near-duplicates removed)"
+    )
+
+    if report_file:
+        Path(report_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Saved deduplication report to {report_file}")
+
+    return report
+
+
+def print_dedup_report(report: Dict, top: int = 10):
+    """Print a formatted deduplication report."""
+    print("\n" + "=" * 50)
+    print("DEDUPLICATION REPORT")
+    print("=" * 50)
+    print(f"{'Total':20} {report['total']:8}")
+    print(f"{'Kept':20} {report['kept']:8}")
+    print(f"{'Removed':20} {report['removed']:8}")
+    print("=" * 50)
+
+    for cluster in report['clusters'][:top]:
+        print(f"{cluster['removed']:6}x  {cluster['kept_text'][:60]}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        input_file = sys.argv[1]
+        output_file = sys.argv[2] if len(sys.argv) > 2 else "data/processed/unique_dialogs.jsonl"
+
+        print_dedup_report(deduplicate_dialogs(input_file, output_file))
+    else:
+        print("Usage: python deduplicator.py <dialogs.jsonl> [output.jsonl]")
@@ -4,18 +4,41 @@ Parses SRT subtitle files and extracts dialog with timestamps.
 """
 
 import re
+import hashlib
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+import numpy as np
 import srt
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import timedelta
 import logging
 import yaml
-import json
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .aho_corasick import AhoCorasick
+    from .dialog_io import DialogWriter
+    from .dialog_store import NO_ID_NUMBER, DialogStore
+    from .extraction_manifest import ExtractionManifest
+    from .srt_scanner import (
+        SrtBuffer, SrtParseError, SrtRecord, detect_encoding, map_file
+    )
+except ImportError:
+    from aho_corasick import AhoCorasick
+    from dialog_io import DialogWriter
+    from dialog_store import NO_ID_NUMBER, DialogStore
+    from extraction_manifest import ExtractionManifest
+    from srt_scanner import (
+        SrtBuffer, SrtParseError, SrtRecord, detect_encoding, map_file
+    )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_ONE_US = timedelta(microseconds=1)
+
 
 @dataclass
 class DialogEntry:
@@ -81,6 +104,24 @@ class DialogEntry:
         }
 
 
+@dataclass
+class SubtitleSource:
+    """A subtitle file mapped for scanning, read once from disk."""
+    buffer: Optional[SrtBuffer]
+    encoding: str
+    sha1: str
+
+    def text(self, record: SrtRecord) -> str:
+        """Decoded text of a scanned subtitle block."""
+        return self.buffer.text(record)
+
+    def close(self):
+        """Unmap the file; encoding and sha1 stay available."""
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+
 class SubtitleParser:
     """Parses SRT files and extracts clean dialog."""
 
@@ -97,6 +138,26 @@ class SubtitleParser:
         r'^#{1,}',            # Hash marks
     ]
 
+    # (trigger, is_markup) per cleaning pattern. A pattern only runs when its
+    # trigger substring is present (None = always); markup patterns are
+    # skipped entirely for lines where _MARKUP_PROBE finds nothing.
+    CLEANING_TRIGGERS = [
+        ('<', True), ('{', True), ('[', True), ('(', True), ('♪', True),
+        ('-', False), (None, False), (None, True), ('#', True),
+    ]
+
+    # Compiled once; clean_text runs on every subtitle line
+    _CLEANING_REGEXES = [
+        (trigger, re.compile(pattern, re.MULTILINE | re.IGNORECASE))
+        for (trigger, _), pattern in zip(CLEANING_TRIGGERS, CLEANING_PATTERNS)
+    ]
+    _PLAIN_CLEANING_REGEXES = [
+        entry for entry, (_, is_markup) in zip(_CLEANING_REGEXES, CLEANING_TRIGGERS)
+        if not is_markup
+    ]
+    _MARKUP_PROBE = re.compile(r'[<{\[(♪#]|http', re.IGNORECASE)
+    _REPEATED_PUNCT = re.compile(r'([.!?])\1+')
+
     # Patterns indicating non-dialog content
     NON_DIALOG_PATTERNS = [
         r'^[A-Z\s]+:$',           # ALL CAPS labels (NARRATOR:)
@@ -115,45 +176,89 @@ class SubtitleParser:
         self.min_length = self.config['processing']['min_dialog_length']
         self.max_length = self.config['processing']['max_dialog_length']
         self.context_lines = self.config['processing']['context_lines']
+        self.context_mode = self.config['processing'].get('context_mode', 'lines')
+        self.context_window_seconds = self.config['processing'].get('context_window_seconds', 5)
+        self.merge_consecutive = self.config['processing'].get('merge_consecutive', False)
+        self.max_gap_seconds = self.config['processing'].get('max_gap_seconds', 2.0)
 
-    def parse_srt_file(self, filepath: str) -> List[srt.Subtitle]:
-        """Parse an SRT file and return subtitle objects."""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            # Try alternative encodings
-            for encoding in ['latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    with open(filepath, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                logger.error(f"Could not decode {filepath}")
-                return []
+    def read_srt_file(
+        self,
+        filepath: str,
+        encoding_hint: Optional[Tuple[str, str]] = None
+    ) -> SubtitleSource:
+        """
+        Memory-map an SRT file for scanning. Call close() on the result when
+        done with it.
+
+        Args:
+            filepath: Path to the SRT file
+            encoding_hint: (sha1, encoding) recorded on a previous run; the
+                encoding is used directly if the file's hash still matches
+        """
+        data = map_file(filepath)
+        sha1 = hashlib.sha1(data).hexdigest()
+
+        if encoding_hint and encoding_hint[0] == sha1:
+            encoding = encoding_hint[1]
+        else:
+            encoding = detect_encoding(data)
+
+        return SubtitleSource(buffer=SrtBuffer(data, encoding), encoding=encoding, sha1=sha1)
 
+    def scan_srt_file(self, filepath: str, source: SubtitleSource) -> List[SrtRecord]:
+        """Scan the subtitle blocks of a read SRT file ([] if it is malformed)."""
         try:
-            return list(srt.parse(content))
-        except Exception as e:
+            return list(source.buffer.records())
+        except SrtParseError as e:
             logger.error(f"Failed to parse SRT {filepath}: {e}")
             return []
 
+    def parse_srt_file(
+        self,
+        filepath: str,
+        source: Optional[SubtitleSource] = None
+    ) -> List[srt.Subtitle]:
+        """Parse an SRT file and return subtitle objects."""
+        owns_source = source is None
+        if owns_source:
+            source = self.read_srt_file(filepath)
+
+        try:
+            return [
+                srt.Subtitle(
+                    index=record.index,
+                    start=timedelta(milliseconds=record.start_ms),
+                    end=timedelta(milliseconds=record.end_ms),
+                    content=source.text(record)
+                )
+                for record in self.scan_srt_file(filepath, source)
+            ]
+        finally:
+            if owns_source:
+                source.close()
+
     def clean_text(self, text: str) -> str:
         """Clean subtitle text by removing annotations and formatting."""
         cleaned = text
 
-        # Apply cleaning patterns
-        for pattern in self.CLEANING_PATTERNS:
-            cleaned = re.sub(pattern, '', cleaned, flags=re.MULTILINE | re.IGNORECASE)
+        # Apply cleaning patterns in order. Lines without any markup only
+        # need the dash/number passes; the rest are skipped unless their
+        # trigger substring is present (removals never introduce one).
+        if self._MARKUP_PROBE.search(cleaned) is None:
+            patterns = self._PLAIN_CLEANING_REGEXES
+        else:
+            patterns = self._CLEANING_REGEXES
+
+        for trigger, regex in patterns:
+            if trigger is None or trigger in cleaned:
+                cleaned = regex.sub('', cleaned)
 
-        # Normalize whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-        cleaned = cleaned.strip()
+        # Normalize whitespace (str.split() uses the same whitespace set as \s)
+        cleaned = ' '.join(cleaned.split())
 
         # Remove multiple punctuation
-        cleaned = re.sub(r'([.!?])\1+', r'\1', cleaned)
+        if '..' in cleaned or '!!' in cleaned or '??' in cleaned:
+            cleaned = self._REPEATED_PUNCT.sub(r'\1', cleaned)
 
         return cleaned
 
@@ -178,7 +283,8 @@ class SubtitleParser:
         self,
         filepath: str,
         film_title: str = "",
-        film_year: int = 0
+        film_year: int = 0,
+        source: Optional[SubtitleSource] = None
     ) -> List[DialogEntry]:
         """
         Extract clean dialog entries from an SRT file.
@@ -187,15 +293,54 @@ class SubtitleParser:
             filepath: Path to the SRT file
             film_title: Title of the film (for metadata)
             film_year: Year of the film (for metadata)
+            source: File opened with read_srt_file (opened and closed here if omitted)
 
         Returns:
             List of DialogEntry objects
         """
-        subtitles = self.parse_srt_file(filepath)
-        if not subtitles:
-            return []
+        store = DialogStore()
+        self.extract_to_store(filepath, store, film_title, film_year, source)
+        return [DialogEntry(**view.entry_fields()) for view in store]
+
+    def extract_to_store(
+        self,
+        filepath: str,
+        store: DialogStore,
+        film_title: str = "",
+        film_year: int = 0,
+        source: Optional[SubtitleSource] = None
+    ) -> int:
+        """
+        Extract clean dialogs from an SRT file into a columnar DialogStore.
+
+        Each non-empty cleaned line is pooled once; a dialog's context is a
+        range of that file's pooled lines rather than copies of them.
+
+        Args:
+            filepath: Path to the SRT file
+            store: Store to append the dialogs to
+            film_title: Title of the film (for metadata)
+            film_year: Year of the film (for metadata)
+            source: File opened with read_srt_file (opened and closed here if omitted)
+
+        Returns:
+            Number of dialogs added
+        """
+        owns_source = source is None
+        if owns_source:
+            source = self.read_srt_file(filepath)
+
+        try:
+            records = self.scan_srt_file(filepath, source)
+            # Clean each subtitle exactly once; context comes from these
+            cleaned_texts = [self.clean_text(source.text(record)) for record in records]
+        finally:
+            if owns_source:
+                source.close()
+
+        if not records:
+            return 0
 
-        dialogs = []
         source_name = Path(filepath).stem
 
         # Extract film info from filename if not provided
@@ -209,97 +354,268 @@ class SubtitleParser:
                 except ValueError:
                     pass
 
-        # Process each subtitle
-        for i, sub in enumerate(subtitles):
-            # Clean the text
-            cleaned_text = self.clean_text(sub.content)
+        num_subtitles = len(records)
+        time_context = self.context_mode == 'time'
+
+        # Time-window context works on subtitles sorted by start time
+        if time_context:
+            order = sorted(range(num_subtitles), key=lambda k: records[k].start_ms)
+        else:
+            order = range(num_subtitles)
+
+        position = [0] * num_subtitles
+        for p, k in enumerate(order):
+            position[k] = p
+        ordered_texts = [cleaned_texts[k] for k in order]
+
+        # Pool the non-empty cleaned lines in that order. pooled_before[p] =
+        # number of non-empty lines among the first p, so the non-empty lines
+        # of ordered_texts[a:b] are pool lines base + pooled_before[a] ..
+        # base + pooled_before[b].
+        base = store.add_lines(t for t in ordered_texts if t)
+
+        pooled_before = [0]
+        for text in ordered_texts:
+            pooled_before.append(pooled_before[-1] + (1 if text else 0))
+
+        def pool_range(lo: int, hi: int) -> Tuple[int, int]:
+            return base + pooled_before[lo], base + pooled_before[hi]
+
+        if time_context:
+            window_index = TimeWindowIndex(
+                [records[k].start_ms for k in order],
+                [records[k].end_ms for k in order]
+            )
+            window_ms = round(self.context_window_seconds * 1000)
+
+        n = self.context_lines
+        added = 0
 
+        # Process each subtitle
+        for i, record in enumerate(records):
             # Validate dialog
-            if not self.is_valid_dialog(cleaned_text):
+            if not self.is_valid_dialog(cleaned_texts[i]):
                 continue
 
-            # Get context (surrounding lines)
-            context_before = []
-            context_after = []
-
-            for j in range(max(0, i - self.context_lines), i):
-                ctx_text = self.clean_text(subtitles[j].content)
-                if ctx_text:
-                    context_before.append(ctx_text)
-
-            for j in range(i + 1, min(len(subtitles), i + 1 + self.context_lines)):
-                ctx_text = self.clean_text(subtitles[j].content)
-                if ctx_text:
-                    context_after.append(ctx_text)
-
-            # Create dialog entry
-            dialog = DialogEntry(
-                id=f"{source_name}_{sub.index}",
-                text=cleaned_text,
-                start_time=sub.start,
-                end_time=sub.end,
+            if record.index is None:
+                id_prefix, id_number = f"{source_name}_None", NO_ID_NUMBER
+            else:
+                id_prefix, id_number = source_name, record.index
+
+            # Context: surrounding non-empty lines, as pool ranges
+            p = position[i]
+            if time_context:
+                lo, hi, overlapping = window_index.overlapping(
+                    record.start_ms - window_ms, record.end_ms + window_ms
+                )
+                if len(overlapping) == hi - lo:
+                    context_before = pool_range(lo, p)
+                    context_after = pool_range(p + 1, hi)
+                else:
+                    # A long earlier subtitle breaks up the range; pool copies
+                    context_before = self._pool_lines(
+                        store, [ordered_texts[q] for q in overlapping if q < p]
+                    )
+                    context_after = self._pool_lines(
+                        store, [ordered_texts[q] for q in overlapping if q > p]
+                    )
+            else:
+                context_before = pool_range(max(0, p - n), p)
+                context_after = pool_range(p + 1, min(num_subtitles, p + 1 + n))
+
+            store.append(
+                id_prefix=id_prefix,
+                id_number=id_number,
+                text_line=base + pooled_before[p],
+                start_ms=record.start_ms,
+                end_ms=record.end_ms,
                 source_file=filepath,
                 film_title=film_title,
                 film_year=film_year,
                 context_before=context_before,
                 context_after=context_after
             )
+            added += 1
 
-            dialogs.append(dialog)
+        logger.info(f"Extracted {added} dialogs from {filepath}")
+        return added
 
-        logger.info(f"Extracted {len(dialogs)} dialogs from {filepath}")
-        return dialogs
+    @staticmethod
+    def _pool_lines(store: DialogStore, texts: List[str]) -> Tuple[int, int]:
+        """Pool the non-empty texts as new lines and return their range."""
+        first = store.add_lines(t for t in texts if t)
+        return first, store.num_lines
 
     def merge_consecutive_dialogs(
         self,
         dialogs: List[DialogEntry],
-        max_gap_seconds: float = 2.0
+        max_gap_seconds: Optional[float] = None
     ) -> List[DialogEntry]:
         """
         Merge consecutive dialog entries that are close together.
         This creates more natural conversation segments.
+
+        Args:
+            dialogs: Dialog entries in file order
+            max_gap_seconds: Largest gap merged over (default: from config)
         """
         if not dialogs:
             return []
 
-        merged = []
-        current = dialogs[0]
+        if max_gap_seconds is None:
+            max_gap_seconds = self.max_gap_seconds
 
-        for next_dialog in dialogs[1:]:
-            # Check if from same source
-            if current.source_file != next_dialog.source_file:
-                merged.append(current)
-                current = next_dialog
-                continue
+        source_ids = {}
+        group_starts = find_merge_groups(
+            [d.start_time // _ONE_US for d in dialogs],
+            [d.end_time // _ONE_US for d in dialogs],
+            [source_ids.setdefault(d.source_file, len(source_ids)) for d in dialogs],
+            max_gap_seconds,
+            ticks_per_second=1_000_000
+        )
 
-            # Check time gap
-            gap = (next_dialog.start_time - current.end_time).total_seconds()
-
-            if gap <= max_gap_seconds:
-                # Merge dialogs
-                current = DialogEntry(
-                    id=current.id,
-                    text=f"{current.text} {next_dialog.text}",
-                    start_time=current.start_time,
-                    end_time=next_dialog.end_time,
-                    source_file=current.source_file,
-                    film_title=current.film_title,
-                    film_year=current.film_year,
-                    context_before=current.context_before,
-                    context_after=next_dialog.context_after
-                )
-            else:
-                merged.append(current)
-                current = next_dialog
+        merged = []
+        bounds = group_starts.tolist() + [len(dialogs)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            if hi - lo == 1:
+                merged.append(dialogs[lo])
+                continue
 
-        merged.append(current)
+            first, last = dialogs[lo], dialogs[hi - 1]
+            merged.append(DialogEntry(
+                id=first.id,
+                text=' '.join(d.text for d in dialogs[lo:hi]),
+                start_time=first.start_time,
+                end_time=last.end_time,
+                source_file=first.source_file,
+                film_title=first.film_title,
+                film_year=first.film_year,
+                context_before=first.context_before,
+                context_after=last.context_after
+            ))
 
         logger.info(f"Merged {len(dialogs)} dialogs into {len(merged)} segments")
         return merged
 
+    def merge_store(
+        self,
+        store: DialogStore,
+        max_gap_seconds: Optional[float] = None
+    ) -> DialogStore:
+        """
+        Merge consecutive dialogs of the same source into turn-level segments.
+
+        Same rules as merge_consecutive_dialogs, on a columnar store: gaps are
+        computed for all rows at once and each segment's text is joined once.
+
+        Args:
+            store: Dialogs in file order
+            max_gap_seconds: Largest gap merged over (default: from config)
+
+        Returns:
+            A new store with one row per segment
+        """
+        if max_gap_seconds is None:
+            max_gap_seconds = self.max_gap_seconds
+
+        start_ms, end_ms, sources = store.time_columns()
+        group_starts = find_merge_groups(start_ms, end_ms, sources, max_gap_seconds)
+        merged = store.merge_groups(group_starts.tolist())
+
+        logger.info(f"Merged {len(store)} dialogs into {len(merged)} segments")
+        return merged
+
+
+class TimeWindowIndex:
+    """
+    Finds the subtitles that overlap a time window.
+
+    Built over one file's subtitles sorted by start time. Start times are
+    sorted and the running maximum of end times is non-decreasing, so both
+    ends of the candidate range are found by binary search: O(log n) plus
+    the number of subtitles returned.
+    """
+
+    def __init__(self, starts: List[int], ends: List[int]):
+        self.starts = starts
+        self.ends = ends
+        self.max_ends = list(accumulate(ends, max))
+
+    def overlapping(self, window_start: int, window_end: int) -> Tuple[int, int, List[int]]:
+        """
+        Subtitles overlapping [window_start, window_end].
+
+        Returns:
+            (lo, hi, positions): every overlapping subtitle lies in [lo, hi);
+            positions lists them, and equals range(lo, hi) unless an earlier
+            long subtitle pulled lo down
+        """
+        lo = bisect_left(self.max_ends, window_start)
+        hi = bisect_right(self.starts, window_end)
+        positions = [q for q in range(lo, hi) if self.ends[q] >= window_start]
+        return lo, hi, positions
+
+
+def find_merge_groups(
+    starts,
+    ends,
+    sources,
+    max_gap_seconds: float,
+    ticks_per_second: int = 1000
+) -> np.ndarray:
+    """
+    Find runs of consecutive dialogs to merge, in one vectorized pass.
+
+    A dialog joins the previous run when it has the same source and starts
+    at most max_gap_seconds after the previous dialog ends.
+
+    Args:
+        starts: Start times in ticks (milliseconds by default)
+        ends: End times in ticks
+        sources: Source ids; runs never cross a change of source
+        max_gap_seconds: Largest gap merged over
+        ticks_per_second: Resolution of starts/ends
+
+    Returns:
+        Index of the first dialog of each run
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    sources = np.asarray(sources)
+
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    gaps = (starts[1:] - ends[:-1]) / ticks_per_second
+    breaks = (gaps > max_gap_seconds) | (sources[1:] != sources[:-1])
+    return np.flatnonzero(np.concatenate(([True], breaks)))
+
+
+@dataclass
+class MarkerMatch:
+    """A Catalan marker found in a piece of text."""
+    name: str       # e.g. "lexical:nen"
+    category: str   # 'lexical', 'syntactic' or 'phonetic'
+    marker: str
+    start: int      # character offsets into the original text
+    end: int
+
 
 class CatalanMarkerDetector:
-    """Detects Catalan linguistic markers in Spanish text."""
+    """
+    Detects Catalan linguistic markers in Spanish text.
+
+    All marker categories are compiled into one Aho-Corasick automaton and
+    matched as whole words, so a text is scanned once no matter how many
+    markers are configured (including lexicons loaded with load_lexicon).
+    """
+
+    # Config key -> prefix used in marker names, in reporting order
+    MARKER_CATEGORIES = {
+        'lexical_borrowings': 'lexical',
+        'syntactic_patterns': 'syntactic',
+        'phonetic_indicators': 'phonetic',
+    }
 
     def __init__(self, config_path: str = "config/settings.yaml"):
         with open(config_path, 'r') as f:
@@ -307,26 +623,94 @@ class CatalanMarkerDetector:
 
         self.markers = self.config.get('catalan_markers', {})
 
-    def detect_markers(self, text: str) -> List[str]:
+        self._automaton = AhoCorasick()
+        # Per pattern id: (category, marker as configured)
+        self._pattern_info: List[Tuple[str, str]] = []
+        self._known: set = set()
+
+        for key, category in self.MARKER_CATEGORIES.items():
+            self.add_markers(category, self.markers.get(key, []) or [])
+
+        for key, paths in (self.markers.get('lexicon_files') or {}).items():
+            category = self.MARKER_CATEGORIES.get(key, key)
+            for path in paths:
+                self.load_lexicon(path, category)
+
+    def add_markers(self, category: str, markers: List[str]) -> int:
         """
-        Detect Catalan markers in text.
+        Add markers to a category. Returns how many were new.
+
+        Marker names are reported in the order markers were added.
+        """
+        added = 0
+        for marker in markers:
+            pattern = marker.strip().lower()
+            if not pattern or (category, pattern) in self._known:
+                continue
+
+            self._known.add((category, pattern))
+            self._automaton.add(pattern)
+            self._pattern_info.append((category, marker.strip()))
+            added += 1
+
+        return added
+
+    def load_lexicon(self, path: str, category: str = 'lexical') -> int:
+        """
+        Load markers from a text file, one per line ('#' starts a comment).
 
-        Returns list of found markers.
+        Returns the number of new markers added.
         """
-        found_markers = []
+        with open(path, 'r', encoding='utf-8') as f:
+            markers = [line.split('#', 1)[0] for line in f]
+
+        added = self.add_markers(category, markers)
+        logger.info(f"Loaded {added} {category} markers from {path}")
+        return added
+
+    @staticmethod
+    def _lower_aligned(text: str) -> str:
+        """Lowercase text without changing its length, so offsets line up."""
         text_lower = text.lower()
+        if len(text_lower) == len(text):
+            return text_lower
+        return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
 
-        # Check lexical borrowings
-        for marker in self.markers.get('lexical_borrowings', []):
-            if marker.lower() in text_lower:
-                found_markers.append(f"lexical:{marker}")
+    def find_markers(self, text: str) -> List[MarkerMatch]:
+        """
+        Find every whole-word occurrence of a marker in text.
 
-        # Check syntactic patterns
-        for pattern in self.markers.get('syntactic_patterns', []):
-            if pattern.lower() in text_lower:
-                found_markers.append(f"syntactic:{pattern}")
+        Returns matches ordered by position.
+        """
+        matches = []
+        for start, end, pattern_id in self._automaton.iter_word_matches(self._lower_aligned(text)):
+            category, marker = self._pattern_info[pattern_id]
+            matches.append(MarkerMatch(
+                name=f"{category}:{marker}",
+                category=category,
+                marker=marker,
+                start=start,
+                end=end
+            ))
+
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return matches
 
-        return found_markers
+    def detect_markers(self, text: str) -> List[str]:
+        """
+        Detect Catalan markers in text.
+
+        Returns list of found markers (each reported once, in config order).
+        """
+        found = {
+            pattern_id
+            for _, _, pattern_id in self._automaton.iter_word_matches(self._lower_aligned(text))
+        }
+
+        return [
+            f"{category}:{marker}"
+            for category, marker in (self._pattern_info[i] for i in sorted(found))
+        ]
 
     def calculate_catalan_score(self, text: str) -> float:
         """
@@ -345,59 +729,168 @@ class CatalanMarkerDetector:
         return score
 
 
+# Per-process extractor state, built once per worker by _init_extract_worker
+_worker_parser: Optional[SubtitleParser] = None
+_worker_detector: Optional[CatalanMarkerDetector] = None
+
+
+def _init_extract_worker(config_path: str):
+    """Load the parser and marker detector once in each worker process."""
+    global _worker_parser, _worker_detector
+    _worker_parser = SubtitleParser(config_path)
+    _worker_detector = CatalanMarkerDetector(config_path)
+
+
+def _extract_file(
+    parser: SubtitleParser,
+    marker_detector: CatalanMarkerDetector,
+    srt_file: str,
+    encoding_hint: Optional[Tuple[str, str]] = None
+) -> Tuple[DialogStore, SubtitleSource]:
+    """
+    Extract dialogs from one SRT file, merge them into segments if
+    configured, and tag their Catalan markers.
+    """
+    source = parser.read_srt_file(srt_file, encoding_hint)
+    store = DialogStore()
+    try:
+        parser.extract_to_store(srt_file, store, source=source)
+    finally:
+        # Unmap the file; only its hash and encoding go back from workers
+        source.close()
+
+    if parser.merge_consecutive:
+        store = parser.merge_store(store)
+
+    for dialog in store:
+        dialog.catalan_markers = marker_detector.detect_markers(dialog.text)
+
+    return store, source
+
+
+def _extract_file_worker(
+    task: Tuple[str, Optional[Tuple[str, str]]]
+) -> Tuple[DialogStore, SubtitleSource]:
+    """Process pool entry point for _extract_file."""
+    srt_file, encoding_hint = task
+    return _extract_file(_worker_parser, _worker_detector, srt_file, encoding_hint)
+
+
+def _iter_extracted(
+    tasks: List[Tuple[str, Optional[Tuple[str, str]]]],
+    config_path: str,
+    workers: int
+) -> Iterator[Tuple[DialogStore, SubtitleSource]]:
+    """Yield the results of each (srt_file, encoding_hint) task in order."""
+    if workers > 1 and len(tasks) > 1:
+        workers = min(workers, len(tasks))
+        logger.info(f"Extracting with {workers} worker processes")
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_extract_worker,
+            initargs=(config_path,)
+        ) as executor:
+            # map() yields results in submission order, keeping the merge deterministic
+            chunksize = max(1, len(tasks) // (workers * 4))
+            yield from executor.map(_extract_file_worker, tasks, chunksize=chunksize)
+    else:
+        parser = SubtitleParser(config_path)
+        marker_detector = CatalanMarkerDetector(config_path)
+
+        for srt_file, encoding_hint in tasks:
+            yield _extract_file(parser, marker_detector, srt_file, encoding_hint)
+
+
 def batch_extract_dialogs(
     srt_directory: str,
-    output_file: str = "data/processed/all_dialogs.json",
-    config_path: str = "config/settings.yaml"
-) -> List[DialogEntry]:
+    output_file: str = "data/processed/all_dialogs.jsonl",
+    config_path: str = "config/settings.yaml",
+    workers: int = 1,
+    output_format: Optional[str] = None,
+    incremental: bool = False
+) -> int:
     """
     Extract dialogs from all SRT files in a directory.
 
+    Files are processed in sorted order. With workers > 1 they are sharded
+    across a process pool and the results merged back in file order, so the
+    output is identical to the serial path. Dialogs are streamed to disk as
+    each file finishes, so memory does not grow with the corpus.
+
+    With incremental=True, an extraction manifest next to the output records
+    each file's size, mtime and content hash. Unchanged files reuse their
+    cached dialogs, only new or changed files are parsed, and files that
+    disappeared from the directory drop out of the output.
+
     Args:
         srt_directory: Directory containing SRT files
         output_file: Path to save extracted dialogs
         config_path: Path to configuration file
+        workers: Number of worker processes (1 = serial)
+        output_format: 'jsonl' or legacy 'json' array (default: from extension)
+        incremental: Skip files unchanged since the previous run
 
     Returns:
-        List of all extracted DialogEntry objects
+        Number of dialogs written
     """
-    parser = SubtitleParser(config_path)
-    marker_detector = CatalanMarkerDetector(config_path)
-
     srt_dir = Path(srt_directory)
-    all_dialogs = []
 
-    # Find all SRT files
-    srt_files = list(srt_dir.glob("*.srt"))
+    # Find all SRT files (sorted so output order doesn't depend on the filesystem)
+    srt_files = sorted(str(f) for f in srt_dir.glob("*.srt"))
     logger.info(f"Found {len(srt_files)} SRT files in {srt_directory}")
 
-    for srt_file in srt_files:
-        # Extract dialogs
-        dialogs = parser.extract_dialogs(str(srt_file))
+    manifest = None
+    pending = srt_files
 
-        # Detect Catalan markers
-        for dialog in dialogs:
-            dialog.catalan_markers = marker_detector.detect_markers(dialog.text)
+    if incremental:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
 
-        all_dialogs.extend(dialogs)
+        manifest = ExtractionManifest(output_file, config)
+        removed = manifest.prune(srt_files)
+        pending = [f for f in srt_files if manifest.lookup(f) is None]
+        manifest.cache_dir.mkdir(parents=True, exist_ok=True)
 
-    # Optionally merge consecutive dialogs
-    # all_dialogs = parser.merge_consecutive_dialogs(all_dialogs)
+        logger.info(
+            f"Incremental extraction: {len(pending)} new/changed, "
+            f"{len(srt_files) - len(pending)} unchanged, {removed} removed"
+        )
 
-    # Save to file
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Encodings detected on previous runs let re-extracted files skip sniffing
+    tasks = [(f, manifest.encoding_hint(f) if manifest else None) for f in pending]
+    pending_files = set(pending)
+    extracted = _iter_extracted(tasks, config_path, workers)
+
+    with DialogWriter(output_file, output_format) as writer:
+        for srt_file in srt_files:
+            if srt_file not in pending_files:
+                # Unchanged since the last run: copy its cached dialogs
+                with open(manifest.shard_path(srt_file), 'r', encoding='utf-8') as shard:
+                    for line in shard:
+                        writer.write_encoded(line)
+                continue
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(
-            [d.to_dict() for d in all_dialogs],
-            f,
-            ensure_ascii=False,
-            indent=2
-        )
+            store, source = next(extracted)
+            records = list(store.iter_dicts())
+            writer.write_many(records)
+
+            if manifest is not None:
+                with DialogWriter(str(manifest.shard_path(srt_file)), 'jsonl') as shard:
+                    shard.write_many(records)
+                manifest.update(
+                    srt_file, source.sha1, len(records),
+                    encoding=source.encoding
+                )
+
+    # Shut down the worker pool (if any) now that every result is consumed
+    extracted.close()
+
+    if manifest is not None:
+        manifest.save()
 
-    logger.info(f"Saved {len(all_dialogs)} dialogs to {output_file}")
-    return all_dialogs
+    logger.info(f"Saved {writer.count} dialogs to {output_file} ({writer.output_format})")
+    return writer.count
 
 
 if __name__ == "__main__":
@@ -417,4 +910,4 @@ if __name__ == "__main__":
                 print(f"  Markers: {d.catalan_markers}")
     else:
         # Batch process
-        batch_extract_dialogs("data/raw", "data/processed/all_dialogs.json")
+        batch_extract_dialogs("data/raw", "data/processed/all_dialogs.jsonl")
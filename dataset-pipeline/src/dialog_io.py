@@ -0,0 +1,189 @@
+"""
+Dialog I/O Module
+Streaming readers and writers for extracted/classified dialog files.
+
+Two on-disk formats are supported:
+- jsonl: one JSON object per line (default; streamable, compact)
+- json:  a single pretty-printed JSON array (legacy format)
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIALOG_FORMATS = ('jsonl', 'json')
+
+# Read size for the incremental legacy-array parser
+_READ_CHUNK_SIZE = 1 << 20
+
+
+def detect_format(path: str) -> str:
+    """
+    Infer the dialog file format.
+
+    Uses the file extension when it is '.json' or '.jsonl'; otherwise peeks
+    at the first non-whitespace character of an existing file ('[' = json).
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == '.jsonl':
+        return 'jsonl'
+    if suffix == '.json':
+        return 'json'
+
+    if Path(path).exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            while True:
+                char = f.read(1)
+                if not char or not char.isspace():
+                    break
+        if char == '[':
+            return 'json'
+
+    return 'jsonl'
+
+
+class DialogWriter:
+    """
+    Writes dialog records to disk one at a time.
+
+    The 'json' format streams a legacy array whose bytes are identical to
+    json.dump(records, f, ensure_ascii=False, indent=2).
+    """
+
+    def __init__(self, output_file: str, output_format: Optional[str] = None,
+                 resume_offset: Optional[int] = None, resume_count: int = 0):
+        """
+        Args:
+            output_file: Path to write
+            output_format: 'jsonl' or 'json' (default: from the extension)
+            resume_offset: Continue an existing file, truncated to this many
+                bytes (an offset returned by flush())
+            resume_count: Records in the file up to resume_offset
+        """
+        self.output_format = output_format or detect_format(output_file)
+        if self.output_format not in DIALOG_FORMATS:
+            raise ValueError(f"Unknown dialog format: {self.output_format}")
+
+        self.output_path = Path(output_file)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if resume_offset is not None:
+            os.truncate(self.output_path, resume_offset)
+            self._file = open(self.output_path, 'a', encoding='utf-8')
+            self.count = resume_count
+        else:
+            self._file = open(self.output_path, 'w', encoding='utf-8')
+            self.count = 0
+
+    def write(self, record: Dict):
+        """Write a single dialog record."""
+        if self.output_format == 'jsonl':
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            item = json.dumps(record, ensure_ascii=False, indent=2)
+            item = '  ' + item.replace('\n', '\n  ')
+            self._file.write(('[\n' if self.count == 0 else ',\n') + item)
+
+        self.count += 1
+
+    def write_encoded(self, line: str):
+        """Write a record already encoded as a JSONL line (copied as-is for jsonl)."""
+        if self.output_format == 'jsonl':
+            self._file.write(line if line.endswith('\n') else line + '\n')
+            self.count += 1
+        else:
+            self.write(json.loads(line))
+
+    def write_many(self, records: Iterable[Dict]):
+        """Write several dialog records."""
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> int:
+        """Flush written records to disk; returns the file size in bytes."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        """Finish the file (closing the array for the json format)."""
+        if self._file.closed:
+            return
+
+        if self.output_format == 'json':
+            self._file.write('\n]' if self.count else '[]')
+
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _iter_json_array(f) -> Iterator[Dict]:
+    """Incrementally decode the items of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in ',['):
+            if buffer[pos] == '[':
+                if started:
+                    break
+                started = True
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        if pos < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Item may be cut off at the chunk boundary; read more
+                if eof:
+                    raise
+            else:
+                yield item
+                pos = end
+                continue
+
+        if eof:
+            return
+
+        chunk = f.read(_READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_dialogs(path: str, input_format: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream dialog records from a jsonl or legacy json file.
+
+    Only one record is held in memory at a time (plus a read buffer).
+    """
+    input_format = input_format or detect_format(path)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if input_format == 'json':
+            yield from _iter_json_array(f)
+            return
+
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping malformed line {line_number} in {path}: {e}")
@@ -0,0 +1,514 @@
+"""
+Dialog Store Module
+Compact columnar storage for extracted dialogs.
+
+A DialogEntry per line costs several Python objects (strings, timedeltas,
+context lists), and each context line is stored again for every dialog
+that has it as a neighbour. DialogStore keeps the same data in flat
+columns instead:
+
+- text pool: every line stored once as UTF-8 bytes, addressed by offsets
+- start/end times as integer milliseconds
+- source file, film and marker names dictionary-encoded as integer ids
+- context as [lo, hi) index ranges into the text pool
+
+DialogView gives a DialogEntry-like (and dict-like) view of one row, so
+code that reads dialogs does not need to know about the columns.
+"""
+
+from array import array
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import json
+
+try:
+    from .srt_scanner import format_srt_timestamp, parse_srt_timestamp
+except ImportError:
+    from srt_scanner import format_srt_timestamp, parse_srt_timestamp
+
+
+# id_number of dialogs whose id is just the prefix
+NO_ID_NUMBER = -(1 << 63)
+
+
+class _StringTable:
+    """Dictionary encoding: maps each distinct value to a small integer id."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._ids: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: Any) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self._ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+
+# Fields produced by DialogEntry.to_dict(), in order
+BASE_FIELDS = (
+    'id', 'text', 'start_timestamp', 'end_timestamp', 'duration_seconds',
+    'source_file', 'film_title', 'film_year', 'context_before',
+    'context_after', 'scenario', 'scenario_confidence', 'catalan_markers',
+)
+
+
+class DialogStore:
+    """Append-only columnar store of dialogs."""
+
+    def __init__(self):
+        # Text pool
+        self._text_bytes = bytearray()
+        self._line_offsets = array('q', [0])
+
+        # Per-dialog columns
+        self._id_prefix = array('i')
+        self._id_number = array('q')
+        self._text_line = array('q')
+        self._start_ms = array('q')
+        self._end_ms = array('q')
+        self._source = array('i')
+        self._film = array('i')
+        self._before_lo = array('q')
+        self._before_hi = array('q')
+        self._after_lo = array('q')
+        self._after_hi = array('q')
+        self._scenario = array('i')
+        self._confidence = array('d')
+        # Row -> marker name ids; most dialogs have no markers
+        self._row_markers: Dict[int, Tuple[int, ...]] = {}
+        self._extras: Dict[int, str] = {}  # row -> JSON of fields outside BASE_FIELDS
+
+        # Dictionary-encoded values
+        self._id_prefixes = _StringTable()
+        self._sources = _StringTable()
+        self._films = _StringTable()        # (title, year)
+        self._scenarios = _StringTable()
+        self._markers = _StringTable()
+        self._scenarios.encode("")
+
+    def __len__(self) -> int:
+        return len(self._text_line)
+
+    def __getitem__(self, index: int) -> 'DialogView':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DialogStore index out of range")
+        return DialogView(self, index)
+
+    def __iter__(self) -> Iterator['DialogView']:
+        for index in range(len(self)):
+            yield DialogView(self, index)
+
+    @property
+    def num_lines(self) -> int:
+        """Number of lines in the text pool."""
+        return len(self._line_offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns and text pool."""
+        columns = [
+            self._line_offsets, self._id_prefix, self._id_number, self._text_line,
+            self._start_ms, self._end_ms, self._source, self._film,
+            self._before_lo, self._before_hi, self._after_lo, self._after_hi,
+            self._scenario, self._confidence,
+        ]
+        return len(self._text_bytes) + sum(c.itemsize * len(c) for c in columns)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def add_line(self, text: str) -> int:
+        """Add a line to the text pool and return its index."""
+        self._text_bytes += text.encode('utf-8')
+        self._line_offsets.append(len(self._text_bytes))
+        return len(self._line_offsets) - 2
+
+    def add_lines(self, texts: Iterable[str]) -> int:
+        """Add consecutive lines to the text pool; returns the first index."""
+        first = self.num_lines
+        for text in texts:
+            self.add_line(text)
+        return first
+
+    def line(self, line_index: int) -> str:
+        """Text of a pooled line."""
+        start = self._line_offsets[line_index]
+        end = self._line_offsets[line_index + 1]
+        return self._text_bytes[start:end].decode('utf-8')
+
+    def lines(self, lo: int, hi: int) -> List[str]:
+        """Texts of pooled lines [lo, hi)."""
+        return [self.line(i) for i in range(lo, hi)]
+
+    def append(
+        self,
+        id_prefix: str,
+        id_number: int,
+        text_line: int,
+        start_ms: int,
+        end_ms: int,
+        source_file: str,
+        film_title: str = "",
+        film_year: int = 0,
+        context_before: Tuple[int, int] = (0, 0),
+        context_after: Tuple[int, int] = (0, 0)
+    ) -> int:
+        """
+        Append a dialog whose text (and context) are already pooled.
+
+        The dialog id is f"{id_prefix}_{id_number}" (or just id_prefix when
+        id_number is NO_ID_NUMBER). Returns the row index.
+        """
+        self._id_prefix.append(self._id_prefixes.encode(id_prefix))
+        self._id_number.append(id_number)
+        self._text_line.append(text_line)
+        self._start_ms.append(start_ms)
+        self._end_ms.append(end_ms)
+        self._source.append(self._sources.encode(source_file))
+        self._film.append(self._films.encode((film_title, film_year)))
+        self._before_lo.append(context_before[0])
+        self._before_hi.append(context_before[1])
+        self._after_lo.append(context_after[0])
+        self._after_hi.append(context_after[1])
+        self._scenario.append(0)
+        self._confidence.append(0.0)
+        return len(self) - 1
+
+    def append_record(self, record: Dict) -> int:
+        """Append a dialog from its dict form (as written by to_dict)."""
+        dialog_id = str(record.get('id', ''))
+        prefix, _, suffix = dialog_id.rpartition('_')
+        if prefix and suffix.isdigit() and str(int(suffix)) == suffix:
+            id_prefix, id_number = prefix, int(suffix)
+        else:
+            id_prefix, id_number = dialog_id, NO_ID_NUMBER
+
+        text_line = self.add_line(record.get('text', ''))
+        before_lo = self.add_lines(record.get('context_before') or [])
+        after_lo = self.add_lines(record.get('context_after') or [])
+
+        index = self.append(
+            id_prefix=id_prefix,
+            id_number=id_number,
+            text_line=text_line,
+            start_ms=parse_srt_timestamp(record.get('start_timestamp') or '00:00:00,000'),
+            end_ms=parse_srt_timestamp(record.get('end_timestamp') or '00:00:00,000'),
+            source_file=record.get('source_file', ''),
+            film_title=record.get('film_title', ''),
+            film_year=record.get('film_year', 0),
+            context_before=(before_lo, after_lo),
+            context_after=(after_lo, self.num_lines)
+        )
+
+        self.set_classification(
+            index,
+            record.get('scenario', ''),
+            record.get('scenario_confidence', 0.0)
+        )
+        self.set_markers(index, record.get('catalan_markers') or [])
+
+        extras = {k: v for k, v in record.items() if k not in BASE_FIELDS}
+        if extras:
+            self._extras[index] = json.dumps(extras, ensure_ascii=False)
+
+        return index
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'DialogStore':
+        """Build a store from dialog dicts (e.g. dialog_io.iter_dialogs)."""
+        store = cls()
+        for record in records:
+            store.append_record(record)
+        return store
+
+    def extend(self, other: 'DialogStore'):
+        """Append every dialog of another store (e.g. from a worker process)."""
+        line_base = self.num_lines
+        byte_base = len(self._text_bytes)
+        self._text_bytes += other._text_bytes
+        self._line_offsets.extend(o + byte_base for o in other._line_offsets[1:])
+
+        row_base = len(self)
+        for i in range(len(other)):
+            self.append(
+                id_prefix=other._id_prefixes.values[other._id_prefix[i]],
+                id_number=other._id_number[i],
+                text_line=other._text_line[i] + line_base,
+                start_ms=other._start_ms[i],
+                end_ms=other._end_ms[i],
+                source_file=other._sources.values[other._source[i]],
+                film_title=other._films.values[other._film[i]][0],
+                film_year=other._films.values[other._film[i]][1],
+                context_before=(other._before_lo[i] + line_base, other._before_hi[i] + line_base),
+                context_after=(other._after_lo[i] + line_base, other._after_hi[i] + line_base)
+            )
+            self.set_classification(row_base + i, other.scenario(i), other._confidence[i])
+            self.set_markers(row_base + i, other.markers(i))
+
+        for index, extras in other._extras.items():
+            self._extras[row_base + index] = extras
+
+    def time_columns(self) -> Tuple[array, array, array]:
+        """The start_ms, end_ms and source id columns (shared, not copied)."""
+        return self._start_ms, self._end_ms, self._source
+
+    def merge_groups(self, group_starts: Iterable[int]) -> 'DialogStore':
+        """
+        Return a new store where each run of consecutive rows becomes one row.
+
+        group_starts are the ascending first rows of each run (starting at 0).
+        A merged row keeps the first row's id, start and context_before, the
+        last row's end and context_after, and the texts joined by spaces.
+        Classification and markers are not carried over.
+        """
+        merged = DialogStore()
+        # Context ranges keep pointing into the same pool lines
+        merged._text_bytes = bytearray(self._text_bytes)
+        merged._line_offsets = array('q', self._line_offsets)
+
+        bounds = list(group_starts) + [len(self)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            last = hi - 1
+            if lo == last:
+                text_line = self._text_line[lo]
+            else:
+                text_line = merged.add_line(' '.join(self.text(i) for i in range(lo, hi)))
+
+            film_title, film_year = self.film(lo)
+            merged.append(
+                id_prefix=self._id_prefixes.values[self._id_prefix[lo]],
+                id_number=self._id_number[lo],
+                text_line=text_line,
+                start_ms=self._start_ms[lo],
+                end_ms=self._end_ms[last],
+                source_file=self.source_file(lo),
+                film_title=film_title,
+                film_year=film_year,
+                context_before=(self._before_lo[lo], self._before_hi[lo]),
+                context_after=(self._after_lo[last], self._after_hi[last])
+            )
+
+        return merged
+
+    # ------------------------------------------------------------------
+    # Mutable per-dialog fields
+    # ------------------------------------------------------------------
+
+    def set_classification(self, index: int, scenario: str, confidence: float):
+        self._scenario[index] = self._scenarios.encode(scenario)
+        self._confidence[index] = confidence
+
+    def set_markers(self, index: int, markers: List[str]):
+        if markers:
+            self._row_markers[index] = tuple(self._markers.encode(m) for m in markers)
+        else:
+            self._row_markers.pop(index, None)
+
+    # ------------------------------------------------------------------
+    # Column accessors
+    # ------------------------------------------------------------------
+
+    def dialog_id(self, index: int) -> str:
+        prefix = self._id_prefixes.values[self._id_prefix[index]]
+        number = self._id_number[index]
+        return prefix if number == NO_ID_NUMBER else f"{prefix}_{number}"
+
+    def text(self, index: int) -> str:
+        return self.line(self._text_line[index])
+
+    def start_ms(self, index: int) -> int:
+        return self._start_ms[index]
+
+    def end_ms(self, index: int) -> int:
+        return self._end_ms[index]
+
+    def source_file(self, index: int) -> str:
+        return self._sources.values[self._source[index]]
+
+    def film(self, index: int) -> Tuple[str, int]:
+        return self._films.values[self._film[index]]
+
+    def context_before(self, index: int) -> List[str]:
+        return self.lines(self._before_lo[index], self._before_hi[index])
+
+    def context_after(self, index: int) -> List[str]:
+        return self.lines(self._after_lo[index], self._after_hi[index])
+
+    def scenario(self, index: int) -> str:
+        return self._scenarios.values[self._scenario[index]]
+
+    def confidence(self, index: int) -> float:
+        return self._confidence[index]
+
+    def markers(self, index: int) -> List[str]:
+        return [self._markers.values[m] for m in self._row_markers.get(index, ())]
+
+    def extras(self, index: int) -> Dict:
+        extras = self._extras.get(index)
+        return json.loads(extras) if extras else {}
+
+    def to_dict(self, index: int) -> Dict:
+        """Dict form of a dialog, identical to DialogEntry.to_dict()."""
+        start_ms = self._start_ms[index]
+        end_ms = self._end_ms[index]
+        film_title, film_year = self.film(index)
+
+        record = {
+            "id": self.dialog_id(index),
+            "text": self.text(index),
+            "start_timestamp": format_srt_timestamp(start_ms),
+            "end_timestamp": format_srt_timestamp(end_ms),
+            "duration_seconds": (end_ms - start_ms) / 1000,
+            "source_file": self.source_file(index),
+            "film_title": film_title,
+            "film_year": film_year,
+            "context_before": self.context_before(index),
+            "context_after": self.context_after(index),
+            "scenario": self.scenario(index),
+            "scenario_confidence": self._confidence[index],
+            "catalan_markers": self.markers(index)
+        }
+        record.update(self.extras(index))
+        return record
+
+    def iter_dicts(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.to_dict(index)
+
+
+class DialogView:
+    """
+    DialogEntry-like view of one row in a DialogStore.
+
+    Supports attribute access (view.text, view.start_timestamp, ...),
+    assignment of markers and classification, and read-only dict-style
+    access (view['text'], view.get('scenario')) over the to_dict() fields.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: DialogStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self) -> str:
+        return self.store.dialog_id(self.index)
+
+    @property
+    def text(self) -> str:
+        return self.store.text(self.index)
+
+    @property
+    def start_time(self) -> timedelta:
+        return timedelta(milliseconds=self.store.start_ms(self.index))
+
+    @property
+    def end_time(self) -> timedelta:
+        return timedelta(milliseconds=self.store.end_ms(self.index))
+
+    @property
+    def start_timestamp(self) -> str:
+        return format_srt_timestamp(self.store.start_ms(self.index))
+
+    @property
+    def end_timestamp(self) -> str:
+        return format_srt_timestamp(self.store.end_ms(self.index))
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.store.end_ms(self.index) - self.store.start_ms(self.index)) / 1000
+
+    @property
+    def source_file(self) -> str:
+        return self.store.source_file(self.index)
+
+    @property
+    def film_title(self) -> str:
+        return self.store.film(self.index)[0]
+
+    @property
+    def film_year(self) -> int:
+        return self.store.film(self.index)[1]
+
+    @property
+    def context_before(self) -> List[str]:
+        return self.store.context_before(self.index)
+
+    @property
+    def context_after(self) -> List[str]:
+        return self.store.context_after(self.index)
+
+    @property
+    def scenario(self) -> str:
+        return self.store.scenario(self.index)
+
+    @scenario.setter
+    def scenario(self, value: str):
+        self.store.set_classification(self.index, value, self.scenario_confidence)
+
+    @property
+    def scenario_confidence(self) -> float:
+        return self.store.confidence(self.index)
+
+    @scenario_confidence.setter
+    def scenario_confidence(self, value: float):
+        self.store.set_classification(self.index, self.scenario, value)
+
+    @property
+    def catalan_markers(self) -> List[str]:
+        return self.store.markers(self.index)
+
+    @catalan_markers.setter
+    def catalan_markers(self, value: List[str]):
+        self.store.set_markers(self.index, value)
+
+    def to_dict(self) -> Dict:
+        return self.store.to_dict(self.index)
+
+    def entry_fields(self) -> Dict:
+        """Keyword arguments for building an equivalent DialogEntry."""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "source_file": self.source_file,
+            "film_title": self.film_title,
+            "film_year": self.film_year,
+            "context_before": self.context_before,
+            "context_after": self.context_after,
+            "scenario": self.scenario,
+            "scenario_confidence": self.scenario_confidence,
+            "catalan_markers": self.catalan_markers,
+        }
+
+    # Dict-style access, so code written against dialog dicts works on views
+    def __getitem__(self, key: str) -> Any:
+        if key in BASE_FIELDS:
+            return getattr(self, key)
+        extras = self.store.extras(self.index)
+        if key in extras:
+            return extras[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in BASE_FIELDS or key in self.store.extras(self.index)
+
+    def __repr__(self) -> str:
+        return f"DialogView({self.id!r}, {self.text!r})"
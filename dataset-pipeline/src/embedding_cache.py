@@ -0,0 +1,399 @@
+"""
+Embedding Cache Module
+Persistent, content-addressed cache of sentence embeddings.
+
+Most dialogs are unchanged between classify runs and many are exact
+repeats ("Hola.", "Gracias."), so their embeddings are kept on disk and
+only new texts go through the model. Entries are keyed by a hash of the
+normalized text, with one cache directory per model:
+
+    <cache dir>/<model>/embeddings.f16   float16 matrix, one row per text (memory-mapped)
+    <cache dir>/<model>/index.npz        text hash -> row, plus last-use clock per row
+    <cache dir>/<model>/meta.json        model name, dimension, capacity, clock
+
+The cache holds at most max_entries embeddings; when it is full the least
+recently used rows are evicted and reused. An open cache holds an exclusive
+lock on <cache dir>/<model>/lock, so it never has two writers (e.g. a
+classify run and the classifier service).
+
+Scenario prototypes (mean embeddings of the scenario examples) are cached
+the same way, one file per model, model revision and example set:
+
+    <prototype dir>/<model>/<revision>-<examples hash>.npy   float32, one row per scenario
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key or file format changes
+CACHE_VERSION = 1
+
+# Fraction of capacity freed at once when the cache is full, so the
+# index is rewritten rarely
+_EVICT_FRACTION = 0.1
+
+# Rows moved per copy when a cache is shrunk to a lower max_entries
+_SHRINK_CHUNK = 65536
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def normalize_text(text: str) -> str:
+    """Text as embedded and hashed: NFC, whitespace collapsed and trimmed."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def text_key(normalized: str) -> int:
+    """64-bit content hash of normalized text."""
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def examples_hash(examples: Dict[str, List[str]]) -> str:
+    """Hash of the scenario examples the prototypes were built from."""
+    payload = json.dumps(examples, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def model_revision(model) -> str:
+    """
+    Revision (commit hash) of a loaded sentence-transformers model, or
+    'unknown' if it was not loaded from a Hugging Face snapshot.
+    """
+    card = getattr(model, 'model_card_data', None)
+    revision = getattr(card, 'base_model_revision', None)
+    if revision:
+        return str(revision)
+
+    try:
+        model_path = Path(model[0].auto_model.config._name_or_path)
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return 'unknown'
+    if model_path.parent.name == 'snapshots':
+        return model_path.name
+    return 'unknown'
+
+
+def _prototype_path(cache_dir: str, model_name: str, revision: str,
+                    examples: Dict[str, List[str]]) -> Path:
+    name = f"{_UNSAFE_PATH_CHARS.sub('_', revision)}-{examples_hash(examples)[:16]}.npy"
+    return Path(cache_dir) / _UNSAFE_PATH_CHARS.sub('_', model_name) / name
+
+
+def load_prototypes(
+    cache_dir: str,
+    model_name: str,
+    revision: str,
+    examples: Dict[str, List[str]]
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Cached scenario prototypes (memory-mapped), in the order of examples,
+    or None if they are not cached.
+    """
+    path = _prototype_path(cache_dir, model_name, revision, examples)
+    try:
+        matrix = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    # Rows are stored in sorted scenario order, which the hash doesn't depend on
+    rows = {scenario: i for i, scenario in enumerate(sorted(examples))}
+    if matrix.ndim != 2 or matrix.shape[0] != len(rows):
+        logger.warning(f"Ignoring malformed prototype cache {path}")
+        return None
+
+    logger.info(f"Loaded scenario prototypes from {path}")
+    return {scenario: matrix[rows[scenario]] for scenario in examples}
+
+
+def save_prototypes(
+    cache_dir: str,
+    model_name: str,
+    revision: str,
+    examples: Dict[str, List[str]],
+    prototypes: Dict[str, np.ndarray]
+):
+    """Cache scenario prototypes for load_prototypes()."""
+    path = _prototype_path(cache_dir, model_name, revision, examples)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    matrix = np.stack([prototypes[scenario] for scenario in sorted(examples)]).astype(np.float32)
+
+    # Per-process temporary name: classify workers may save at the same time
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, matrix)
+    os.replace(tmp_path, path)
+
+
+class CacheLockedError(RuntimeError):
+    """Raised when an embedding cache is already open elsewhere."""
+
+
+class EmbeddingCache:
+    """
+    Disk-backed float16 embedding cache for one model.
+
+    Call get() with text keys to look up cached rows, put() to add newly
+    computed embeddings, and save() (or close()) to persist the index.
+    Embeddings come back as float32 rounded through float16.
+
+    Raises CacheLockedError if the cache is already open (in this or
+    another process) until that one is closed.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int, max_entries: int = 2000000):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.directory = Path(cache_dir) / _UNSAFE_PATH_CHARS.sub('_', model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = self._lock()
+
+        self._matrix_path = self.directory / 'embeddings.f16'
+        self._index_path = self.directory / 'index.npz'
+        self._meta_path = self.directory / 'meta.json'
+
+        # text key -> row; per row: its key and the clock when last used
+        self._rows: Dict[int, int] = {}
+        self._row_keys = np.zeros(0, dtype=np.uint64)
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._free: List[int] = []
+        self._num_rows = 0
+        self._clock = 0
+        self._matrix: Optional[np.memmap] = None
+        self._dirty = False
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _lock(self):
+        """Take the cache directory's lock (held until close())."""
+        lock_file = open(self.directory / 'lock', 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise CacheLockedError(
+                    f"Embedding cache {self.directory} is in use (by another classify "
+                    f"run or the classifier service)"
+                )
+        return lock_file
+
+    def _load(self):
+        """Open the cache on disk, starting empty if it is missing or stale."""
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            index = np.load(self._index_path)
+        except (OSError, ValueError) as e:
+            if self._meta_path.exists():
+                logger.warning(f"Ignoring unreadable embedding cache {self.directory}: {e}")
+            self._reset()
+            return
+
+        if (meta.get('version') != CACHE_VERSION or meta.get('model') != self.model_name
+                or meta.get('dim') != self.dim):
+            logger.info(f"Embedding cache {self.directory} is for another model, clearing it")
+            self._reset()
+            return
+
+        capacity = meta['capacity']
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float16, mode='r+',
+                                 shape=(capacity, self.dim))
+        self._row_keys = np.zeros(capacity, dtype=np.uint64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+
+        keys, rows = index['keys'], index['rows']
+        self._row_keys[rows] = keys
+        self._last_used[rows] = index['last_used']
+        self._rows = dict(zip(keys.tolist(), rows.tolist()))
+        self._num_rows = int(meta['num_rows'])
+        self._clock = int(meta['clock'])
+
+        used = np.zeros(self._num_rows, dtype=bool)
+        used[rows] = True
+        self._free = np.flatnonzero(~used).tolist()
+
+        logger.info(f"Loaded {len(self._rows)} cached embeddings from {self.directory}")
+        if self._num_rows > self.max_entries:
+            self._shrink()
+
+    def _shrink(self):
+        """Evict down to max_entries (lowered since the cache was written)."""
+        used = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        keep = np.sort(used[np.argsort(-self._last_used[used], kind='stable')[:self.max_entries]])
+
+        # The index on disk would point at moved rows
+        self._meta_path.unlink(missing_ok=True)
+        # Kept rows move to the start of the file; keep[i] >= i, so copying
+        # in order never overwrites a row that is still to be moved
+        for start in range(0, len(keep), _SHRINK_CHUNK):
+            rows = keep[start:start + _SHRINK_CHUNK]
+            self._matrix[start:start + len(rows)] = self._matrix[rows]
+        self._row_keys[:len(keep)] = self._row_keys[keep]
+        self._last_used[:len(keep)] = self._last_used[keep]
+
+        self._rows = dict(zip(self._row_keys[:len(keep)].tolist(), range(len(keep))))
+        self._free = []
+        self._num_rows = len(keep)
+        self._resize(self.max_entries)
+        self.save()
+        logger.info(f"Shrank embedding cache {self.directory} to {len(keep)} entries")
+
+    def _reset(self):
+        # The old index would point into the rewritten matrix
+        self._meta_path.unlink(missing_ok=True)
+        self._rows = {}
+        self._free = []
+        self._num_rows = 0
+        self._clock = 0
+        self._resize(min(self.max_entries, 1024), fresh=True)
+
+    def _resize(self, capacity: int, fresh: bool = False):
+        """Resize the embedding file (and per-row arrays) to capacity rows."""
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+
+        mode = 'w+' if fresh or not self._matrix_path.exists() else 'r+'
+        if mode == 'r+':
+            with open(self._matrix_path, 'r+b') as f:
+                f.truncate(capacity * self.dim * 2)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float16, mode=mode,
+                                 shape=(capacity, self.dim))
+
+        row_keys = np.zeros(capacity, dtype=np.uint64)
+        last_used = np.zeros(capacity, dtype=np.int64)
+        if not fresh:
+            kept = min(capacity, len(self._row_keys))
+            row_keys[:kept] = self._row_keys[:kept]
+            last_used[:kept] = self._last_used[:kept]
+        self._row_keys = row_keys
+        self._last_used = last_used
+        self._dirty = True
+
+    def get(self, keys: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up text keys.
+
+        Returns:
+            (found mask, float32 embeddings of the found keys in key order)
+        """
+        self._clock += 1
+        rows = [self._rows.get(key, -1) for key in keys]
+        found = np.array([row >= 0 for row in rows], dtype=bool)
+        hit_rows = np.array([row for row in rows if row >= 0], dtype=np.int64)
+
+        if len(hit_rows):
+            self._last_used[hit_rows] = self._clock
+            self._dirty = True
+        return found, self._matrix[hit_rows].astype(np.float32)
+
+    def put(self, keys: List[int], embeddings: np.ndarray):
+        """Store embeddings for keys not yet in the cache."""
+        self._clock += 1
+        new = {}
+        for key, embedding in zip(keys, embeddings):
+            if key not in self._rows and len(new) < self.max_entries:
+                new[key] = embedding
+        if not new:
+            return
+
+        rows = self._allocate(len(new))
+        keys_array = np.fromiter(new.keys(), dtype=np.uint64, count=len(new))
+        self._matrix[rows] = np.stack(list(new.values())).astype(np.float16)
+        self._row_keys[rows] = keys_array
+        self._last_used[rows] = self._clock
+        self._rows.update(zip(new.keys(), rows.tolist()))
+        self._dirty = True
+
+    def _allocate(self, count: int) -> np.ndarray:
+        """Rows for count new entries, growing or evicting as needed."""
+        rows = self._free[-count:]
+        del self._free[len(self._free) - len(rows):]
+
+        needed = count - len(rows)
+        if needed:
+            grow = max(0, min(needed, self.max_entries - self._num_rows))
+            if self._num_rows + grow > len(self._row_keys):
+                self._resize(min(self.max_entries, max(self._num_rows + grow, 2 * len(self._row_keys))))
+            rows.extend(range(self._num_rows, self._num_rows + grow))
+            self._num_rows += grow
+            needed -= grow
+
+        if needed:
+            rows.extend(self._evict(needed))
+        return np.array(rows, dtype=np.int64)
+
+    def _evict(self, count: int) -> List[int]:
+        """Evict the least recently used rows; returns count of them for reuse."""
+        count_evicted = min(len(self._rows), max(count, int(self.max_entries * _EVICT_FRACTION)))
+        used = np.array(sorted(self._rows.values()), dtype=np.int64)
+        oldest = used[np.argpartition(self._last_used[used], count_evicted - 1)[:count_evicted]]
+
+        for row in oldest.tolist():
+            del self._rows[int(self._row_keys[row])]
+
+        # Persist the index before the evicted rows are overwritten, so an
+        # interrupted run never maps a key to another text's embedding
+        self.save()
+
+        rows = oldest.tolist()
+        self._free.extend(rows[count:])
+        logger.info(f"Evicted {len(rows)} least recently used embeddings from the cache")
+        return rows[:count]
+
+    def save(self):
+        """Flush embeddings and write the index."""
+        if not self._dirty:
+            return
+
+        self._matrix.flush()
+        rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        tmp_index = self._index_path.with_suffix('.tmp.npz')
+        np.savez(
+            tmp_index,
+            keys=self._row_keys[rows],
+            rows=rows,
+            last_used=self._last_used[rows]
+        )
+        os.replace(tmp_index, self._index_path)
+
+        meta = {
+            "version": CACHE_VERSION,
+            "model": self.model_name,
+            "dim": self.dim,
+            "capacity": len(self._row_keys),
+            "num_rows": self._num_rows,
+            "clock": self._clock,
+        }
+        tmp_meta = self._meta_path.with_suffix('.tmp')
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_meta, self._meta_path)
+        self._dirty = False
+
+    def close(self):
+        """Save and unmap the cache, and release its lock."""
+        if self._matrix is not None:
+            self.save()
+            self._matrix = None
+        self._lock_file.close()
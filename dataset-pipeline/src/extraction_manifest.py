@@ -0,0 +1,190 @@
+"""
+Extraction Manifest Module
+Tracks which SRT files have already been extracted so repeat runs only
+re-process files that were added or changed.
+
+Each source file gets an entry keyed by path with its size, mtime and
+content hash, the character encoding detected when it was decoded, and a
+shard file holding its extracted dialogs as JSONL.
+The manifest also stores a hash of the config keys that affect
+extraction (and of the contents of any marker lexicon files); if those
+change, every file is extracted again.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes for the same input and config
+MANIFEST_VERSION = 3
+
+# processing keys read by SubtitleParser (the rest of the section is
+# classification settings)
+PROCESSING_KEYS = (
+    'min_dialog_length',
+    'max_dialog_length',
+    'context_lines',
+    'context_mode',
+    'context_window_seconds',
+    'merge_consecutive',
+    'max_gap_seconds',
+)
+
+
+def hash_file(filepath: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_config(config: Dict) -> str:
+    """
+    Stable hash of the config that affects extraction: the processing keys
+    the parser reads, the catalan_markers section, and the contents of its
+    lexicon files.
+    """
+    processing = config.get('processing') or {}
+    markers = config.get('catalan_markers') or {}
+
+    lexicons = {}
+    for paths in (markers.get('lexicon_files') or {}).values():
+        for path in paths:
+            lexicons[path] = hash_file(path) if os.path.exists(path) else None
+
+    sections = {
+        'processing': {key: processing.get(key) for key in PROCESSING_KEYS},
+        'catalan_markers': markers,
+        'lexicons': lexicons,
+    }
+    payload = json.dumps(sections, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ExtractionManifest:
+    """Per-file record of previous extractions, stored next to the output."""
+
+    def __init__(self, output_file: str, config: Dict):
+        output_path = Path(output_file)
+        self.path = output_path.with_name(output_path.stem + '.manifest.json')
+        self.cache_dir = output_path.with_name(output_path.stem + '.cache')
+        self.config_hash = hash_config(config)
+        self.entries: Dict[str, Dict] = {}
+        # Entries from the manifest on disk, kept even when invalidated
+        self._previous: Dict[str, Dict] = {}
+
+        self._load()
+
+    def _load(self):
+        """Load the manifest, discarding it if the config or version changed."""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+
+        self._previous = data.get('files', {})
+
+        if data.get('version') != MANIFEST_VERSION:
+            logger.info("Extraction manifest version changed, re-extracting all files")
+            self.clear()
+        elif data.get('config_hash') != self.config_hash:
+            logger.info("Extraction config changed, re-extracting all files")
+            self.clear()
+        else:
+            self.entries = dict(self._previous)
+
+    def clear(self):
+        """Forget all entries and delete their shards."""
+        self.entries = {}
+
+        if self.cache_dir.exists():
+            for shard in self.cache_dir.glob('*.jsonl'):
+                shard.unlink()
+
+    def shard_path(self, filepath: str) -> Path:
+        """Shard file holding the extracted dialogs for a source file."""
+        name = hashlib.sha1(filepath.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{name}.jsonl"
+
+    def lookup(self, filepath: str) -> Optional[Dict]:
+        """
+        Return the entry for a file if it is unchanged since the last run.
+
+        Size and mtime are checked first; the content hash is only computed
+        when the mtime moved (e.g. the file was re-downloaded unchanged).
+        """
+        entry = self.entries.get(filepath)
+        if entry is None or not self.shard_path(filepath).exists():
+            return None
+
+        stat = os.stat(filepath)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return entry
+
+        if hash_file(filepath) != entry['sha1']:
+            return None
+
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return entry
+
+    def encoding_hint(self, filepath: str) -> Optional[Tuple[str, str]]:
+        """(sha1, encoding) detected the last time this file was decoded."""
+        entry = self._previous.get(filepath)
+        if entry and entry.get('encoding'):
+            return entry['sha1'], entry['encoding']
+        return None
+
+    def update(self, filepath: str, content_hash: str, num_dialogs: int, **extra):
+        """Record a fresh extraction of a file."""
+        stat = os.stat(filepath)
+        self.entries[filepath] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': content_hash,
+            'dialogs': num_dialogs,
+            **extra,
+        }
+
+    def prune(self, current_files: Iterable[str]) -> int:
+        """Drop entries (and shards) for files that no longer exist."""
+        current = set(current_files)
+        removed = [path for path in self.entries if path not in current]
+
+        for path in removed:
+            self._remove_shard(path)
+            del self.entries[path]
+
+        return len(removed)
+
+    def _remove_shard(self, filepath: str):
+        shard = self.shard_path(filepath)
+        if shard.exists():
+            shard.unlink()
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'config_hash': self.config_hash,
+                'files': self.entries,
+            }, f, ensure_ascii=False, indent=2)
+
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,303 @@
+"""
+kNN Index Module
+Approximate nearest-neighbour index of labeled dialog embeddings for kNN
+scenario classification.
+
+The index is an inverted file (IVF): embeddings are partitioned by their
+nearest of nlist k-means centroids, and a query only scans the nprobe
+lists whose centroids are closest to it. Similarity is cosine (all
+vectors are stored unit length). Rows are kept sorted by list, so each
+list is one contiguous block and a batch of queries is answered with one
+matrix multiply per probed list.
+
+    <knn dir>/<model>/centroids.npy   float32 (nlist x dim)
+    <knn dir>/<model>/vectors.npy     float16 unit embeddings, one row per text
+    <knn dir>/<model>/labels.npy      scenario id per row
+    <knn dir>/<model>/lists.npy       IVF list per row
+    <knn dir>/<model>/keys.npy        normalized text hash per row
+    <knn dir>/<model>/meta.json       model, dimension, scenarios, trained size
+
+New texts are assigned to the existing lists and held as pending rows;
+they are merged into the sorted rows once, before the next search or save,
+so adding in many small batches stays linear. Once the index has grown to
+retrain_factor times the size the centroids were trained on, they are
+trained again.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Tuple
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the file format changes
+KNN_VERSION = 1
+
+# k-means training: iterations, and sample points per centroid
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 64
+
+# Rows embedded/assigned per matrix multiply
+_ASSIGN_CHUNK = 65536
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+_ARRAYS = ('vectors', 'labels', 'lists', 'keys')
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def auto_nlist(size: int) -> int:
+    """Number of IVF lists for an index of size vectors (about 4 * sqrt(size))."""
+    # k-means wants a few dozen points per centroid
+    return max(1, min(int(4 * np.sqrt(size)), size // 39))
+
+
+class IVFIndex:
+    """
+    Persistent IVF index of unit embeddings labeled with scenario ids.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        model_name: str,
+        dim: int,
+        scenario_names: List[str],
+        nlist: int = 0,
+        nprobe: int = 8,
+        retrain_factor: float = 4.0,
+        seed: int = 42
+    ):
+        """
+        Args:
+            index_dir: Directory holding one index per model
+            model_name: Embedding model (indexes of other models are not loaded)
+            dim: Embedding dimension
+            scenario_names: Scenario of each label id
+            nlist: IVF lists (0 = auto_nlist of the size when trained)
+            nprobe: Lists scanned per query
+            retrain_factor: Retrain once the index is this many times the trained size
+            seed: k-means seed
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.scenario_names = list(scenario_names)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.retrain_factor = retrain_factor
+        self.seed = seed
+        self.directory = Path(index_dir) / _UNSAFE_PATH_CHARS.sub('_', model_name)
+
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.vectors = np.zeros((0, dim), dtype=np.float16)
+        self.labels = np.zeros(0, dtype=np.int16)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.trained_size = 0
+
+        # Keys of every row (sorted or pending), for skipping known texts
+        self._key_set = set()
+        # Added rows not yet merged into the sorted arrays, per _ARRAYS name
+        self._pending = {name: [] for name in _ARRAYS}
+        self._num_pending = 0
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.labels) + self._num_pending
+
+    def _load(self):
+        """Load the index from disk if one exists for this model."""
+        try:
+            with open(self.directory / 'meta.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if (meta.get('version') != KNN_VERSION or meta.get('model') != self.model_name
+                or meta.get('dim') != self.dim):
+            logger.info(f"kNN index {self.directory} is for another model, ignoring it")
+            return
+        if meta['scenarios'] != self.scenario_names:
+            logger.warning(f"kNN index {self.directory} has other scenarios, ignoring it")
+            return
+
+        self.centroids = np.load(self.directory / 'centroids.npy')
+        for name in _ARRAYS:
+            setattr(self, name, np.load(self.directory / f'{name}.npy'))
+        self.trained_size = meta['trained_size']
+        self._key_set = set(self.keys.tolist())
+        self._update_offsets()
+        logger.info(f"Loaded kNN index of {len(self)} dialogs from {self.directory}")
+
+    def save(self):
+        """Write the index (meta.json last, so a partial write is never loaded)."""
+        self._merge_pending()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / 'meta.json').unlink(missing_ok=True)
+
+        for name in ('centroids',) + _ARRAYS:
+            tmp_path = self.directory / f'{name}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, getattr(self, name))
+            os.replace(tmp_path, self.directory / f'{name}.npy')
+
+        with open(self.directory / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": KNN_VERSION,
+                "model": self.model_name,
+                "dim": self.dim,
+                "scenarios": self.scenario_names,
+                "size": len(self),
+                "nlist": len(self.centroids),
+                "trained_size": self.trained_size,
+            }, f, indent=2)
+
+    def add(self, keys: List[int], embeddings: np.ndarray, labels: List[int]) -> int:
+        """
+        Add labeled embeddings; texts already in the index are skipped.
+
+        Args:
+            keys: Normalized text hash of each embedding (see embedding_cache.text_key)
+            embeddings: (len(keys), dim) array
+            labels: Scenario id of each embedding
+
+        Returns:
+            Number of embeddings added
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        new = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys.tolist()):
+            if key not in self._key_set:
+                self._key_set.add(key)
+                new[i] = True
+        if not new.any():
+            return 0
+
+        vectors = _unit_rows(np.asarray(embeddings)[new]).astype(np.float16)
+        labels = np.asarray(labels, dtype=np.int16)[new]
+        keys = keys[new]
+
+        size = len(self) + len(vectors)
+        if not self.trained_size or size >= self.retrain_factor * self.trained_size:
+            # Every row is reassigned, so the new ones need no list yet
+            self._merge_pending()
+            self.vectors = np.concatenate([self.vectors, vectors])
+            self.labels = np.concatenate([self.labels, labels])
+            self.keys = np.concatenate([self.keys, keys])
+            self.train()
+        else:
+            for name, rows in zip(_ARRAYS, (vectors, labels, self._assign(vectors), keys)):
+                self._pending[name].append(rows)
+            self._num_pending += len(vectors)
+        return int(new.sum())
+
+    def _merge_pending(self):
+        """Merge pending rows into the rows sorted by list."""
+        if not self._num_pending:
+            return
+        for name in _ARRAYS:
+            setattr(self, name, np.concatenate([getattr(self, name)] + self._pending[name]))
+            self._pending[name] = []
+        self._num_pending = 0
+        self._sort_rows()
+
+    def train(self):
+        """Train the centroids (spherical k-means) and reassign every row."""
+        self._merge_pending()
+        nlist = min(self.nlist or auto_nlist(len(self)), len(self))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(self), nlist * _KMEANS_SAMPLE_PER_LIST)
+        sample = self.vectors[rng.choice(len(self), sample_size, replace=False)].astype(np.float32)
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS if nlist > 1 else 0):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=nlist)
+            # Restart empty lists from random sample points
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], np.cumsum(counts)[~empty] - counts[~empty])
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _unit_rows(sums)
+
+        self.centroids = centroids
+        self.lists = self._assign(self.vectors)
+        self.trained_size = len(self)
+        self._sort_rows()
+        logger.info(f"Trained kNN index: {len(self)} dialogs in {nlist} lists")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each vector."""
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _ASSIGN_CHUNK):
+            chunk = vectors[start:start + _ASSIGN_CHUNK].astype(np.float32)
+            lists[start:start + _ASSIGN_CHUNK] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return lists
+
+    def _sort_rows(self):
+        order = np.argsort(self.lists, kind='stable')
+        for name in _ARRAYS:
+            setattr(self, name, getattr(self, name)[order])
+        self._update_offsets()
+
+    def _update_offsets(self):
+        # Rows of list l are offsets[l]:offsets[l + 1]
+        self.offsets = np.searchsorted(self.lists, np.arange(len(self.centroids) + 1)).astype(np.int64)
+
+    def search(self, queries: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k nearest neighbours (cosine) of each query.
+
+        Returns:
+            (similarities, rows), both (len(queries), k), best first; missing
+            neighbours have row -1 and similarity -inf
+        """
+        self._merge_pending()
+        queries = _unit_rows(queries)
+        best_sims = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        if not len(self) or not len(queries):
+            return best_sims, best_rows
+
+        # Lists probed by each query, then the queries probing each list
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_sims = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_sims, nprobe - 1, axis=1)[:, :nprobe].ravel()
+        order = np.argsort(probes, kind='stable')
+        probe_queries = order // nprobe
+        bounds = np.searchsorted(probes[order], np.arange(len(self.centroids) + 1))
+
+        for l in range(len(self.centroids)):
+            start, end = self.offsets[l], self.offsets[l + 1]
+            if start == end or bounds[l] == bounds[l + 1]:
+                continue
+            q = probe_queries[bounds[l]:bounds[l + 1]]
+            sims = queries[q] @ self.vectors[start:end].astype(np.float32).T
+            rows = np.broadcast_to(np.arange(start, end), sims.shape)
+            if sims.shape[1] > k:
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                sims = np.take_along_axis(sims, top, axis=1)
+                rows = top + start
+
+            # Merge with the best found so far
+            merged_sims = np.concatenate([best_sims[q], sims], axis=1)
+            merged_rows = np.concatenate([best_rows[q], rows], axis=1)
+            top = np.argpartition(-merged_sims, k - 1, axis=1)[:, :k]
+            best_sims[q] = np.take_along_axis(merged_sims, top, axis=1)
+            best_rows[q] = np.take_along_axis(merged_rows, top, axis=1)
+
+        ranking = np.argsort(-best_sims, axis=1, kind='stable')
+        return (np.take_along_axis(best_sims, ranking, axis=1),
+                np.take_along_axis(best_rows, ranking, axis=1))
@@ -6,7 +6,10 @@ Main entry point for building fine-tuning datasets from movie subtitles.
 Usage:
     python main.py download    # Download subtitles from OpenSubtitles
     python main.py extract     # Extract dialogs from downloaded SRT files
+    python main.py dedup       # Remove near-duplicate dialogs
     python main.py classify    # Classify dialogs into scenarios
+    python main.py serve       # Keep a warm classifier running for classify
+    python main.py knn-index   # Index labeled dialogs for kNN classification
     python main.py format      # Format into JSONL/CSV for training
     python main.py all         # Run full pipeline
 """
@@ -15,6 +18,7 @@ import os
 import sys
 import asyncio
 import click
+from itertools import islice
 from pathlib import Path
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
@@ -30,7 +34,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from subtitle_downloader import OpenSubtitlesClient, OPUSCorpusDownloader
 from dialog_extractor import batch_extract_dialogs, SubtitleParser
-from scenario_classifier import classify_dialogs, print_classification_report
+from dialog_io import iter_dialogs
+from deduplicator import deduplicate_dialogs, print_dedup_report
+from scenario_classifier import build_knn_index, classify_dialogs, print_classification_report
+from classifier_service import serve as serve_classifier
 from dataset_formatter import process_dataset
 
 console = Console()
@@ -184,17 +191,25 @@ def _print_download_summary(subtitles):
 
 @cli.command()
 @click.option('--input-dir', '-i', default=RAW_DATA_DIR, help='Directory with SRT files')
-@click.option('--output', '-o', default=f'{PROCESSED_DATA_DIR}/all_dialogs.json',
-              help='Output JSON file')
+@click.option('--output', '-o', default=f'{PROCESSED_DATA_DIR}/all_dialogs.jsonl',
+              help='Output dialogs file')
+@click.option('--workers', '-w', default=1, type=int,
+              help='Worker processes for extraction (1 = serial)')
+@click.option('--format', 'output_format', type=click.Choice(['jsonl', 'json']), default=None,
+              help='Output format: jsonl (streamed) or legacy json array (default: from extension)')
+@click.option('--incremental/--full', default=True,
+              help='Only re-extract SRT files that changed since the last run')
 @click.pass_context
-def extract(ctx, input_dir, output):
+def extract(ctx, input_dir, output, workers, output_format, incremental):
     """Extract dialogs from downloaded SRT files."""
     config = ctx.obj['config']
 
     console.print(Panel.fit(
         f"[bold blue]Dialog Extractor[/bold blue]\n"
         f"Input: {input_dir}\n"
-        f"Output: {output}",
+        f"Output: {output}\n"
+        f"Workers: {workers}\n"
+        f"Mode: {'incremental' if incremental else 'full'}",
         title="📝 Extract"
     ))
 
@@ -212,28 +227,80 @@ def extract(ctx, input_dir, output):
     ) as progress:
         task = progress.add_task(f"Extracting from {len(srt_files)} files...", total=None)
 
-        dialogs = batch_extract_dialogs(input_dir, output, config)
+        count = batch_extract_dialogs(
+            input_dir, output, config,
+            workers=workers,
+            output_format=output_format,
+            incremental=incremental
+        )
 
         progress.update(task, description="Done!")
 
-    console.print(f"\n✅ Extracted {len(dialogs)} dialogs to {output}")
+    console.print(f"\n✅ Extracted {count} dialogs to {output}")
 
     # Show sample
-    if dialogs:
+    if count:
         console.print("\n[bold]Sample dialogs:[/bold]")
-        for d in dialogs[:3]:
-            console.print(f"  [{d.start_timestamp}] {d.text[:60]}...")
+        for d in islice(iter_dialogs(output, output_format), 3):
+            console.print(f"  [{d['start_timestamp']}] {d['text'][:60]}...")
 
 
 @cli.command()
-@click.option('--input', '-i', default=f'{PROCESSED_DATA_DIR}/all_dialogs.json',
-              help='Input dialogs JSON')
+@click.option('--input', '-i', default=f'{PROCESSED_DATA_DIR}/all_dialogs.jsonl',
+              help='Input dialogs file (jsonl or json)')
+@click.option('--output', '-o', default=f'{PROCESSED_DATA_DIR}/unique_dialogs.jsonl',
+              help='Output file for the remaining dialogs')
+@click.option('--report', '-r', default=f'{PROCESSED_DATA_DIR}/dedup_report.json',
+              help='JSON report of the clusters removed')
+@click.pass_context
+def dedup(ctx, input, output, report):
+    """Remove near-duplicate dialogs (repeated releases, stock lines)."""
+    config = ctx.obj['config']
+
+    console.print(Panel.fit(
+        f"[bold blue]Deduplicator[/bold blue]\n"
+        f"Input: {input}\n"
+        f"Output: {output}\n"
+        f"Report: {report}",
+        title="🧹 Dedup"
+    ))
+
+    if not Path(input).exists():
+        console.print(f"[red]Error:[/red] {input} not found")
+        console.print("Run 'python main.py extract' first")
+        return
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console
+    ) as progress:
+        task = progress.add_task("Removing near-duplicates...", total=None)
+
+        result = deduplicate_dialogs(input, output, config, report)
+
+        progress.update(task, description="Done!")
+
+    console.print(f"\n✅ Kept {result['kept']} of {result['total']} dialogs in {output}")
+    print_dedup_report(result)
+
+
+@cli.command()
+@click.option('--input', '-i', default=f'{PROCESSED_DATA_DIR}/unique_dialogs.jsonl',
+              help='Input dialogs file (jsonl or json; default: the dedup output)')
 @click.option('--output', '-o', default=f'{PROCESSED_DATA_DIR}/classified_dialogs.json',
               help='Output classified JSON')
 @click.option('--semantic/--no-semantic', default=True,
               help='Use semantic classification (requires sentence-transformers)')
+@click.option('--backend', type=click.Choice(['torch', 'onnx', 'static']), default=None,
+              help='Embedding backend: torch, int8 ONNX via onnxruntime, or distilled '
+                   'static word vectors (default: from config)')
+@click.option('--workers', '-w', default=1, type=int,
+              help='Worker processes, each with its own classifier (1 = serial)')
+@click.option('--resume/--restart', default=True,
+              help='Resume an interrupted run from its checkpoint (default) or start over')
 @click.pass_context
-def classify(ctx, input, output, semantic):
+def classify(ctx, input, output, semantic, backend, workers, resume):
     """Classify dialogs into Personal & Social scenarios."""
     config = ctx.obj['config']
 
@@ -241,13 +308,15 @@ def classify(ctx, input, output, semantic):
         f"[bold blue]Scenario Classifier[/bold blue]\n"
         f"Input: {input}\n"
         f"Output: {output}\n"
-        f"Semantic: {semantic}",
+        f"Semantic: {semantic}\n"
+        f"Backend: {backend or 'from config'}\n"
+        f"Workers: {workers}",
         title="🏷️ Classify"
     ))
 
     if not Path(input).exists():
         console.print(f"[red]Error:[/red] {input} not found")
-        console.print("Run 'python main.py extract' first")
+        console.print("Run 'python main.py extract' and 'python main.py dedup' first")
         return
 
     with Progress(
@@ -257,7 +326,7 @@ def classify(ctx, input, output, semantic):
     ) as progress:
         task = progress.add_task("Classifying dialogs...", total=None)
 
-        counts = classify_dialogs(input, output, config, semantic)
+        counts = classify_dialogs(input, output, config, semantic, backend, workers, resume)
 
         progress.update(task, description="Done!")
 
@@ -265,6 +334,65 @@ def classify(ctx, input, output, semantic):
     print_classification_report(counts)
 
 
+@cli.command('knn-index')
+@click.option('--source', '-s', multiple=True,
+              help='Classified dialogs or eval_*.jsonl file to index (repeatable)')
+@click.option('--eval-sets', is_flag=True,
+              help=f'Also index the eval_*.jsonl sets in {PROCESSED_DATA_DIR}')
+@click.option('--backend', type=click.Choice(['torch', 'onnx', 'static']), default=None,
+              help='Embedding backend (default: from config)')
+@click.pass_context
+def knn_index(ctx, source, eval_sets, backend):
+    """Add labeled dialogs to the kNN classification index."""
+    config = ctx.obj['config']
+
+    sources = list(source)
+    if not sources and not eval_sets:
+        sources = [f'{PROCESSED_DATA_DIR}/classified_dialogs.json']
+    if eval_sets:
+        sources += sorted(str(p) for p in Path(PROCESSED_DATA_DIR).glob('eval_*.jsonl'))
+
+    console.print(Panel.fit(
+        f"[bold blue]kNN Index[/bold blue]\n"
+        f"Sources: {len(sources)} file(s)\n"
+        f"Backend: {backend or 'from config'}",
+        title="🧭 kNN Index"
+    ))
+
+    missing = [s for s in sources if not Path(s).exists()]
+    if missing:
+        console.print(f"[red]Error:[/red] {', '.join(missing)} not found")
+        console.print("Run 'python main.py classify' first")
+        return
+
+    added = build_knn_index(sources, config, backend)
+    console.print(f"\n✅ Added {added} dialogs to the kNN index")
+    console.print("Set classification.knn.enabled: true to classify with it")
+
+
+@cli.command()
+@click.option('--semantic/--no-semantic', default=True,
+              help='Use semantic classification (requires sentence-transformers)')
+@click.option('--backend', type=click.Choice(['torch', 'onnx', 'static']), default=None,
+              help='Embedding backend (default: from config)')
+@click.option('--host', default=None, help='Address to listen on (default: from config)')
+@click.option('--port', '-p', default=None, type=int, help='Port to listen on (default: from config)')
+@click.pass_context
+def serve(ctx, semantic, backend, host, port):
+    """Run a resident classifier that classify uses while it is up."""
+    config = ctx.obj['config']
+
+    console.print(Panel.fit(
+        f"[bold blue]Classifier Service[/bold blue]\n"
+        f"Semantic: {semantic}\n"
+        f"Backend: {backend or 'from config'}\n"
+        f"Stop with Ctrl+C",
+        title="🛰️ Serve"
+    ))
+
+    serve_classifier(config, semantic, backend, host, port)
+
+
 @cli.command()
 @click.option('--input', '-i', default=f'{PROCESSED_DATA_DIR}/classified_dialogs.json',
               help='Input classified dialogs')
@@ -296,12 +424,12 @@ def format(ctx, input, output_dir):
 @click.option('--max-subtitles', '-n', default=50, help='Maximum subtitles to download')
 @click.pass_context
 def all(ctx, max_subtitles):
-    """Run the full pipeline: download → extract → classify → format."""
+    """Run the full pipeline: download → extract → dedup → classify → format."""
     config = ctx.obj['config']
 
     console.print(Panel.fit(
         "[bold green]Full Pipeline[/bold green]\n"
-        "download → extract → classify → format",
+        "download → extract → dedup → classify → format",
         title="🚀 Complete Pipeline"
     ))
 
@@ -315,6 +443,7 @@ def all(ctx, max_subtitles):
 
     # Continue with pipeline
     ctx.invoke(extract)
+    ctx.invoke(dedup)
     ctx.invoke(classify)
     ctx.invoke(format)
 
@@ -363,7 +492,8 @@ def status():
     console.print("\n[bold]Key Files:[/bold]")
     key_files = [
         (f"{RAW_DATA_DIR}/metadata.json", "Subtitle metadata"),
-        (f"{PROCESSED_DATA_DIR}/all_dialogs.json", "Extracted dialogs"),
+        (f"{PROCESSED_DATA_DIR}/all_dialogs.jsonl", "Extracted dialogs"),
+        (f"{PROCESSED_DATA_DIR}/unique_dialogs.jsonl", "Deduplicated dialogs"),
         (f"{PROCESSED_DATA_DIR}/classified_dialogs.json", "Classified dialogs"),
         (f"{PROCESSED_DATA_DIR}/train_catalan_spanish.jsonl", "Training dataset"),
         (f"{PROCESSED_DATA_DIR}/eval_catalan_spanish.jsonl", "Evaluation dataset"),
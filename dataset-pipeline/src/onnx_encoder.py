@@ -0,0 +1,233 @@
+"""
+ONNX Encoder Module
+Quantized ONNX backend for sentence-transformer embeddings on CPU.
+
+The transformer of a sentence-transformers model is exported once to ONNX,
+quantized to int8 weights (dynamic quantization) and cached on disk with
+its tokenizer. Later runs load the cached export and run it with
+onnxruntime, pooling token embeddings in numpy the way the original model
+does. The export is checked against the PyTorch embeddings before it is
+cached.
+
+    <onnx dir>/<model>/model_int8.onnx   quantized transformer
+    <onnx dir>/<model>/tokenizer files
+    <onnx dir>/<model>/meta.json         source revision, pooling mode, normalization, dimension
+
+Requires onnxruntime and transformers; exporting also needs
+sentence-transformers and torch.
+"""
+
+import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+import logging
+import numpy as np
+
+try:
+    from .embedding_cache import model_revision
+except ImportError:
+    from embedding_cache import model_revision
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# Bump when the export or its metadata changes
+EXPORT_VERSION = 1
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for the parts of SentenceTransformer the classifier uses:
+    encode() and get_sentence_embedding_dimension().
+    """
+
+    def __init__(self, export_dir: str, intra_op_threads: int = 0):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime and transformers required for the ONNX backend")
+
+        export_path = Path(export_dir)
+        with open(export_path / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(
+            str(export_path / 'model_int8.onnx'),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(export_path))
+
+    @classmethod
+    def load_or_export(
+        cls,
+        model_name: str,
+        onnx_dir: str = "data/cache/onnx",
+        intra_op_threads: int = 0,
+        min_cosine: float = 0.98
+    ) -> 'OnnxSentenceEncoder':
+        """Load the cached int8 export of a model, exporting it first if needed."""
+        export_dir = Path(onnx_dir) / _UNSAFE_PATH_CHARS.sub('_', model_name)
+        try:
+            with open(export_dir / 'meta.json', 'r', encoding='utf-8') as f:
+                cached = json.load(f).get('version') == EXPORT_VERSION
+        except (OSError, ValueError):
+            cached = False
+
+        if not cached:
+            export_model(model_name, str(export_dir), min_cosine)
+
+        logger.info(f"Loading ONNX model from {export_dir}")
+        return cls(str(export_dir), intra_op_threads)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.meta['dim']
+
+    def encode(self, sentences: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed sentences as a (len(sentences), dim) float32 array."""
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            tokens = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.meta['max_seq_length'],
+                return_tensors='np'
+            )
+            inputs = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            token_embeddings = self.session.run(None, inputs)[0]
+            batches.append(self._pool(token_embeddings, tokens['attention_mask']))
+
+        if not batches:
+            return np.empty((0, self.meta['dim']), dtype=np.float32)
+        return np.concatenate(batches)
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Pool token embeddings into sentence embeddings (as the model's Pooling layer)."""
+        pooling = self.meta['pooling']
+        if pooling == 'cls':
+            embeddings = token_embeddings[:, 0]
+        elif pooling == 'max':
+            masked = np.where(attention_mask[..., np.newaxis] > 0, token_embeddings, -1e9)
+            embeddings = masked.max(axis=1)
+        else:
+            mask = attention_mask[..., np.newaxis].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.meta['normalize']:
+            embeddings = embeddings / np.maximum(
+                np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+            )
+        return embeddings.astype(np.float32)
+
+
+def export_model(model_name: str, export_dir: str, min_cosine: float = 0.98,
+                 check_texts: Optional[List[str]] = None):
+    """
+    Export a sentence-transformers model to int8 ONNX in export_dir.
+
+    The export is written to a temporary directory and only moved into
+    place if its embeddings of check_texts have at least min_cosine
+    similarity to the PyTorch model's.
+    """
+    try:
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError(
+            "Exporting to ONNX requires sentence-transformers, torch and onnxruntime"
+        ) from e
+
+    logger.info(f"Exporting {model_name} to int8 ONNX (one-time)")
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0]
+    pooling_module = next((m for m in st_model if type(m).__name__ == 'Pooling'), None)
+
+    pooling = 'mean'
+    if pooling_module is not None:
+        config = pooling_module.get_config_dict()
+        if config.get('pooling_mode_cls_token'):
+            pooling = 'cls'
+        elif config.get('pooling_mode_max_tokens'):
+            pooling = 'max'
+
+    meta = {
+        "version": EXPORT_VERSION,
+        "model": model_name,
+        "revision": model_revision(st_model),
+        "dim": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "pooling": pooling,
+        "normalize": any(type(m).__name__ == 'Normalize' for m in st_model),
+    }
+
+    export_path = Path(export_dir)
+    export_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=export_path.parent) as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        fp32_path = tmp_path / 'model_fp32.onnx'
+
+        dummy = st_model.tokenizer(["Hola, ¿qué tal?"], return_tensors='pt')
+        input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in dummy]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+        transformer.auto_model.eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model,
+                tuple(dummy[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=['token_embeddings'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        quantize_dynamic(str(fp32_path), str(tmp_path / 'model_int8.onnx'),
+                         weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+
+        st_model.tokenizer.save_pretrained(str(tmp_path))
+        with open(tmp_path / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        check_texts = check_texts or [
+            "¡Hola! ¿Cómo estás?", "Nos vemos mañana", "Mi madre está en casa",
+            "Lo siento mucho", "¿Quedamos el sábado para cenar?",
+            "Creo que tienes razón, pero no estoy de acuerdo con todo.",
+        ]
+        expected = st_model.encode(check_texts)
+        actual = OnnxSentenceEncoder(str(tmp_path)).encode(check_texts)
+        cosine = np.sum(expected * actual, axis=1) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+        )
+        logger.info(f"ONNX export cosine similarity to PyTorch: min {cosine.min():.4f}")
+        if cosine.min() < min_cosine:
+            raise ValueError(
+                f"int8 ONNX embeddings of {model_name} differ from PyTorch "
+                f"(min cosine {cosine.min():.4f} < {min_cosine})"
+            )
+
+        if export_path.exists():
+            shutil.rmtree(export_path)
+        tmp_path.rename(export_path)
+        # The renamed directory no longer exists for TemporaryDirectory to remove
+        tmp_path.mkdir()
+
+    logger.info(f"Saved int8 ONNX model to {export_path}")
@@ -4,16 +4,44 @@ Classifies dialog entries into Personal & Social module scenarios.
 Uses both keyword matching and semantic similarity.
 """
 
-import re
 import json
+import os
+import random
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Iterable, Iterator, Tuple, Optional
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import logging
 import yaml
 import numpy as np
 
+try:
+    from .aho_corasick import AhoCorasick
+    from .classifier_service import ClassifierClient, config_fingerprint
+    from .classify_checkpoint import ClassificationCheckpoint
+    from .dialog_io import DialogWriter, iter_dialogs
+    from .embedding_cache import (
+        CacheLockedError, EmbeddingCache, load_prototypes, model_revision, normalize_text,
+        save_prototypes, text_key
+    )
+    from .knn_index import IVFIndex
+    from .onnx_encoder import ONNX_AVAILABLE, OnnxSentenceEncoder
+    from .static_embeddings import StaticEmbeddingEncoder
+except ImportError:
+    from aho_corasick import AhoCorasick
+    from classifier_service import ClassifierClient, config_fingerprint
+    from classify_checkpoint import ClassificationCheckpoint
+    from dialog_io import DialogWriter, iter_dialogs
+    from embedding_cache import (
+        CacheLockedError, EmbeddingCache, load_prototypes, model_revision, normalize_text,
+        save_prototypes, text_key
+    )
+    from knn_index import IVFIndex
+    from onnx_encoder import ONNX_AVAILABLE, OnnxSentenceEncoder
+    from static_embeddings import StaticEmbeddingEncoder
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -26,18 +54,42 @@ except ImportError:
     logger.warning("sentence-transformers not installed. Using keyword-only classification.")
 
 
+# Embedding backends for SemanticClassifier
+BACKENDS = ("torch", "onnx", "static")
+
+# Appended to the model name for each backend's caches and kNN index, so
+# embeddings of different backends are never mixed
+BACKEND_CACHE_SUFFIXES = {"torch": "", "onnx": "-onnx-int8", "static": "-static"}
+
+
+def backend_available(backend: str) -> bool:
+    """True if the dependencies of an embedding backend are installed."""
+    if backend == "onnx":
+        # Exporting also needs sentence-transformers; a cached export does not
+        return ONNX_AVAILABLE
+    if backend == "static":
+        # numpy only once distilled (distilling needs sentence-transformers)
+        return True
+    return SEMANTIC_AVAILABLE
+
+
 @dataclass
 class ClassificationResult:
     """Result of scenario classification."""
     scenario: str
     confidence: float
-    method: str  # 'keyword', 'semantic', or 'hybrid'
+    method: str  # 'keyword', 'semantic', 'knn', or 'hybrid'
     matched_keywords: List[str]
     secondary_scenarios: List[Tuple[str, float]]  # Other possible scenarios
 
 
 class KeywordClassifier:
-    """Fast keyword-based scenario classifier."""
+    """
+    Fast keyword-based scenario classifier.
+
+    Keywords are matched as whole words by a single Aho-Corasick automaton
+    built once, so each text is scanned once however many keywords exist.
+    """
 
     def __init__(self, config_path: str = "config/settings.yaml"):
         with open(config_path, 'r') as f:
@@ -59,6 +111,54 @@ class KeywordClassifier:
                     self.keyword_to_scenario[key] = []
                 self.keyword_to_scenario[key].append(scenario_name)
 
+        # All keywords compiled into one automaton; pattern ids follow the
+        # order of keyword_to_scenario
+        self._keywords = [k for k in self.keyword_to_scenario if k]
+        self._keyword_weights = [len(k.split()) for k in self._keywords]
+        self._automaton = AhoCorasick(self._keywords)
+        self._automaton.build()
+
+        # Keyword x scenario weights for classify_corpus, and the rank at which
+        # each (keyword, scenario) pair is first seen by classify(), which
+        # breaks ties between equal scores
+        self._scenario_names = list(dict.fromkeys(
+            scenario for k in self._keywords for scenario in self.keyword_to_scenario[k]
+        ))
+        scenario_ids = {name: i for i, name in enumerate(self._scenario_names)}
+        self._keyword_scenarios = [
+            [scenario_ids[scenario] for scenario in self.keyword_to_scenario[k]]
+            for k in self._keywords
+        ]
+        max_scenarios = max((len(ids) for ids in self._keyword_scenarios), default=1)
+        self._weight_matrix = np.zeros((len(self._keywords), len(self._scenario_names)))
+        self._hit_order = np.full(self._weight_matrix.shape, np.iinfo(np.int64).max)
+        for keyword_id, ids in enumerate(self._keyword_scenarios):
+            for position, scenario_id in enumerate(ids):
+                self._weight_matrix[keyword_id, scenario_id] += self._keyword_weights[keyword_id]
+                self._hit_order[keyword_id, scenario_id] = min(
+                    self._hit_order[keyword_id, scenario_id],
+                    keyword_id * max_scenarios + position
+                )
+
+    def count_keywords(self, text_lower: str) -> Dict[int, int]:
+        """
+        Count whole-word matches of each keyword in lowercased text.
+
+        Counts are the same as len(re.findall(r'\\b' + re.escape(keyword) +
+        r'\\b', text_lower)): a keyword's occurrences are counted left to
+        right without overlapping each other. Returns {keyword id: count}.
+        """
+        counts: Dict[int, int] = {}
+        last_end: Dict[int, int] = {}
+        for start, end, keyword_id in sorted(
+            self._automaton.iter_word_matches(text_lower),
+            key=lambda match: match[0]
+        ):
+            if start >= last_end.get(keyword_id, 0):
+                counts[keyword_id] = counts.get(keyword_id, 0) + 1
+                last_end[keyword_id] = end
+        return counts
+
     def classify(self, text: str) -> ClassificationResult:
         """
         Classify text using keyword matching.
@@ -69,18 +169,15 @@ class KeywordClassifier:
         scenario_scores = defaultdict(float)
         matched_keywords = defaultdict(list)
 
-        # Count keyword matches per scenario
-        for keyword, scenarios in self.keyword_to_scenario.items():
-            # Use word boundary matching
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            matches = len(re.findall(pattern, text_lower))
-
-            if matches > 0:
-                for scenario in scenarios:
-                    # Weight longer keywords more (more specific)
-                    weight = len(keyword.split()) * matches
-                    scenario_scores[scenario] += weight
-                    matched_keywords[scenario].append(keyword)
+        # Count keyword matches per scenario (one scan of the text)
+        counts = self.count_keywords(text_lower)
+        for keyword_id in sorted(counts):
+            keyword = self._keywords[keyword_id]
+            for scenario in self.keyword_to_scenario[keyword]:
+                # Weight longer keywords more (more specific)
+                weight = self._keyword_weights[keyword_id] * counts[keyword_id]
+                scenario_scores[scenario] += weight
+                matched_keywords[scenario].append(keyword)
 
         if not scenario_scores:
             return ClassificationResult(
@@ -122,6 +219,81 @@ class KeywordClassifier:
             secondary_scenarios=secondary
         )
 
+    def classify_corpus(self, texts: List[str]) -> List[ClassificationResult]:
+        """
+        Classify many texts at once; same results as classify() on each.
+
+        Keyword counts of every text form a sparse (texts x keywords) matrix
+        in COO form, which is multiplied by the (keywords x scenarios) weight
+        matrix to score every scenario of every text in one pass; scores are
+        then normalized and ranked in numpy.
+        """
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            counts = self.count_keywords(text.lower())
+            for keyword_id in sorted(counts):
+                rows.append(row)
+                cols.append(keyword_id)
+                values.append(counts[keyword_id])
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        # COO entries are grouped by row: row r's are bounds[r]:bounds[r + 1]
+        bounds = np.searchsorted(rows, np.arange(len(texts) + 1))
+
+        num_scenarios = len(self._scenario_names)
+        scores = np.zeros((len(texts), num_scenarios))
+        first_hit = np.full((len(texts), num_scenarios), np.iinfo(np.int64).max)
+
+        if len(rows):
+            starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+            scores[rows[starts]] = np.add.reduceat(
+                self._weight_matrix[cols] * values[:, np.newaxis], starts, axis=0
+            )
+            first_hit[rows[starts]] = np.minimum.reduceat(self._hit_order[cols], starts, axis=0)
+
+        totals = scores.sum(axis=1, keepdims=True)
+        normalized = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+        # Highest confidence first; ties in the order classify() first saw them
+        ranking = np.lexsort((first_hit, -normalized), axis=1)
+
+        results = []
+        for row in range(len(texts)):
+            keyword_ids = cols[bounds[row]:bounds[row + 1]].tolist()
+            if not keyword_ids:
+                results.append(ClassificationResult(
+                    scenario="unclassified",
+                    confidence=0.0,
+                    method="keyword",
+                    matched_keywords=[],
+                    secondary_scenarios=[]
+                ))
+                continue
+
+            order = ranking[row].tolist()
+            confidences = normalized[row].tolist()
+            top = order[0]
+
+            results.append(ClassificationResult(
+                scenario=self._scenario_names[top],
+                confidence=confidences[top],
+                method="keyword",
+                matched_keywords=[
+                    self._keywords[keyword_id]
+                    for keyword_id in keyword_ids
+                    for scenario_id in self._keyword_scenarios[keyword_id]
+                    if scenario_id == top
+                ],
+                secondary_scenarios=[
+                    (self._scenario_names[s], confidences[s])
+                    for s in order[1:]
+                    if confidences[s] > 0.1
+                ]
+            ))
+
+        return results
+
 
 class SemanticClassifier:
     """
@@ -196,65 +368,315 @@ class SemanticClassifier:
         ],
     }
 
-    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
-        if not SEMANTIC_AVAILABLE:
-            raise ImportError("sentence-transformers required for SemanticClassifier")
-
-        logger.info(f"Loading sentence transformer model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        batch_size: int = 64,
+        cache_dir: Optional[str] = None,
+        cache_max_entries: int = 2000000,
+        open_cache: bool = True,
+        backend: str = "torch",
+        backend_config: Optional[Dict] = None,
+        prototype_cache_dir: Optional[str] = None,
+        knn_config: Optional[Dict] = None
+    ):
+        """
+        Args:
+            model_name: sentence-transformers model
+            batch_size: Texts per model.encode call
+            cache_dir: Directory for the persistent embedding cache (None disables it)
+            cache_max_entries: Embeddings kept in the cache
+            open_cache: Use the cache in cache_dir; when False (classify workers,
+                which can't share its files) embeddings are still rounded to its
+                float16 precision, so results are the same as with it
+            backend: 'torch' (sentence-transformers), 'onnx' (int8 ONNX export
+                run with onnxruntime, see onnx_encoder) or 'static' (distilled
+                word vectors, see static_embeddings)
+            backend_config: The backend's config section (classification.onnx
+                or classification.static)
+            prototype_cache_dir: Directory for cached scenario prototypes
+                (None computes them on every start)
+            knn_config: classification.knn section; when enabled, scenarios
+                are voted by the nearest labeled dialogs (see knn_index)
+                instead of the closest prototype
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        if not backend_available(backend):
+            raise ImportError(f"Dependencies for the {backend} embedding backend are not installed")
+
+        self.backend = backend
+        backend_config = backend_config or {}
+        if backend == "onnx":
+            self.model = OnnxSentenceEncoder.load_or_export(
+                model_name,
+                backend_config.get('path', "data/cache/onnx"),
+                intra_op_threads=backend_config.get('intra_op_threads', 0),
+                min_cosine=backend_config.get('min_cosine', 0.98)
+            )
+        elif backend == "static":
+            self.model = StaticEmbeddingEncoder.load_or_distill(
+                model_name,
+                self.SCENARIO_EXAMPLES,
+                backend_config.get('path', "data/cache/static"),
+                corpus_file=backend_config.get('corpus'),
+                vocab_size=backend_config.get('vocab_size', 100000),
+                min_count=backend_config.get('min_count', 2)
+            )
+            # Static vectors are cheaper to compute than to look up
+            cache_dir = None
+        else:
+            logger.info(f"Loading sentence transformer model: {model_name}")
+            self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+
+        # Quantized and static embeddings are cached separately from full precision ones
+        cache_name = model_name + BACKEND_CACHE_SUFFIXES[backend]
+        self.cache_name = cache_name
+        # With a cache configured, every embedding has its precision, whether
+        # it comes from the cache or not
+        self.round_embeddings = bool(cache_dir)
+        self.cache = None
+        if cache_dir and open_cache:
+            try:
+                self.cache = EmbeddingCache(
+                    cache_dir,
+                    cache_name,
+                    self.model.get_sentence_embedding_dimension(),
+                    cache_max_entries
+                )
+            except CacheLockedError as e:
+                # Results are the same without it, only slower
+                logger.warning(f"{e}; classifying without the embedding cache")
 
         # Pre-compute scenario embeddings
         self.scenario_embeddings = {}
-        for scenario, examples in self.SCENARIO_EXAMPLES.items():
-            embeddings = self.model.encode(examples)
+        if backend == "static":
+            # The full model's prototypes, stored when the table was distilled
+            self.scenario_embeddings = dict(self.model.scenario_prototypes)
+        elif prototype_cache_dir:
+            revision = (self.model.meta.get('revision', 'unknown') if backend == "onnx"
+                        else model_revision(self.model))
+            cached = load_prototypes(prototype_cache_dir, cache_name, revision, self.SCENARIO_EXAMPLES)
+            self.scenario_embeddings = cached or {}
+
+        missing = [s for s in self.SCENARIO_EXAMPLES if s not in self.scenario_embeddings]
+        for scenario in missing:
+            embeddings = self.model.encode(self.SCENARIO_EXAMPLES[scenario])
             # Use mean embedding as scenario prototype
             self.scenario_embeddings[scenario] = np.mean(embeddings, axis=0)
+        if missing and prototype_cache_dir and backend != "static":
+            save_prototypes(prototype_cache_dir, cache_name, revision,
+                            self.SCENARIO_EXAMPLES, self.scenario_embeddings)
+
+        # Unit-length prototypes, one row per scenario, so a batch's cosine
+        # similarities are a single matrix multiply
+        self.scenario_names = list(self.scenario_embeddings)
+        self.prototypes = _normalize_rows(
+            np.stack([self.scenario_embeddings[s] for s in self.scenario_names])
+        )
+
+        # kNN mode: an index of labeled dialog embeddings (main.py knn-index)
+        knn_config = knn_config or {}
+        self.knn_k = knn_config.get('k', 10)
+        self.knn_index = None
+        if knn_config.get('enabled', False):
+            self.knn_index = self.open_knn_index(knn_config)
+            if not len(self.knn_index):
+                logger.warning("kNN index is empty (build it with main.py knn-index); "
+                               "using scenario prototypes")
 
         logger.info("Semantic classifier initialized")
 
+    def open_knn_index(self, knn_config: Dict) -> IVFIndex:
+        """Load (or start) this model's kNN index."""
+        return IVFIndex(
+            knn_config.get('path', "data/cache/knn"),
+            self.cache_name,
+            self.model.get_sentence_embedding_dimension(),
+            self.scenario_names,
+            nlist=knn_config.get('nlist', 0),
+            nprobe=knn_config.get('nprobe', 8)
+        )
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Embed texts in batches, returning one row per text in input order.
+
+        Identical texts (after normalize_text) are embedded once, as their
+        first occurrence, and with a cache only texts not embedded on
+        earlier runs reach the model. Those are encoded longest first, so
+        each batch holds texts of similar length and little of the model's
+        work goes to padding. With a cache configured, embeddings are
+        float32 rounded through float16, the cache's precision.
+        """
+        batch_size = batch_size or self.batch_size
+
+        unique: Dict[str, int] = {}
+        unique_texts = []
+        positions = []
+        for text in texts:
+            normalized = normalize_text(text)
+            if normalized not in unique:
+                unique[normalized] = len(unique_texts)
+                unique_texts.append(text)
+            positions.append(unique[normalized])
+
+        embeddings = np.empty(
+            (len(unique_texts), self.model.get_sentence_embedding_dimension()),
+            dtype=np.float32
+        )
+        missing = list(range(len(unique_texts)))
+
+        if self.cache is not None:
+            keys = [text_key(normalized) for normalized in unique]
+            found, cached = self.cache.get(keys)
+            embeddings[found] = cached
+            missing = np.flatnonzero(~found).tolist()
+
+        order = sorted(missing, key=lambda i: -len(unique_texts[i]))
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            encoded = self.model.encode([unique_texts[i] for i in chunk], batch_size=len(chunk))
+            # Rounded like cache hits, so results never depend on where an
+            # embedding came from
+            embeddings[chunk] = encoded.astype(np.float16) if self.round_embeddings else encoded
+
+        if self.cache is not None and order:
+            self.cache.put([keys[i] for i in order], embeddings[order])
+
+        return embeddings[positions]
+
+    def save_cache(self):
+        """Persist the embedding cache (if any)."""
+        if self.cache is not None:
+            self.cache.save()
+
+    def close(self):
+        """Save and close the embedding cache (if any), so others can open it."""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
     def classify(self, text: str) -> ClassificationResult:
         """
         Classify text using semantic similarity.
         """
-        # Encode input text
-        text_embedding = self.model.encode([text])[0]
-
-        # Calculate similarity to each scenario
-        similarities = {}
-        for scenario, scenario_emb in self.scenario_embeddings.items():
-            # Cosine similarity
-            similarity = np.dot(text_embedding, scenario_emb) / (
-                np.linalg.norm(text_embedding) * np.linalg.norm(scenario_emb)
-            )
-            similarities[scenario] = float(similarity)
+        return self.classify_embedding(self.encode([text])[0])
 
-        # Sort by similarity
-        sorted_scenarios = sorted(
-            similarities.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+    def classify_batch(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> List[ClassificationResult]:
+        """Classify many texts, embedding them in batches (see encode())."""
+        return self.classify_embeddings(self.encode(texts, batch_size))
 
-        top_scenario = sorted_scenarios[0][0]
-        top_similarity = sorted_scenarios[0][1]
+    def classify_embedding(self, text_embedding: np.ndarray) -> ClassificationResult:
+        """
+        Classify an already-encoded text.
+        """
+        return self.classify_embeddings(text_embedding[np.newaxis])[0]
 
-        # Convert similarity to confidence (scale to 0-1)
-        # Cosine similarity ranges from -1 to 1, typically 0.3-0.8 for related text
-        confidence = max(0, min(1, (top_similarity - 0.3) / 0.5))
+    def classify_embeddings(self, embeddings: np.ndarray) -> List[ClassificationResult]:
+        """
+        Classify already-encoded texts, one per row of embeddings.
+        """
+        if self.knn_index is not None and len(self.knn_index):
+            return self.classify_knn(embeddings)
 
-        secondary = [
-            (s, max(0, min(1, (sim - 0.3) / 0.5)))
-            for s, sim in sorted_scenarios[1:4]  # Top 3 alternatives
-            if sim > 0.4
-        ]
+        # Cosine similarity of every text to every scenario
+        similarities = _normalize_rows(embeddings) @ self.prototypes.T
 
-        return ClassificationResult(
-            scenario=top_scenario,
-            confidence=confidence,
-            method="semantic",
-            matched_keywords=[],
-            secondary_scenarios=secondary
-        )
+        # Top scenario plus the top 3 alternatives, best first (ties keep
+        # scenario order)
+        k = min(4, len(self.scenario_names))
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        ranking = np.lexsort((top, -top_similarities), axis=1)
+        top = np.take_along_axis(top, ranking, axis=1)
+        top_similarities = np.take_along_axis(top_similarities, ranking, axis=1)
+
+        results = []
+        for scenario_ids, sims in zip(top.tolist(), top_similarities.tolist()):
+            # Convert similarity to confidence (scale to 0-1)
+            # Cosine similarity ranges from -1 to 1, typically 0.3-0.8 for related text
+            confidence = max(0, min(1, (sims[0] - 0.3) / 0.5))
+
+            secondary = [
+                (self.scenario_names[s], max(0, min(1, (sim - 0.3) / 0.5)))
+                for s, sim in zip(scenario_ids[1:], sims[1:])
+                if sim > 0.4
+            ]
+
+            results.append(ClassificationResult(
+                scenario=self.scenario_names[scenario_ids[0]],
+                confidence=confidence,
+                method="semantic",
+                matched_keywords=[],
+                secondary_scenarios=secondary
+            ))
+
+        return results
+
+    def classify_knn(self, embeddings: np.ndarray) -> List[ClassificationResult]:
+        """
+        Classify already-encoded texts by a similarity-weighted vote of
+        their knn_k nearest labeled dialogs.
+
+        A scenario's confidence is its share of the vote, scaled down (as
+        prototype similarities are) when even the nearest dialog is far.
+        """
+        similarities, rows = self.knn_index.search(embeddings, self.knn_k)
+        found = rows >= 0
+        labels = np.where(found, self.knn_index.labels[np.maximum(rows, 0)], 0).astype(np.int64)
+        weights = np.where(found, np.maximum(similarities, 0), 0)
+
+        num_scenarios = len(self.scenario_names)
+        cells = np.arange(len(embeddings))[:, np.newaxis] * num_scenarios + labels
+        votes = np.bincount(cells.ravel(), weights.ravel(),
+                            minlength=len(embeddings) * num_scenarios)
+        votes = votes.reshape(len(embeddings), num_scenarios)
+        closeness = np.clip((similarities[:, 0] - 0.3) / 0.5, 0, 1)
+        scores = votes / np.maximum(votes.sum(axis=1, keepdims=True), 1e-12) * closeness[:, np.newaxis]
+
+        # Winner plus up to 3 alternatives that got votes (ties keep scenario order)
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :4]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top_votes = np.take_along_axis(votes, top, axis=1)
+
+        results = []
+        for scenario_ids, confidences, scenario_votes in zip(
+                top.tolist(), top_scores.tolist(), top_votes.tolist()):
+            results.append(ClassificationResult(
+                scenario=self.scenario_names[scenario_ids[0]],
+                confidence=confidences[0],
+                method="knn",
+                matched_keywords=[],
+                secondary_scenarios=[
+                    (self.scenario_names[s], c)
+                    for s, c, v in zip(scenario_ids[1:], confidences[1:], scenario_votes[1:])
+                    if v > 0
+                ]
+            ))
+
+        return results
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (all-zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def cascade_summary(stats: Dict[str, int]) -> Dict:
+    """Cascade statistics plus skip rate and audit agreement rate."""
+    return {
+        **stats,
+        "skip_rate": stats["skipped"] / stats["total"] if stats["total"] else 0.0,
+        "agreement_rate": stats["agreed"] / stats["audited"] if stats["audited"] else None,
+    }
 
 
 class HybridClassifier:
@@ -267,24 +689,55 @@ class HybridClassifier:
         config_path: str = "config/settings.yaml",
         use_semantic: bool = True,
         keyword_weight: float = 0.4,
-        semantic_weight: float = 0.6
+        semantic_weight: float = 0.6,
+        backend: Optional[str] = None,
+        embedding_cache: bool = True
     ):
         self.config_path = config_path
         self.keyword_classifier = KeywordClassifier(config_path)
 
-        self.use_semantic = use_semantic and SEMANTIC_AVAILABLE
+        with open(config_path, 'r') as f:
+            self.config = yaml.safe_load(f)
+
+        self.min_confidence = self.config['processing']['min_classification_confidence']
+        classification_config = self.config.get('classification', {})
+        self.batch_size = classification_config.get('batch_size', 64)
+        self.chunk_size = classification_config.get('chunk_size', 4096)
+
+        cache_config = classification_config.get('embedding_cache', {})
+        cache_dir = cache_config.get('path') if cache_config.get('enabled', False) else None
+        prototype_config = classification_config.get('prototype_cache', {})
+        prototype_cache_dir = (prototype_config.get('path')
+                               if prototype_config.get('enabled', False) else None)
+
+        self.backend = backend or classification_config.get('backend', 'torch')
+
+        self.use_semantic = use_semantic and backend_available(self.backend)
         if self.use_semantic:
-            self.semantic_classifier = SemanticClassifier()
+            self.semantic_classifier = SemanticClassifier(
+                batch_size=self.batch_size,
+                cache_dir=cache_dir,
+                cache_max_entries=cache_config.get('max_entries', 2000000),
+                open_cache=embedding_cache,
+                backend=self.backend,
+                backend_config=classification_config.get(self.backend, {}),
+                prototype_cache_dir=prototype_cache_dir,
+                knn_config=classification_config.get('knn', {})
+            )
         else:
             self.semantic_classifier = None
 
         self.keyword_weight = keyword_weight
         self.semantic_weight = semantic_weight
 
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
-
-        self.min_confidence = self.config['processing']['min_classification_confidence']
+        # Cascade: confident keyword results skip the semantic model
+        cascade_config = classification_config.get('cascade', {})
+        self.cascade = self.use_semantic and cascade_config.get('enabled', False)
+        self.cascade_min_confidence = cascade_config.get('min_confidence', 0.8)
+        self.cascade_min_margin = cascade_config.get('min_margin', 0.5)
+        self.cascade_audit_fraction = cascade_config.get('audit_fraction', 0.02)
+        self._audit_rng = random.Random(cascade_config.get('seed', 42))
+        self.cascade_stats = {"total": 0, "skipped": 0, "audited": 0, "agreed": 0}
 
     def classify(self, text: str) -> ClassificationResult:
         """
@@ -296,10 +749,76 @@ class HybridClassifier:
         if not self.use_semantic:
             return keyword_result
 
+        skip, audit = self._cascade_route(keyword_result)
+        if skip and not audit:
+            return keyword_result
+
         # Run semantic classification
         semantic_result = self.semantic_classifier.classify(text)
+        result = self.combine(keyword_result, semantic_result)
 
-        # Combine results
+        if skip:
+            self._record_audit(keyword_result, result)
+            return keyword_result
+        return result
+
+    def keyword_is_decisive(self, keyword_result: ClassificationResult) -> bool:
+        """
+        True if the keyword result alone is trusted in cascade mode: its
+        confidence is at least cascade min_confidence and it leads the
+        runner-up secondary scenario by at least min_margin.
+        """
+        if not keyword_result.matched_keywords:
+            return False
+        runner_up = keyword_result.secondary_scenarios[0][1] if keyword_result.secondary_scenarios else 0.0
+        return (keyword_result.confidence >= self.cascade_min_confidence
+                and keyword_result.confidence - runner_up >= self.cascade_min_margin)
+
+    def _cascade_route(self, keyword_result: ClassificationResult) -> Tuple[bool, bool]:
+        """
+        Decide whether a text skips the semantic model.
+
+        Returns (skip, audit): audited texts are skipped but still run through
+        the full hybrid so the cascade's agreement rate can be measured.
+        """
+        if not self.cascade:
+            return False, False
+
+        self.cascade_stats["total"] += 1
+        if not self.keyword_is_decisive(keyword_result):
+            return False, False
+
+        self.cascade_stats["skipped"] += 1
+        return True, self._audit_rng.random() < self.cascade_audit_fraction
+
+    def _record_audit(self, keyword_result: ClassificationResult, full_result: ClassificationResult):
+        self.cascade_stats["audited"] += 1
+        if full_result.scenario == keyword_result.scenario:
+            self.cascade_stats["agreed"] += 1
+
+    def cascade_report(self) -> Dict:
+        """Fraction of texts that skipped the semantic model, and how often
+        the audited ones agree with the full hybrid."""
+        return cascade_summary(self.cascade_stats)
+
+    def save_cache(self):
+        """Persist the semantic classifier's embedding cache (if any)."""
+        if self.semantic_classifier is not None:
+            self.semantic_classifier.save_cache()
+
+    def close(self):
+        """Close the semantic classifier's embedding cache (if any)."""
+        if self.semantic_classifier is not None:
+            self.semantic_classifier.close()
+
+    def combine(
+        self,
+        keyword_result: ClassificationResult,
+        semantic_result: ClassificationResult
+    ) -> ClassificationResult:
+        """
+        Combine the keyword and semantic results for one text.
+        """
         if keyword_result.scenario == semantic_result.scenario:
             # Agreement - boost confidence
             combined_confidence = min(
@@ -347,100 +866,394 @@ class HybridClassifier:
     def classify_batch(
         self,
         texts: List[str],
-        show_progress: bool = True
+        show_progress: bool = True,
+        batch_size: Optional[int] = None
     ) -> List[ClassificationResult]:
         """
         Classify multiple texts efficiently.
+
+        Texts are taken classification.chunk_size at a time; each chunk is
+        embedded in batches of batch_size (default: classification.batch_size),
+        longest texts first so batches need little padding, and each text's
+        keyword and semantic results are then combined as in classify().
+        In cascade mode only texts whose keyword result is not decisive are
+        embedded. Results are in input order.
         """
         results = []
 
+        chunks = range(0, len(texts), self.chunk_size)
         if show_progress:
             try:
                 from tqdm import tqdm
-                texts = tqdm(texts, desc="Classifying dialogs")
+                chunks = tqdm(chunks, desc="Classifying dialogs", unit="chunk")
             except ImportError:
                 pass
 
-        for text in texts:
-            result = self.classify(text)
-            results.append(result)
+        for start in chunks:
+            chunk = texts[start:start + self.chunk_size]
+            keyword_results = self.keyword_classifier.classify_corpus(chunk)
+
+            if not self.use_semantic:
+                results.extend(keyword_results)
+                continue
+
+            routes = [self._cascade_route(result) for result in keyword_results]
+            semantic_ids = [i for i, (skip, audit) in enumerate(routes) if not skip or audit]
+            semantic_results = self.semantic_classifier.classify_batch(
+                [chunk[i] for i in semantic_ids], batch_size
+            )
+
+            chunk_results = list(keyword_results)
+            for i, semantic_result in zip(semantic_ids, semantic_results):
+                result = self.combine(keyword_results[i], semantic_result)
+                if routes[i][0]:
+                    self._record_audit(keyword_results[i], result)
+                else:
+                    chunk_results[i] = result
+            results.extend(chunk_results)
+
+        return results
+
+
+class RemoteClassifier:
+    """
+    Stand-in for HybridClassifier that classifies through a running
+    classifier service (see classifier_service.py).
+    """
 
+    def __init__(self, client: ClassifierClient, chunk_size: int = 4096):
+        self.client = client
+        self.chunk_size = chunk_size
+
+    def classify_batch(self, texts: List[str], show_progress: bool = True) -> List[ClassificationResult]:
+        results = []
+        for start in range(0, len(texts), self.chunk_size):
+            for fields in self.client.classify(texts[start:start + self.chunk_size]):
+                fields['secondary_scenarios'] = [tuple(s) for s in fields['secondary_scenarios']]
+                results.append(ClassificationResult(**fields))
         return results
 
+    def save_cache(self):
+        """The service keeps its own embedding cache."""
+
+    def close(self):
+        """The service keeps its own embedding cache."""
+
+
+def connect_to_service(
+    config_path: str = "config/settings.yaml",
+    use_semantic: bool = True,
+    backend: Optional[str] = None
+) -> Optional[RemoteClassifier]:
+    """
+    Connect to a running classifier service if it classifies like a local
+    HybridClassifier with these settings would.
+
+    Returns:
+        RemoteClassifier, or None to classify locally
+    """
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    classification_config = config.get('classification', {})
+    service_config = classification_config.get('service', {})
+    if not service_config.get('auto_connect', False):
+        return None
+
+    client = ClassifierClient(service_config.get('host', "127.0.0.1"), service_config.get('port', 8765))
+    info = client.health()
+    if info is None:
+        return None
+
+    backend = backend or classification_config.get('backend', 'torch')
+    if info.get('config_hash') != config_fingerprint(config):
+        logger.info(f"Classifier service at {client.url} runs another configuration; classifying locally")
+        return None
+    # A keyword-only service still matches if the backend is missing here too
+    service_semantic = info.get('use_semantic')
+    if service_semantic:
+        matches = use_semantic and info.get('backend') == backend
+    else:
+        matches = not (use_semantic and backend_available(backend))
+    if not matches:
+        logger.info(
+            f"Classifier service at {client.url} uses semantic={info.get('use_semantic')}, "
+            f"backend={info.get('backend')}; classifying locally"
+        )
+        return None
+
+    logger.info(f"Using classifier service at {client.url}")
+    return RemoteClassifier(client, classification_config.get('chunk_size', 4096))
+
+
+def _iter_chunks(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of up to size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _classify_texts(classifier, texts: List[str]) -> Tuple[List[ClassificationResult], Dict[str, int]]:
+    """Classify a chunk; also returns the chunk's cascade statistics."""
+    stats = getattr(classifier, 'cascade_stats', {})
+    before = dict(stats)
+    results = classifier.classify_batch(texts, show_progress=False)
+    return results, {key: stats[key] - before[key] for key in stats}
+
+
+# Classifier of a classify worker process
+_worker_classifier = None
+
+
+def _init_classify_worker(config_path: str, use_semantic: bool, backend: Optional[str]):
+    global _worker_classifier
+    # Workers can't share the embedding cache files (they have a single
+    # writer); results are the same without it (see SemanticClassifier)
+    _worker_classifier = HybridClassifier(
+        config_path=config_path,
+        use_semantic=use_semantic,
+        backend=backend,
+        embedding_cache=False
+    )
+
+
+def _classify_texts_worker(texts: List[str]) -> Tuple[List[ClassificationResult], Dict[str, int]]:
+    """Process pool entry point for _classify_texts."""
+    return _classify_texts(_worker_classifier, texts)
+
+
+def _iter_classified(
+    chunks: Iterator[List[Dict]],
+    classifier,
+    config_path: str,
+    use_semantic: bool,
+    backend: Optional[str],
+    workers: int
+) -> Iterator[Tuple[List[Dict], List[ClassificationResult], Dict[str, int]]]:
+    """
+    Yield (chunk, results, cascade statistics) for each chunk, in order.
+
+    With a classifier, chunks are classified here; otherwise by worker
+    processes, each with its own HybridClassifier. At most two chunks per
+    worker are in flight, so memory stays bounded on any input size.
+    """
+    if classifier is not None:
+        for chunk in chunks:
+            yield (chunk, *_classify_texts(classifier, [dialog['text'] for dialog in chunk]))
+        return
+
+    logger.info(f"Classifying with {workers} worker processes")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_classify_worker,
+        initargs=(config_path, use_semantic, backend)
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(
+                _classify_texts_worker, [dialog['text'] for dialog in chunk]
+            )))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield (chunk, *future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield (chunk, *future.result())
+
 
 def classify_dialogs(
     dialogs_file: str,
     output_file: str,
     config_path: str = "config/settings.yaml",
-    use_semantic: bool = True
+    use_semantic: bool = True,
+    backend: Optional[str] = None,
+    workers: int = 1,
+    resume: bool = True
 ) -> Dict[str, int]:
     """
-    Classify all dialogs from a JSON file.
+    Classify all dialogs from a dialogs file.
+
+    Dialogs are streamed from the input (jsonl or legacy json array) in
+    chunks of classification.chunk_size, classified as a batch (see
+    HybridClassifier.classify_batch) and written out in input order as
+    each chunk finishes. If a classifier service with the same settings is
+    running, it classifies the chunks instead of a freshly loaded local
+    model; otherwise with workers > 1 chunks are classified by that many
+    processes.
+
+    After every chunk the progress and scenario counts are checkpointed
+    next to the output (see classify_checkpoint), so an interrupted run
+    started again with the same settings resumes after the last finished
+    chunk.
 
     Args:
-        dialogs_file: Path to JSON file with extracted dialogs
+        dialogs_file: Path to jsonl/json file with extracted dialogs
         output_file: Path to save classified dialogs
         config_path: Path to configuration file
         use_semantic: Whether to use semantic classification
+        backend: Embedding backend, 'torch', 'onnx' or 'static' (default: from config)
+        workers: Number of worker processes (1 = classify in this process)
+        resume: Resume from a checkpoint of an interrupted run (False starts over)
 
     Returns:
         Dictionary with scenario counts
     """
-    # Load dialogs
-    with open(dialogs_file, 'r', encoding='utf-8') as f:
-        dialogs = json.load(f)
-
-    logger.info(f"Loaded {len(dialogs)} dialogs for classification")
-
-    # Initialize classifier
-    classifier = HybridClassifier(
-        config_path=config_path,
-        use_semantic=use_semantic
-    )
-
     # Load config for min confidence
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
     min_confidence = config['processing']['min_classification_confidence']
+    classification_config = config.get('classification', {})
+
+    input_stat = os.stat(dialogs_file)
+    checkpoint = ClassificationCheckpoint(output_file, {
+        "input": str(Path(dialogs_file).resolve()),
+        "input_size": input_stat.st_size,
+        "input_mtime_ns": input_stat.st_mtime_ns,
+        "config_hash": config_fingerprint(config),
+        "min_confidence": min_confidence,
+        "use_semantic": use_semantic,
+        "backend": backend or classification_config.get('backend', 'torch'),
+    })
+    state = checkpoint.load() if resume else None
+    if state is not None:
+        logger.info(f"Resuming {output_file} after {state['dialogs_done']} dialogs")
+
+    # Initialize classifier (a running service is already warm); with
+    # several workers each loads its own
+    classifier = connect_to_service(config_path, use_semantic, backend)
+    if classifier is None and workers <= 1:
+        classifier = HybridClassifier(
+            config_path=config_path,
+            use_semantic=use_semantic,
+            backend=backend
+        )
 
-    # Classify each dialog
-    classified_dialogs = []
-    scenario_counts = defaultdict(int)
-
-    for dialog in dialogs:
-        text = dialog['text']
-        result = classifier.classify(text)
-
-        # Update dialog with classification
-        dialog['scenario'] = result.scenario
-        dialog['scenario_confidence'] = result.confidence
-        dialog['classification_method'] = result.method
-        dialog['matched_keywords'] = result.matched_keywords
-        dialog['secondary_scenarios'] = [
-            {"scenario": s, "confidence": c}
-            for s, c in result.secondary_scenarios
-        ]
-
-        # Only include if confidence meets threshold
-        if result.confidence >= min_confidence:
-            classified_dialogs.append(dialog)
-            scenario_counts[result.scenario] += 1
-        else:
-            scenario_counts['low_confidence'] += 1
-
-    # Save classified dialogs
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    scenario_counts = defaultdict(int, state['scenario_counts'] if state else {})
+    cascade_stats = defaultdict(int, state['cascade_stats'] if state else {})
+    total = state['dialogs_done'] if state else 0
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(classified_dialogs, f, ensure_ascii=False, indent=2)
+    # Dialogs are read a chunk at a time and classified as a batch
+    chunk_size = classification_config.get('chunk_size', 4096)
+    chunks = _iter_chunks(islice(iter_dialogs(dialogs_file), total, None), chunk_size)
 
-    logger.info(f"Saved {len(classified_dialogs)} classified dialogs to {output_file}")
+    try:
+        with DialogWriter(
+            output_file,
+            resume_offset=state['output_offset'] if state else None,
+            resume_count=state['output_count'] if state else 0
+        ) as writer:
+            for chunk, results, chunk_cascade_stats in _iter_classified(
+                    chunks, classifier, config_path, use_semantic, backend, workers):
+                for dialog, result in zip(chunk, results):
+                    # Update dialog with classification
+                    dialog['scenario'] = result.scenario
+                    dialog['scenario_confidence'] = result.confidence
+                    dialog['classification_method'] = result.method
+                    dialog['matched_keywords'] = result.matched_keywords
+                    dialog['secondary_scenarios'] = [
+                        {"scenario": s, "confidence": c}
+                        for s, c in result.secondary_scenarios
+                    ]
+
+                    # Only include if confidence meets threshold
+                    if result.confidence >= min_confidence:
+                        writer.write(dialog)
+                        scenario_counts[result.scenario] += 1
+                    else:
+                        scenario_counts['low_confidence'] += 1
+
+                total += len(chunk)
+                for key, value in chunk_cascade_stats.items():
+                    cascade_stats[key] += value
+                checkpoint.save(total, writer.flush(), writer.count,
+                                dict(scenario_counts), dict(cascade_stats))
+    finally:
+        # Keep the embeddings computed so far, even if classification failed
+        if classifier is not None:
+            classifier.close()
+
+    checkpoint.remove()
+
+    logger.info(f"Classified {total} dialogs from {dialogs_file}")
+    if cascade_stats['total']:
+        report = cascade_summary(cascade_stats)
+        agreement = report['agreement_rate']
+        logger.info(
+            f"Cascade skipped the semantic model for {report['skipped']} of "
+            f"{report['total']} dialogs ({report['skip_rate']:.1%}); "
+            + (f"{agreement:.1%} of {report['audited']} audited skips agree with the full hybrid"
+               if agreement is not None else "no skips audited")
+        )
+    logger.info(f"Saved {writer.count} classified dialogs to {output_file}")
     logger.info(f"Scenario distribution: {dict(scenario_counts)}")
 
     return dict(scenario_counts)
 
 
+def _labeled_texts(path: str, min_confidence: float) -> Iterator[Tuple[str, str]]:
+    """(text, scenario) pairs of a classified dialogs file or an eval_*.jsonl set."""
+    for record in iter_dialogs(path):
+        if 'messages' in record:
+            # Chat example: the assistant turn is the dialog
+            yield record['messages'][-1]['content'], record['metadata']['scenario']
+        elif record.get('scenario_confidence', 0) >= min_confidence:
+            yield record['text'], record['scenario']
+
+
+def build_knn_index(
+    source_files: List[str],
+    config_path: str = "config/settings.yaml",
+    backend: Optional[str] = None
+) -> int:
+    """
+    Add labeled dialogs to the kNN index of the configured model.
+
+    Sources are classified dialog files, of which dialogs classified with
+    at least classification.knn.min_confidence are used, or eval_*.jsonl
+    sets. Texts already in the index are skipped, so the index can be
+    updated after each classify run.
+
+    Args:
+        source_files: Classified dialogs (jsonl/json) or eval_*.jsonl files
+        config_path: Path to configuration file
+        backend: Embedding backend (default: from config)
+
+    Returns:
+        Number of dialogs added
+    """
+    classifier = HybridClassifier(config_path=config_path, backend=backend)
+    if not classifier.use_semantic:
+        raise ImportError(f"The {classifier.backend} embedding backend is needed for the kNN index")
+
+    semantic = classifier.semantic_classifier
+    knn_config = classifier.config.get('classification', {}).get('knn', {})
+    index = semantic.knn_index or semantic.open_knn_index(knn_config)
+    min_confidence = knn_config.get('min_confidence', 0.8)
+    scenario_ids = {scenario: i for i, scenario in enumerate(semantic.scenario_names)}
+
+    added = 0
+    try:
+        for source_file in source_files:
+            pairs = ((text, scenario_ids[scenario])
+                     for text, scenario in _labeled_texts(source_file, min_confidence)
+                     if scenario in scenario_ids)
+            for chunk in _iter_chunks(pairs, classifier.chunk_size):
+                texts = [text for text, _ in chunk]
+                keys = [text_key(normalize_text(text)) for text in texts]
+                added += index.add(keys, semantic.encode(texts), [label for _, label in chunk])
+            logger.info(f"kNN index: {len(index)} dialogs after {source_file}")
+    finally:
+        index.save()
+        classifier.close()
+
+    logger.info(f"Added {added} dialogs to the kNN index ({len(index)} total)")
+    return added
+
+
 def print_classification_report(scenario_counts: Dict[str, int]):
     """Print a formatted classification report."""
     print("\n" + "=" * 50)
@@ -472,4 +1285,4 @@ if __name__ == "__main__":
         )
         print_classification_report(counts)
     else:
-        print("Usage: python scenario_classifier.py <dialogs.json> [output.json]")
+        print("Usage: python scenario_classifier.py <dialogs.jsonl> [output.json]")
@@ -0,0 +1,237 @@
+"""
+SRT Scanner Module
+Fast, lazy SRT parsing over a memory-mapped file.
+
+The file is never decoded as a whole. Block structure (index, timestamps,
+blank lines) is located by scanning the raw bytes, which is safe for every
+ASCII-compatible encoding, and each record only carries the byte span of
+its text; the text is decoded when it is asked for.
+
+The block grammar is the one the srt library accepts, including its
+workarounds for missing blank lines, blank lines inside text and '.' as the
+millisecond separator.
+"""
+
+import codecs
+import logging
+import mmap
+import re
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Bytes 0x80-0x9F that cp1252 leaves undefined
+_CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+_C1_BYTES = re.compile(rb'[\x80-\x9f]')
+
+# Encodings whose ASCII bytes always mean ASCII characters
+_ASCII_COMPATIBLE = ('utf-8', 'cp1252', 'latin-1')
+
+_WS = rb'[\t\n\x0b\x0c\r\x1c-\x1f ]'
+_EOL = rb'\r?\n'
+_INDEX = rb'-?[0-9]+\.?[0-9]*'
+_TS_DELIM = rb'[,.:]'
+_TS = rb'[0-9]+' + _TS_DELIM + rb'[0-9]+' + _TS_DELIM + rb'[0-9]+' + _TS_DELIM + rb'?[0-9]*'
+_TS_FIELDS = (
+    rb'([0-9]+)' + _TS_DELIM + rb'([0-9]+)' + _TS_DELIM + rb'([0-9]+)' + _TS_DELIM + rb'?([0-9]*)'
+)
+
+# One subtitle block. Groups: 1 index, 2-5 start fields, 6-9 end fields, 10 text
+_BLOCK_REGEX = re.compile(
+    _WS + rb'*(?:(' + _INDEX + rb')' + _WS + rb'*' + _EOL + rb')?'
+    + _TS_FIELDS + rb' *-[ -] *> *' + _TS_FIELDS
+    + rb' ?[^\r\n]*(?:' + _EOL + rb'|\Z)(.*?)'
+    # Text ends at a blank line, the end of the buffer, or directly before
+    # a line pair that looks like the next block's index and timestamp
+    + rb'(?:' + _EOL + rb'|\Z)(?:' + _EOL + rb'|\Z|(?=(?:' + _INDEX + _WS + rb'*' + _EOL + _TS + rb')))'
+    # Blank lines inside the text are allowed unless a block follows
+    + rb'(?=(?:(?:' + _INDEX + _WS + rb'*' + _EOL + rb')?' + _TS + rb'|\Z))',
+    re.DOTALL,
+)
+
+_WHITESPACE = re.compile(_WS + rb'*\Z')
+_BARE_CR = re.compile(rb'\r(?!\n)')
+
+
+class SrtParseError(ValueError):
+    """Raised when part of an SRT file is not a valid subtitle block."""
+
+
+class SrtRecord(NamedTuple):
+    """One subtitle block; the text is a byte span into the scanned buffer."""
+    index: Optional[int]
+    start_ms: int
+    end_ms: int
+    text_start: int
+    text_end: int
+
+    @property
+    def text_span(self) -> Tuple[int, int]:
+        return self.text_start, self.text_end
+
+
+def detect_encoding(raw: Union[bytes, mmap.mmap]) -> str:
+    """
+    Sniff the character encoding of subtitle file bytes.
+
+    Checks for a BOM, then UTF-8 validity, then whether the bytes use the
+    0x80-0x9F range the way cp1252 does (curly quotes, ellipsis, euro) and
+    falls back to latin-1, which decodes anything.
+    """
+    head = bytes(raw[:4])
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    try:
+        codecs.utf_8_decode(raw, 'strict', True)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    c1_bytes = set(_C1_BYTES.findall(raw))
+    if c1_bytes and not any(b[0] in _CP1252_UNDEFINED for b in c1_bytes):
+        return 'cp1252'
+
+    return 'latin-1'
+
+
+def map_file(filepath: str) -> Union[bytes, mmap.mmap]:
+    """Map a file read-only into memory (empty files give b'')."""
+    with open(filepath, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b''
+
+
+def _timestamp_ms(hours: bytes, minutes: bytes, seconds: bytes, millis: bytes) -> int:
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis or 0)
+
+
+def _parse_index(raw: Optional[bytes]) -> Optional[int]:
+    if raw is None:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        # Index like "123.4"
+        return int(raw.split(b'.')[0])
+
+
+class SrtBuffer:
+    """
+    SRT data in an ASCII-compatible encoding, scanned without decoding.
+
+    Wraps bytes or an mmap. UTF-16 input and files using bare '\\r' line
+    endings are converted to an in-memory copy first; everything else is
+    scanned in place.
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap], encoding: Optional[str] = None):
+        self.encoding = encoding or detect_encoding(data)
+        self._mmap = data if isinstance(data, mmap.mmap) else None
+        self._start = 0
+
+        if self.encoding == 'utf-8-sig':
+            self.encoding = 'utf-8'
+            self._start = len(codecs.BOM_UTF8)
+        elif self.encoding not in _ASCII_COMPATIBLE:
+            data = str(data, self.encoding).encode('utf-8')
+            self.encoding = 'utf-8'
+
+        if _BARE_CR.search(data, self._start):
+            data = bytes(data[self._start:]).replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            self._start = 0
+
+        self.data = data
+        self._view = memoryview(data)
+
+    @classmethod
+    def open(cls, filepath: str, encoding: Optional[str] = None) -> 'SrtBuffer':
+        """Memory-map an SRT file (call close() or use as a context manager)."""
+        return cls(map_file(filepath), encoding)
+
+    def records(self, strict: bool = True) -> Iterator[SrtRecord]:
+        """
+        Yield each subtitle block in file order.
+
+        Args:
+            strict: Raise SrtParseError on data that is not a subtitle block
+                (like srt.parse); otherwise log and skip it
+        """
+        expected = self._start
+        data = self.data
+
+        for match in _BLOCK_REGEX.finditer(data, self._start):
+            if match.start() != expected:
+                self._unmatched(expected, match.start(), strict)
+
+            groups = match.groups()
+            text_start, text_end = match.span(10)
+            yield SrtRecord(
+                index=_parse_index(groups[0]),
+                start_ms=_timestamp_ms(*groups[1:5]),
+                end_ms=_timestamp_ms(*groups[5:9]),
+                text_start=text_start,
+                text_end=text_end
+            )
+            expected = match.end()
+
+        if expected != len(data):
+            self._unmatched(expected, len(data), strict)
+
+    def __iter__(self) -> Iterator[SrtRecord]:
+        return self.records()
+
+    def _unmatched(self, start: int, end: int, strict: bool):
+        if start == self._start and _WHITESPACE.match(self.data, start, end):
+            # Leading whitespace before the first block
+            return
+
+        unmatched = bytes(self._view[start:end])
+        if strict:
+            raise SrtParseError(
+                f"Unparseable SRT data at bytes {start}-{end}: {unmatched[:80]!r}"
+            )
+        logger.warning(f"Skipped unparseable SRT data: {unmatched[:80]!r}")
+
+    def text(self, record: SrtRecord) -> str:
+        """Decode a record's text (line breaks normalized to '\\n')."""
+        text = str(self._view[record.text_start:record.text_end], self.encoding)
+        if '\r' in text:
+            text = text.replace('\r\n', '\n')
+        return text
+
+    def close(self):
+        """Release the buffer (and unmap the file, if mapped)."""
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.data = b''
+        self._view = memoryview(self.data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def format_srt_timestamp(ms: int) -> str:
+    """Format integer milliseconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    total_seconds, milliseconds = divmod(ms, 1000)
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def parse_srt_timestamp(timestamp: str) -> int:
+    """Parse an SRT timestamp (HH:MM:SS,mmm) into integer milliseconds."""
+    clock, _, millis = timestamp.replace('.', ',').partition(',')
+    hours, minutes, seconds = (int(part) for part in clock.split(':'))
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + int(millis or 0)
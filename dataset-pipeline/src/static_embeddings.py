@@ -0,0 +1,238 @@
+"""
+Static Embeddings Module
+Distilled word-vector "static embedding" backend for fast first-pass
+scenario classification.
+
+Each word of a vocabulary is embedded once by the sentence-transformer, and
+a sentence is embedded as the weighted mean of its words' vectors: a regex
+split, a dict lookup and a numpy reduction, with no model at run time.
+Words are weighted by smooth inverse frequency (a / (a + p(word))), so
+frequent function words count for less. Words outside the vocabulary are
+skipped.
+
+The vectors live in the full model's embedding space, so sentences are
+compared against the full model's scenario prototypes, which are stored
+with the table:
+
+    <static dir>/<model>/vectors.npy      float16 (vocabulary x dim)
+    <static dir>/<model>/vocab.json       words (row order) and their weights
+    <static dir>/<model>/prototypes.npz   full-model prototype per scenario
+    <static dir>/<model>/meta.json        corpus, vocab_size and min_count it was made with
+
+Distilling needs sentence-transformers; using the table only needs numpy.
+"""
+
+import json
+import re
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+import numpy as np
+
+try:
+    from .dialog_io import iter_dialogs
+    from .embedding_cache import examples_hash
+except ImportError:
+    from dialog_io import iter_dialogs
+    from embedding_cache import examples_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table format or distillation changes
+STATIC_VERSION = 1
+
+# Smoothing constant of the inverse-frequency word weights
+SIF_A = 1e-3
+
+_WORD = re.compile(r'\w+')
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of a text."""
+    return _WORD.findall(text.lower())
+
+
+class StaticEmbeddingEncoder:
+    """
+    Sentence embeddings as weighted means of distilled word vectors.
+
+    Provides encode() and get_sentence_embedding_dimension() like
+    SentenceTransformer, plus the full-model scenario_prototypes.
+    """
+
+    def __init__(self, table_dir: str):
+        table_path = Path(table_dir)
+        with open(table_path / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(table_path / 'vocab.json', 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+
+        self.word_ids = {word: i for i, word in enumerate(vocab['words'])}
+        # Rows pre-scaled by their word weight; the mean divides by the weight sum
+        weights = np.asarray(vocab['weights'], dtype=np.float32)
+        vectors = np.load(table_path / 'vectors.npy').astype(np.float32)
+        self.weighted_vectors = vectors * weights[:, np.newaxis]
+        self.weights = weights
+
+        prototypes = np.load(table_path / 'prototypes.npz')
+        self.scenario_prototypes = {name: prototypes[name] for name in prototypes.files}
+
+    @classmethod
+    def load_or_distill(
+        cls,
+        model_name: str,
+        examples: Dict[str, List[str]],
+        static_dir: str = "data/cache/static",
+        corpus_file: Optional[str] = None,
+        vocab_size: int = 100000,
+        min_count: int = 2
+    ) -> 'StaticEmbeddingEncoder':
+        """Load the distilled table of a model, distilling it first if needed."""
+        table_dir = Path(static_dir) / _UNSAFE_PATH_CHARS.sub('_', model_name)
+        settings = _distill_settings(corpus_file, vocab_size, min_count)
+        try:
+            with open(table_dir / 'meta.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            current = (meta.get('version') == STATIC_VERSION
+                       and meta.get('examples_hash') == examples_hash(examples)
+                       and meta.get('settings') == settings)
+        except (OSError, ValueError):
+            current = False
+
+        if not current:
+            distill_static_embeddings(
+                model_name, str(table_dir), examples, corpus_file, vocab_size, min_count
+            )
+
+        logger.info(f"Loading static embeddings from {table_dir}")
+        return cls(str(table_dir))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.weighted_vectors.shape[1]
+
+    def encode(self, sentences: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed sentences as a (len(sentences), dim) float32 array."""
+        ids = []
+        offsets = []
+        word_ids = self.word_ids
+        for sentence in sentences:
+            offsets.append(len(ids))
+            ids.extend(i for i in (word_ids.get(w) for w in tokenize(sentence)) if i is not None)
+
+        embeddings = np.zeros((len(sentences), self.get_sentence_embedding_dimension()),
+                              dtype=np.float32)
+        if not ids:
+            return embeddings
+
+        ids = np.asarray(ids, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        counts = np.diff(np.append(offsets, len(ids)))
+        has_words = counts > 0
+
+        # reduceat over the non-empty sentences (empty ones stay zero)
+        starts = offsets[has_words]
+        sums = np.add.reduceat(self.weighted_vectors[ids], starts, axis=0)
+        weight_sums = np.add.reduceat(self.weights[ids], starts)
+        embeddings[has_words] = sums / weight_sums[:, np.newaxis]
+        return embeddings
+
+
+def _distill_settings(corpus_file: Optional[str], vocab_size: int, min_count: int) -> Dict:
+    """Distillation settings recorded in meta.json; a table made with others is redistilled."""
+    return {"corpus_file": corpus_file, "vocab_size": vocab_size, "min_count": min_count}
+
+
+def build_vocabulary(
+    texts: Iterable[str],
+    vocab_size: int = 100000,
+    min_count: int = 2,
+    required: Iterable[str] = ()
+) -> Counter:
+    """
+    Word counts of the vocabulary: the vocab_size most frequent words seen
+    at least min_count times, plus every required word.
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text))
+
+    vocabulary = Counter({
+        word: count for word, count in counts.most_common(vocab_size) if count >= min_count
+    })
+    for word in required:
+        vocabulary[word] = max(vocabulary[word], counts[word], 1)
+    return vocabulary
+
+
+def distill_static_embeddings(
+    model_name: str,
+    output_dir: str,
+    examples: Dict[str, List[str]],
+    corpus_file: Optional[str] = None,
+    vocab_size: int = 100000,
+    min_count: int = 2,
+    max_corpus_dialogs: int = 5000000,
+    batch_size: int = 1024
+):
+    """
+    Distill a static word-vector table from a sentence-transformers model.
+
+    The vocabulary and word frequencies come from a dialogs file (plus every
+    word of the scenario examples); each word is embedded on its own by the
+    model.
+
+    Args:
+        model_name: sentence-transformers model
+        output_dir: Directory for the table
+        examples: Scenario -> example texts (for the prototypes)
+        corpus_file: jsonl/json dialogs file to build the vocabulary from
+        vocab_size: Maximum number of words
+        min_count: Minimum corpus count of a word
+        max_corpus_dialogs: Dialogs read from the corpus
+        batch_size: Words per model.encode call
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError("Distilling static embeddings requires sentence-transformers") from e
+
+    example_words = [w for texts in examples.values() for t in texts for w in tokenize(t)]
+    texts = iter(())
+    if corpus_file and Path(corpus_file).exists():
+        texts = (d['text'] for d in islice(iter_dialogs(corpus_file), max_corpus_dialogs))
+    else:
+        logger.warning(f"No corpus for static embeddings ({corpus_file}); using the examples only")
+    vocabulary = build_vocabulary(texts, vocab_size, min_count, example_words)
+    words = sorted(vocabulary, key=lambda w: -vocabulary[w])
+
+    total = sum(vocabulary.values())
+    weights = [SIF_A / (SIF_A + vocabulary[w] / total) for w in words]
+
+    logger.info(f"Distilling static embeddings of {len(words)} words from {model_name}")
+    model = SentenceTransformer(model_name)
+    vectors = model.encode(words, batch_size=batch_size, show_progress_bar=True)
+
+    prototypes = {
+        scenario: np.mean(model.encode(scenario_examples), axis=0)
+        for scenario, scenario_examples in examples.items()
+    }
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    np.save(output_path / 'vectors.npy', np.asarray(vectors, dtype=np.float16))
+    np.savez(output_path / 'prototypes.npz', **prototypes)
+    with open(output_path / 'vocab.json', 'w', encoding='utf-8') as f:
+        json.dump({"words": words, "weights": weights}, f, ensure_ascii=False)
+    with open(output_path / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": STATIC_VERSION,
+            "model": model_name,
+            "settings": _distill_settings(corpus_file, vocab_size, min_count),
+            "num_words": len(words),
+            "examples_hash": examples_hash(examples),
+        }, f, indent=2)
+
+    logger.info(f"Saved static embeddings to {output_path}")
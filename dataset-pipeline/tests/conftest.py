@@ -0,0 +1,89 @@
+"""
+Shared test fixtures.
+
+Tests import the pipeline modules the way main.py does, with src/ (and
+benchmarks/, for the benchmark helpers) on the import path.
+"""
+
+import sys
+import types
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+PIPELINE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(PIPELINE_DIR / "src"))
+sys.path.insert(0, str(PIPELINE_DIR / "benchmarks"))
+
+CONFIG_PATH = PIPELINE_DIR / "config" / "settings.yaml"
+
+
+@pytest.fixture
+def config():
+    """The pipeline's settings.yaml, as a dict to modify."""
+    with open(CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def write_config(tmp_path):
+    """Write a config dict to a file in tmp_path; returns its path."""
+    def write(config, name="settings.yaml") -> str:
+        path = tmp_path / name
+        with open(path, 'w') as f:
+            yaml.safe_dump(config, f, allow_unicode=True)
+        return str(path)
+    return write
+
+
+class FakeSentenceTransformer:
+    """
+    Stand-in for sentence_transformers.SentenceTransformer: deterministic
+    per-text vectors, no model download. Records the texts it encodes.
+    """
+
+    DIM = 16
+
+    def __init__(self, model_name: str, calls: list):
+        self.calls = calls
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.DIM
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        self.calls.extend(texts)
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(self.DIM)
+            for text in texts
+        ]).astype(np.float32)
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """
+    Make the torch backend (and distillation) use FakeSentenceTransformer;
+    returns the list of texts encoded (in this process).
+    """
+    import scenario_classifier
+
+    calls = []
+    fake = lambda model_name: FakeSentenceTransformer(model_name, calls)
+    monkeypatch.setattr(scenario_classifier, 'SEMANTIC_AVAILABLE', True)
+    monkeypatch.setattr(scenario_classifier, 'SentenceTransformer', fake, raising=False)
+    monkeypatch.setitem(sys.modules, 'sentence_transformers',
+                        types.SimpleNamespace(SentenceTransformer=fake))
+    return calls
+
+
+@pytest.fixture
+def semantic_config(config, tmp_path):
+    """config with the semantic caches under tmp_path."""
+    classification = config['classification']
+    classification['embedding_cache']['path'] = str(tmp_path / "cache" / "embeddings")
+    classification['prototype_cache']['path'] = str(tmp_path / "cache" / "prototypes")
+    classification['knn']['path'] = str(tmp_path / "cache" / "knn")
+    classification['service']['auto_connect'] = False
+    return config
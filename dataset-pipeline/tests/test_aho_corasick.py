@@ -0,0 +1,92 @@
+"""Tests for the Aho-Corasick automaton and Catalan marker detection."""
+
+import random
+import re
+
+import pytest
+
+from aho_corasick import AhoCorasick, is_word_boundary
+from dialog_extractor import CatalanMarkerDetector
+
+ALPHABET = "ab_é1 ,'-"
+PATTERNS = ["a", "ab", "b", "aba", "é", "a_b", "ab é", "b1", "1", "-a"]
+
+
+def _regex_word_matches(text, patterns):
+    """Every (start, end, id) re's \\b + pattern + \\b accepts, overlaps included."""
+    matches = set()
+    for pattern_id, pattern in enumerate(patterns):
+        regex = re.compile(r'(?=(\b' + re.escape(pattern) + r'\b))')
+        for match in regex.finditer(text):
+            matches.add((match.start(1), match.end(1), pattern_id))
+    return matches
+
+
+def _regex_matches(text, patterns):
+    matches = set()
+    for pattern_id, pattern in enumerate(patterns):
+        for match in re.finditer(r'(?=' + re.escape(pattern) + r')', text):
+            matches.add((match.start(), match.start() + len(pattern), pattern_id))
+    return matches
+
+
+def test_is_word_boundary_matches_re():
+    for text in ["", "a", "ab c", "_x_", "é-1", " ç'a "]:
+        expected = {m.start() for m in re.finditer(r'\b', text)}
+        assert {pos for pos in range(len(text) + 1) if is_word_boundary(text, pos)} == expected
+
+
+def test_matches_agree_with_re():
+    rng = random.Random(3)
+    automaton = AhoCorasick(PATTERNS)
+
+    for _ in range(500):
+        text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+        assert set(automaton.iter_matches(text)) == _regex_matches(text, PATTERNS)
+        assert set(automaton.iter_word_matches(text)) == _regex_word_matches(text, PATTERNS)
+
+
+def test_patterns_added_after_search():
+    automaton = AhoCorasick(["nen"])
+    assert list(automaton.iter_word_matches("ostras nen")) == [(7, 10, 0)]
+    automaton.add("ostras")
+    assert sorted(automaton.iter_word_matches("ostras nen")) == [(0, 6, 1), (7, 10, 0)]
+
+
+def test_empty_pattern_rejected():
+    with pytest.raises(ValueError):
+        AhoCorasick([""])
+
+
+@pytest.fixture
+def detector(config, write_config):
+    config['catalan_markers'] = {
+        'lexical_borrowings': ["nen", "nena", "Home"],
+        'syntactic_patterns': ["fer un cafè", "me se"],
+        'phonetic_indicators': [],
+    }
+    return CatalanMarkerDetector(write_config(config))
+
+
+def test_detect_markers_whole_words(detector):
+    assert detector.detect_markers("Nen, ¿vamos a fer un cafè?") == [
+        "lexical:nen", "syntactic:fer un cafè"
+    ]
+    # Substrings of longer words are not markers
+    assert detector.detect_markers("Nenúfares en casa, homenaje") == []
+    assert detector.detect_markers("HOME, la nena") == ["lexical:nena", "lexical:Home"]
+
+
+def test_find_markers_offsets(detector):
+    text = "Ay, nena. Me se olvidó."
+    matches = detector.find_markers(text)
+    assert [(m.name, text[m.start:m.end]) for m in matches] == [
+        ("lexical:nena", "nena"), ("syntactic:me se", "Me se")
+    ]
+
+
+def test_lexicon_file(tmp_path, detector):
+    lexicon = tmp_path / "lexicon.txt"
+    lexicon.write_text("# comment\nostras\nnen  # already known\n\n", encoding='utf-8')
+    assert detector.load_lexicon(str(lexicon)) == 1
+    assert detector.detect_markers("¡Ostras, nen!") == ["lexical:nen", "lexical:ostras"]
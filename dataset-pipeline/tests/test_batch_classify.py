@@ -0,0 +1,87 @@
+"""Tests for batched semantic classification against the per-text path."""
+
+import random
+
+import numpy as np
+import pytest
+
+from scenario_classifier import HybridClassifier
+
+WORDS = ("hola qué tal mi madre lo siento mucho gracias vale quedamos el sábado "
+         "para ir al cine estoy muy feliz hoy trabajo casa tren adiós perdona").split()
+
+
+def random_texts(count, seed):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < 0.2:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))).capitalize() + '.')
+    return texts
+
+
+def per_text_semantic(semantic, text):
+    """The original SemanticClassifier.classify: one encode call per text."""
+    text_embedding = semantic.model.encode([text])[0]
+    similarities = {}
+    for scenario, scenario_emb in semantic.scenario_embeddings.items():
+        similarity = np.dot(text_embedding, scenario_emb) / (
+            np.linalg.norm(text_embedding) * np.linalg.norm(scenario_emb)
+        )
+        similarities[scenario] = float(similarity)
+
+    sorted_scenarios = sorted(similarities.items(), key=lambda x: x[1], reverse=True)
+    top_scenario, top_similarity = sorted_scenarios[0]
+    confidence = max(0, min(1, (top_similarity - 0.3) / 0.5))
+    secondary = [(s, max(0, min(1, (sim - 0.3) / 0.5))) for s, sim in sorted_scenarios[1:4] if sim > 0.4]
+    return top_scenario, confidence, secondary
+
+
+def assert_close(result, expected):
+    """Same result; scores equal up to float32 rounding."""
+    assert (result.scenario, result.method) == (expected.scenario, expected.method)
+    assert result.matched_keywords == expected.matched_keywords
+    assert result.confidence == pytest.approx(expected.confidence, abs=1e-6)
+    assert [s for s, _ in result.secondary_scenarios] == [s for s, _ in expected.secondary_scenarios]
+    assert [c for _, c in result.secondary_scenarios] == pytest.approx(
+        [c for _, c in expected.secondary_scenarios], abs=1e-6
+    )
+
+
+@pytest.fixture
+def classifier(semantic_config, write_config, fake_encoder):
+    semantic_config['classification']['embedding_cache']['enabled'] = False
+    semantic_config['classification']['batch_size'] = 7
+    return HybridClassifier(write_config(semantic_config))
+
+
+def test_semantic_batch_matches_per_text(classifier):
+    semantic = classifier.semantic_classifier
+    texts = random_texts(300, seed=0)
+    for result, text in zip(semantic.classify_batch(texts), texts):
+        scenario, confidence, secondary = per_text_semantic(semantic, text)
+        assert result.scenario == scenario
+        assert result.confidence == pytest.approx(confidence, abs=1e-6)
+        assert [s for s, _ in result.secondary_scenarios] == [s for s, _ in secondary]
+
+
+def test_hybrid_batch_matches_classify(classifier):
+    texts = random_texts(300, seed=1) + [""]
+    batch = classifier.classify_batch(texts, show_progress=False)
+    assert len(batch) == len(texts)
+    for result, text in zip(batch, texts):
+        assert_close(result, classifier.classify(text))
+
+
+def test_repeats_encoded_once_as_first_seen(classifier, fake_encoder):
+    texts = ["  Hola,   ¿qué tal?", "Hola, ¿qué tal?", "Vale.", "Vale.", "Hola, ¿qué tal?  "]
+    fake_encoder.clear()
+    embeddings = classifier.semantic_classifier.encode(texts)
+
+    # One model call per distinct normalized text, with its original text
+    assert sorted(fake_encoder) == sorted(["  Hola,   ¿qué tal?", "Vale."])
+    np.testing.assert_array_equal(embeddings[1], embeddings[0])
+    np.testing.assert_array_equal(embeddings[4], embeddings[0])
+    np.testing.assert_array_equal(embeddings[3], embeddings[2])
@@ -0,0 +1,94 @@
+"""Tests for the confidence-gated keyword cascade in HybridClassifier."""
+
+import pytest
+
+from scenario_classifier import ClassificationResult, HybridClassifier, cascade_summary
+
+TEXTS = [
+    # Decisive keyword results
+    "Mi madre y mi padre están en casa con mis hermanos.",
+    "Lo siento, perdona, fue mi culpa.",
+    # Mixed or no keywords
+    "Hola, lo siento, mi madre dice adiós.",
+    "¿Qué tal el trabajo?",
+    "El tren sale a las ocho.",
+    "Vale.",
+] * 3
+
+
+@pytest.fixture
+def make_classifier(semantic_config, write_config, fake_encoder):
+    def make(enabled, audit_fraction=0.0):
+        cascade = semantic_config['classification']['cascade']
+        cascade['enabled'] = enabled
+        cascade['audit_fraction'] = audit_fraction
+        return HybridClassifier(write_config(semantic_config), embedding_cache=False)
+    return make
+
+
+def _result(confidence, secondary=()):
+    return ClassificationResult("family", confidence, "keyword", ["madre"], list(secondary))
+
+
+def test_keyword_is_decisive(make_classifier):
+    classifier = make_classifier(True)
+    assert classifier.keyword_is_decisive(_result(1.0))
+    assert classifier.keyword_is_decisive(_result(0.8, [("emotions", 0.2)]))
+    assert not classifier.keyword_is_decisive(_result(0.7))
+    assert not classifier.keyword_is_decisive(_result(0.85, [("emotions", 0.4)]))
+    assert not classifier.keyword_is_decisive(
+        ClassificationResult("unclassified", 0.0, "keyword", [], [])
+    )
+
+
+def test_cascade_skips_only_decisive_texts(make_classifier, fake_encoder):
+    full = make_classifier(False).classify_batch(TEXTS, show_progress=False)
+
+    classifier = make_classifier(True)
+    keyword_results = classifier.keyword_classifier.classify_corpus(TEXTS)
+    decisive = [classifier.keyword_is_decisive(r) for r in keyword_results]
+    assert 0 < sum(decisive) < len(TEXTS)
+
+    fake_encoder.clear()
+    results = classifier.classify_batch(TEXTS, show_progress=False)
+
+    for text, result, keyword_result, full_result, skipped in zip(
+            TEXTS, results, keyword_results, full, decisive):
+        assert result == (keyword_result if skipped else full_result)
+        # Skipped texts never reach the model
+        assert (text in fake_encoder) != skipped
+
+    stats = classifier.cascade_report()
+    assert stats['total'] == len(TEXTS)
+    assert stats['skipped'] == sum(decisive)
+    assert stats['audited'] == 0
+
+
+def test_audited_texts_keep_keyword_result(make_classifier):
+    unaudited = make_classifier(True).classify_batch(TEXTS, show_progress=False)
+
+    classifier = make_classifier(True, audit_fraction=1.0)
+    assert classifier.classify_batch(TEXTS, show_progress=False) == unaudited
+
+    stats = classifier.cascade_report()
+    assert stats['audited'] == stats['skipped'] > 0
+    assert 0 <= stats['agreed'] <= stats['audited']
+    assert stats['agreement_rate'] == stats['agreed'] / stats['audited']
+
+
+def test_classify_routes_like_classify_batch(make_classifier):
+    batch = make_classifier(True).classify_batch(TEXTS, show_progress=False)
+    classifier = make_classifier(True)
+    for text, expected in zip(TEXTS, batch):
+        result = classifier.classify(text)
+        assert (result.scenario, result.method) == (expected.scenario, expected.method)
+        assert result.confidence == pytest.approx(expected.confidence, abs=1e-6)
+
+
+def test_cascade_summary():
+    assert cascade_summary({"total": 0, "skipped": 0, "audited": 0, "agreed": 0}) == {
+        "total": 0, "skipped": 0, "audited": 0, "agreed": 0,
+        "skip_rate": 0.0, "agreement_rate": None,
+    }
+    summary = cascade_summary({"total": 10, "skipped": 4, "audited": 2, "agreed": 1})
+    assert (summary['skip_rate'], summary['agreement_rate']) == (0.4, 0.5)
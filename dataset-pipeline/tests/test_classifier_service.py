@@ -0,0 +1,102 @@
+"""Tests for the resident classifier service and its embedding cache lock."""
+
+import threading
+
+import pytest
+
+from classifier_service import ClassifierClient, ClassifierService, MicroBatcher
+from embedding_cache import CacheLockedError, EmbeddingCache
+from scenario_classifier import HybridClassifier, RemoteClassifier, connect_to_service
+
+TEXTS = [
+    "Hola, ¿qué tal?", "Mi madre está en casa.", "Lo siento mucho.", "Vale.",
+    "¿Quedamos el sábado para ir al cine?", "Estoy muy feliz hoy.",
+]
+
+
+@pytest.fixture
+def service(semantic_config, write_config, fake_encoder):
+    classifier = HybridClassifier(write_config(semantic_config, "service.yaml"))
+    service = ClassifierService(classifier, semantic_config, port=0, max_wait_ms=20)
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+
+    semantic_config['classification']['service']['port'] = service.server_address[1]
+    semantic_config['classification']['service']['auto_connect'] = True
+    yield service
+
+    service.shutdown()
+    service.server_close()
+    thread.join()
+
+
+def test_cache_lock(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 4)
+    with pytest.raises(CacheLockedError):
+        EmbeddingCache(str(tmp_path), "model", 4)
+    # Other models have their own lock
+    EmbeddingCache(str(tmp_path), "other", 4).close()
+
+    cache.close()
+    EmbeddingCache(str(tmp_path), "model", 4).close()
+
+
+def test_micro_batcher_coalesces_requests():
+    batches = []
+    batcher = MicroBatcher(lambda texts: batches.append(list(texts)) or [t.upper() for t in texts],
+                           max_batch=100, max_wait_ms=200)
+    results = {}
+
+    def submit(i):
+        results[i] = batcher.submit([f"a{i}", f"b{i}"])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {i: [f"A{i}", f"B{i}"] for i in range(5)}
+    assert len(batches) < 5
+    assert batcher.stats()['texts'] == 10
+
+
+def test_service_round_trip(service, semantic_config, write_config):
+    config_path = write_config(semantic_config, "client.yaml")
+    local = HybridClassifier(config_path, embedding_cache=False)
+    expected = local.classify_batch(TEXTS, show_progress=False)
+
+    remote = connect_to_service(config_path)
+    assert isinstance(remote, RemoteClassifier)
+    assert remote.classify_batch(TEXTS) == expected
+
+    client = ClassifierClient(port=service.server_address[1])
+    assert client.health()['use_semantic'] is True
+    assert client.stats()['texts'] == len(TEXTS)
+
+
+def test_connect_only_when_enabled_and_matching(service, semantic_config, write_config):
+    assert connect_to_service(write_config(semantic_config)) is not None
+    assert connect_to_service(write_config(semantic_config), use_semantic=False) is None
+
+    semantic_config['classification']['service']['auto_connect'] = False
+    assert connect_to_service(write_config(semantic_config)) is None
+
+    semantic_config['classification']['service']['auto_connect'] = True
+    semantic_config['classification']['batch_size'] += 1
+    assert connect_to_service(write_config(semantic_config)) is None
+
+
+def test_local_classifier_skips_cache_held_by_service(service, semantic_config, write_config):
+    assert service.classifier.semantic_classifier.cache is not None
+
+    local = HybridClassifier(write_config(semantic_config))
+    assert local.semantic_classifier.cache is None
+    uncached = HybridClassifier(write_config(semantic_config), embedding_cache=False)
+    assert (local.classify_batch(TEXTS, show_progress=False)
+            == uncached.classify_batch(TEXTS, show_progress=False))
+
+
+def test_auto_connect_off_by_default(config):
+    assert config['classification']['service']['auto_connect'] is False
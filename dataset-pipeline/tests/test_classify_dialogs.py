@@ -0,0 +1,140 @@
+"""Tests for classify_dialogs: worker processes, checkpoints and resuming."""
+
+import json
+import random
+
+import pytest
+
+import scenario_classifier
+from classify_checkpoint import ClassificationCheckpoint
+from dialog_io import DialogWriter, iter_dialogs
+from scenario_classifier import HybridClassifier, classify_dialogs
+
+FILLER = "pues la el que no sí y a de mañana hoy muy bien vale ostras".split()
+CHUNK_SIZE = 10
+
+# Text of the first dialog of the chunk whose classification fails (None = none fails)
+FAIL_AT = None
+
+
+def _write_dialogs(path, config, count=95, seed=0):
+    rng = random.Random(seed)
+    keywords = [k for scenario in config['personal_social_scenarios'].values()
+                for k in scenario.get('keywords', [])]
+    texts = []
+    for i in range(count):
+        if texts and rng.random() < 0.1:
+            # Repeated dialogs, within and across chunks
+            texts.append(rng.choice(texts))
+            continue
+        words = [rng.choice(FILLER) for _ in range(rng.randint(1, 10))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        texts.append(' '.join(words) + f" {i}")
+    with DialogWriter(str(path)) as writer:
+        writer.write_many({"id": i, "text": text, "source": "a.srt"} for i, text in enumerate(texts))
+    return texts
+
+
+@pytest.fixture
+def run(semantic_config, write_config, fake_encoder, tmp_path, monkeypatch):
+    """Classify tmp_path/dialogs.jsonl; returns (output bytes, scenario counts)."""
+    semantic_config['classification']['chunk_size'] = CHUNK_SIZE
+    config_path = write_config(semantic_config)
+    dialogs_file = tmp_path / "dialogs.jsonl"
+    texts = _write_dialogs(dialogs_file, semantic_config)
+
+    # Fails in worker processes too: they are forked from this one
+    classify_batch = HybridClassifier.classify_batch
+
+    def failing_classify_batch(self, chunk_texts, **kwargs):
+        if chunk_texts[0] == FAIL_AT:
+            raise RuntimeError("interrupted")
+        return classify_batch(self, chunk_texts, **kwargs)
+
+    monkeypatch.setattr(HybridClassifier, 'classify_batch', failing_classify_batch)
+
+    def classify(name, workers=1, resume=True, fail_at_chunk=None):
+        global FAIL_AT
+        FAIL_AT = texts[fail_at_chunk * CHUNK_SIZE] if fail_at_chunk is not None else None
+        output_file = tmp_path / name
+        try:
+            counts = classify_dialogs(str(dialogs_file), str(output_file), config_path,
+                                      use_semantic=True, workers=workers, resume=resume)
+        finally:
+            FAIL_AT = None
+        return output_file.read_bytes(), counts
+
+    classify.texts = texts
+    return classify
+
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.json"])
+def test_output_same_for_any_worker_count(run, tmp_path, name):
+    # Cold embedding cache, then warm, in this process
+    cold = run(name)
+    assert run(name) == cold
+    for workers in (2, 3):
+        assert run(name, workers=workers) == cold
+
+    _, counts = cold
+    assert sum(counts.values()) == len(run.texts)
+    # Semantic scores are part of the output
+    methods = {dialog['classification_method'] for dialog in iter_dialogs(str(tmp_path / name))}
+    assert "hybrid-semantic" in methods
+
+
+@pytest.mark.parametrize("workers, resume_workers", [(1, 1), (3, 3), (1, 3), (3, 1)])
+def test_interrupted_run_resumes(run, tmp_path, workers, resume_workers):
+    expected = run("expected.jsonl")
+
+    with pytest.raises(RuntimeError, match="interrupted"):
+        run("out.jsonl", workers=workers, fail_at_chunk=4)
+    checkpoint = json.loads((tmp_path / "out.checkpoint.json").read_text())
+    assert checkpoint['dialogs_done'] == 4 * CHUNK_SIZE
+
+    assert run("out.jsonl", workers=resume_workers) == expected
+    assert not (tmp_path / "out.checkpoint.json").exists()
+
+
+def test_restart_ignores_checkpoint(run, tmp_path):
+    expected = run("expected.json")
+    with pytest.raises(RuntimeError):
+        run("out.json", fail_at_chunk=2)
+    assert run("out.json", resume=False) == expected
+
+
+def test_checkpoint_settings_must_match(tmp_path):
+    output_file = tmp_path / "out.jsonl"
+    output_file.write_text("x" * 100)
+    checkpoint = ClassificationCheckpoint(str(output_file), {"input": "a", "use_semantic": True})
+    assert checkpoint.path == tmp_path / "out.checkpoint.json"
+    assert checkpoint.load() is None
+
+    checkpoint.save(40, 100, 7, {"family": 7}, {"total": 40})
+    state = checkpoint.load()
+    assert (state['dialogs_done'], state['output_offset'], state['output_count']) == (40, 100, 7)
+    assert state['scenario_counts'] == {"family": 7}
+
+    assert ClassificationCheckpoint(str(output_file), {"input": "b", "use_semantic": True}).load() is None
+    # Output lost or cut short since the checkpoint
+    output_file.write_text("x" * 99)
+    assert checkpoint.load() is None
+
+    checkpoint.remove()
+    assert not checkpoint.path.exists()
+    checkpoint.remove()
+
+
+def test_worker_count_not_a_checkpoint_setting(semantic_config, write_config, tmp_path, monkeypatch):
+    # Settings of the checkpoint classify_dialogs writes, with 1 and 3 workers
+    settings = []
+    monkeypatch.setattr(scenario_classifier, 'ClassificationCheckpoint',
+                        lambda output_file, run_settings: settings.append(run_settings)
+                        or ClassificationCheckpoint(output_file, run_settings))
+    dialogs_file = tmp_path / "dialogs.jsonl"
+    _write_dialogs(dialogs_file, semantic_config, count=5)
+    for workers in (1, 3):
+        classify_dialogs(str(dialogs_file), str(tmp_path / "out.jsonl"),
+                         write_config(semantic_config), use_semantic=False, workers=workers)
+    assert settings[0] == settings[1]
@@ -0,0 +1,39 @@
+"""Tests for SubtitleParser.clean_text against the original re.sub loop."""
+
+import random
+
+import pytest
+
+from bench_clean_text import SAMPLE_LINES, legacy_clean_text
+from dialog_extractor import SubtitleParser
+
+# Markup characters, pattern prefixes and odd whitespace, for random lines
+PIECES = ["<", ">", "{", "}", "[", "]", "(", ")", "♪", "-", "#", "http://x.es/a", "HTTPS://Y",
+          "<i>", "</i>", "{\\an8}", "[MÚSICA]", "(RISAS)", "42", " ", "\n", "\r\n", "\t",
+          " ", " ", "\x1c", "..", "!!", "??", ".", "hola", "qué", "Vale"]
+
+
+def test_matches_legacy_on_sample_lines():
+    parser = SubtitleParser()
+    for text in SAMPLE_LINES:
+        assert parser.clean_text(text) == legacy_clean_text(text), text
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_legacy_on_random_markup(seed):
+    rng = random.Random(seed)
+    parser = SubtitleParser()
+    for _ in range(3000):
+        text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+        assert parser.clean_text(text) == legacy_clean_text(text), repr(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("<i>- Hola</i>", "Hola"),
+    ("- ¿Quedamos?\n- Sí!!!", "¿Quedamos? Sí!"),
+    ("  42  ", ""),
+    ("Ver HTTP://example.com ahora", "Ver ahora"),
+    ("Plain line...", "Plain line."),
+])
+def test_clean_text(text, expected):
+    assert SubtitleParser().clean_text(text) == expected
@@ -0,0 +1,124 @@
+"""Tests for MinHash near-duplicate removal."""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from deduplicator import MinHashDeduplicator, choose_bands, deduplicate_dialogs, normalize_text
+from dialog_io import iter_dialogs
+
+
+WORDS = ("casa perro abuela mañana playa coche trabajo hermano escuela cine "
+         "comida fiesta lluvia tren verano dinero médico vecino libro música").split()
+
+
+def _distinct_texts(count, seed=5):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(8)) for _ in range(count)]
+
+
+def _dialogs(texts):
+    return [{"id": f"d{i}", "text": text} for i, text in enumerate(texts)]
+
+
+@pytest.fixture
+def deduplicator(config, write_config):
+    return MinHashDeduplicator(write_config(config))
+
+
+def test_normalize_text():
+    assert normalize_text("¿¡Qué PASA, tío!?") == normalize_text("que pasa tio")
+
+
+def test_choose_bands_covers_num_perm():
+    for threshold in (0.5, 0.8, 0.9):
+        bands, rows = choose_bands(64, threshold)
+        assert bands * rows <= 64
+
+
+def test_near_duplicates_removed(deduplicator):
+    texts = [
+        "No sé qué le pasa a tu hermano últimamente, está muy raro.",
+        "No se que le pasa a tu hermano ultimamente, esta muy raro...",
+        "NO SÉ QUÉ LE PASA A TU HERMANO ÚLTIMAMENTE, ¡ESTÁ MUY RARO!",
+        "No sé qué le pasa a tu hermano últimamente, está muy raro, nen.",
+        "Mañana vamos a la playa con los abuelos.",
+        "Mañana vamos al cine con los abuelos.",
+    ]
+    kept = [d['id'] for d in deduplicator.filter(_dialogs(texts))]
+    assert kept == ["d0", "d4", "d5"]
+
+    report = deduplicator.report()
+    assert (report['total'], report['kept'], report['removed']) == (6, 3, 3)
+    assert report['clusters'][0]['kept_id'] == "d0"
+    assert report['clusters'][0]['removed'] == 3
+
+
+def test_filter_matches_is_duplicate(config, write_config):
+    distinct = _distinct_texts(37)
+    texts = [distinct[i % 37] for i in range(2500)]
+    batched = MinHashDeduplicator(write_config(config))
+    single = MinHashDeduplicator(write_config(config))
+
+    kept = [d['id'] for d in batched.filter(_dialogs(texts))]
+    assert kept == [d['id'] for d in _dialogs(texts) if not single.is_duplicate(d)]
+    assert len(kept) == 37
+
+
+def test_repeated_dialogs_stay_tracked(config, write_config):
+    config['deduplication']['max_tracked_dialogs'] = 4
+    deduplicator = MinHashDeduplicator(write_config(config))
+
+    stock = "¿Qué pasa? ¿Qué pasa? No pasa nada."
+    texts = []
+    for text in _distinct_texts(20):
+        texts += [stock, text]
+
+    kept = [d['text'] for d in deduplicator.filter(_dialogs(texts))]
+    assert kept.count(stock) == 1
+    assert len(kept) == 21
+
+
+def test_bands_shared_with_unrelated_clusters(deduplicator):
+    bands, rows = deduplicator.num_bands, deduplicator.rows
+    rng = np.random.default_rng(0)
+    first = rng.integers(0, 1 << 32, size=bands * rows, dtype=np.uint32)
+    # Unrelated to first, except for an identical first band
+    second = rng.integers(0, 1 << 32, size=bands * rows, dtype=np.uint32)
+    second[:rows] = first[:rows]
+    # A near-duplicate of second sharing only that band with it
+    third = second.copy()
+    third[rows::rows] += 1
+
+    assert not deduplicator.check({"id": "a", "text": "a"}, first)
+    assert not deduplicator.check({"id": "b", "text": "b"}, second)
+    assert deduplicator.check({"id": "c", "text": "c"}, third)
+    assert deduplicator.clusters[1][0] == "b"
+
+
+def test_deduplicate_dialogs_file(tmp_path, config, write_config):
+    dialogs_file = tmp_path / "all_dialogs.jsonl"
+    texts = ["Hola, ¿qué tal?", "hola que tal", "Adiós, hasta mañana."]
+    dialogs_file.write_text(
+        ''.join(json.dumps(d, ensure_ascii=False) + '\n' for d in _dialogs(texts)),
+        encoding='utf-8'
+    )
+
+    report_file = tmp_path / "report.json"
+    report = deduplicate_dialogs(
+        str(dialogs_file), str(tmp_path / "unique.jsonl"), write_config(config), str(report_file)
+    )
+    assert [d['id'] for d in iter_dialogs(str(tmp_path / "unique.jsonl"))] == ["d0", "d2"]
+    assert report['removed'] == 1
+    assert json.loads(report_file.read_text(encoding='utf-8')) == report
+
+
+def test_classify_reads_dedup_output_by_default():
+    import main
+
+    def default(command, name):
+        return next(p.default for p in command.params if p.name == name)
+
+    assert default(main.classify, 'input') == default(main.dedup, 'output')
@@ -0,0 +1,59 @@
+"""Tests for the context lines extract_dialogs attaches to each dialog."""
+
+import random
+from datetime import timedelta
+
+import pytest
+import srt
+
+from dialog_extractor import SubtitleParser
+
+# Some lines clean to nothing and are left out of context
+LINES = ["¿Qué haces aquí, nen?", "Mi madre está en casa.", "Vale.", "[MÚSICA]", "42",
+         "<i>Ostras, qué frío hace.</i>", "- ¿Quedamos mañana?\n- Sí, claro."]
+
+
+def expected_dialogs(parser, subtitles):
+    """The original loop: cleans each neighbour again for every dialog."""
+    dialogs = []
+    for i, sub in enumerate(subtitles):
+        cleaned_text = parser.clean_text(sub.content)
+        if not parser.is_valid_dialog(cleaned_text):
+            continue
+        context_before = []
+        context_after = []
+        for j in range(max(0, i - parser.context_lines), i):
+            ctx_text = parser.clean_text(subtitles[j].content)
+            if ctx_text:
+                context_before.append(ctx_text)
+        for j in range(i + 1, min(len(subtitles), i + 1 + parser.context_lines)):
+            ctx_text = parser.clean_text(subtitles[j].content)
+            if ctx_text:
+                context_after.append(ctx_text)
+        dialogs.append((cleaned_text, context_before, context_after))
+    return dialogs
+
+
+@pytest.mark.parametrize("context_lines", [0, 1, 2, 5])
+def test_context_matches_original_loop(tmp_path, monkeypatch, context_lines):
+    rng = random.Random(context_lines)
+    subtitles = [
+        srt.Subtitle(index=i + 1, start=timedelta(seconds=3 * i),
+                     end=timedelta(seconds=3 * i + 2), content=rng.choice(LINES))
+        for i in range(60)
+    ]
+    path = tmp_path / "Pelicula_2001_1.srt"
+    path.write_text(srt.compose(subtitles), encoding='utf-8')
+
+    parser = SubtitleParser()
+    parser.context_lines = context_lines
+    expected = expected_dialogs(parser, list(srt.parse(path.read_text(encoding='utf-8'))))
+
+    cleaned = []
+    clean_text = parser.clean_text
+    monkeypatch.setattr(parser, 'clean_text', lambda text: cleaned.append(text) or clean_text(text))
+    dialogs = parser.extract_dialogs(str(path))
+
+    assert [(d.text, d.context_before, d.context_after) for d in dialogs] == expected
+    # Each subtitle is cleaned once, whatever the context size
+    assert len(cleaned) == len(subtitles)
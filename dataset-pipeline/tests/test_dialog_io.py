@@ -0,0 +1,56 @@
+"""Tests for streaming dialog files."""
+
+import json
+
+import pytest
+
+from dialog_io import DialogWriter, detect_format, iter_dialogs
+
+RECORDS = [
+    {"id": 1, "text": "Hola, ¿qué tal?", "source": "a.srt", "nested": {"list": [1, 2], "empty": []}},
+    {"id": 2, "text": "Línea uno\nLínea dos \"citada\"", "source": "b.srt", "extra": None},
+    {"id": 3, "text": "€ ñ ü ’", "source": "c.srt", "empty": {}},
+]
+
+
+@pytest.mark.parametrize("records", [RECORDS, RECORDS[:1], []])
+def test_json_matches_json_dump(tmp_path, records):
+    path = tmp_path / "dialogs.json"
+    with DialogWriter(str(path)) as writer:
+        writer.write_many(records)
+
+    expected = tmp_path / "expected.json"
+    with open(expected, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    assert path.read_bytes() == expected.read_bytes()
+    assert list(iter_dialogs(str(path))) == records
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "dialogs.jsonl"
+    with DialogWriter(str(path)) as writer:
+        writer.write_many(RECORDS[:2])
+        writer.write_encoded(json.dumps(RECORDS[2], ensure_ascii=False))
+    assert writer.count == 3
+    assert detect_format(str(path)) == 'jsonl'
+    assert list(iter_dialogs(str(path))) == RECORDS
+
+
+@pytest.mark.parametrize("name", ["dialogs.json", "dialogs.jsonl"])
+def test_resume_truncates_to_offset(tmp_path, name):
+    path = tmp_path / name
+    with DialogWriter(str(path)) as writer:
+        writer.write(RECORDS[0])
+        offset, count = writer.flush(), writer.count
+        # Written after the checkpoint, so dropped on resume
+        writer.write({"id": 99, "text": "perdido"})
+        writer.flush()
+
+    with DialogWriter(str(path), resume_offset=offset, resume_count=count) as writer:
+        writer.write_many(RECORDS[1:])
+    assert writer.count == 3
+
+    expected = tmp_path / ("expected_" + name)
+    with DialogWriter(str(expected)) as writer:
+        writer.write_many(RECORDS)
+    assert path.read_bytes() == expected.read_bytes()
@@ -0,0 +1,83 @@
+"""Tests for the columnar dialog store."""
+
+from datetime import timedelta
+
+from dialog_extractor import DialogEntry
+from dialog_store import DialogStore
+
+
+def _entries():
+    return [
+        DialogEntry(
+            id="Pelicula_2001_3", text="¿Qué pasa, nen?",
+            start_time=timedelta(milliseconds=61234), end_time=timedelta(milliseconds=63000),
+            source_file="a.srt", film_title="Pelicula", film_year=2001,
+            context_before=["Hola.", "Buenas."], context_after=["Nada."],
+            scenario="family", scenario_confidence=0.75, catalan_markers=["lexical:nen"]
+        ),
+        DialogEntry(
+            id="solo", text="Vale.",
+            start_time=timedelta(hours=1, milliseconds=5), end_time=timedelta(hours=1, seconds=2),
+            source_file="b.srt"
+        ),
+        DialogEntry(
+            id="Otra_Peli_007", text="Adiós.",
+            start_time=timedelta(seconds=2), end_time=timedelta(seconds=3),
+            source_file="a.srt", film_title="Pelicula", film_year=2001
+        ),
+    ]
+
+
+def test_round_trip_matches_dialog_entry():
+    records = [entry.to_dict() for entry in _entries()]
+    store = DialogStore.from_records(records)
+
+    assert len(store) == len(records)
+    assert list(store.iter_dicts()) == records
+    assert [view.to_dict() for view in store] == records
+
+
+def test_extra_fields_kept():
+    record = dict(_entries()[1].to_dict(), audio_file="clip.wav")
+    store = DialogStore.from_records([record])
+    assert store.to_dict(0) == record
+    assert store[0]['audio_file'] == "clip.wav"
+
+
+def test_view_reads_and_writes():
+    store = DialogStore.from_records(entry.to_dict() for entry in _entries())
+    view = store[0]
+    assert view.id == "Pelicula_2001_3"
+    assert view.start_time == timedelta(milliseconds=61234)
+    assert view.context_before == ["Hola.", "Buenas."]
+    assert view['scenario'] == "family"
+    assert 'text' in view and view.get('missing', 1) == 1
+
+    view.scenario = "work"
+    view.scenario_confidence = 0.5
+    view.catalan_markers = []
+    assert store.to_dict(0)['scenario'] == "work"
+    assert store.to_dict(0)['scenario_confidence'] == 0.5
+    assert store.to_dict(0)['catalan_markers'] == []
+
+
+def test_extend():
+    records = [entry.to_dict() for entry in _entries()]
+    store = DialogStore.from_records(records[:1])
+    store.extend(DialogStore.from_records(records[1:]))
+    assert list(store.iter_dicts()) == records
+
+
+def test_merge_groups():
+    records = [entry.to_dict() for entry in _entries()]
+    merged = DialogStore.from_records(records).merge_groups([0, 2])
+
+    assert len(merged) == 2
+    first = merged.to_dict(0)
+    assert first['id'] == records[0]['id']
+    assert first['text'] == "¿Qué pasa, nen? Vale."
+    assert first['start_timestamp'] == records[0]['start_timestamp']
+    assert first['end_timestamp'] == records[1]['end_timestamp']
+    assert first['context_before'] == records[0]['context_before']
+    assert first['context_after'] == records[1]['context_after']
+    assert merged.to_dict(1)['text'] == "Adiós."
@@ -0,0 +1,168 @@
+"""Tests for the persistent embedding cache."""
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, normalize_text, text_key
+from scenario_classifier import HybridClassifier
+
+DIM = 8
+
+TEXTS = [
+    "Hola, ¿qué tal?", "hola que tal", "Mi madre está en casa.", "Lo siento mucho.",
+    "¿Quedamos el sábado?", "Gracias.", "Gracias.", "Estoy muy feliz hoy.",
+    "No sé qué decirte, de verdad.", "¿Qué planes tienes para mañana?",
+]
+
+
+def _vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def test_normalized_keys():
+    # Case is kept (the model sees it); whitespace and composition are not
+    assert normalize_text("  Hola,\n  ¿que\u0301 tal?  ") == "Hola, ¿qué tal?"
+    assert text_key(normalize_text("Hola")) != text_key(normalize_text("Adiós"))
+
+
+def test_get_put_and_reload(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model/a", DIM, max_entries=100)
+    vectors = _vectors(5)
+    cache.put([1, 2, 3, 4, 5], vectors)
+
+    found, cached = cache.get([3, 9, 1])
+    assert found.tolist() == [True, False, True]
+    np.testing.assert_array_equal(cached, vectors[[2, 0]].astype(np.float16).astype(np.float32))
+
+    cache.close()
+    reloaded = EmbeddingCache(str(tmp_path), "model/a", DIM, max_entries=100)
+    assert len(reloaded) == 5
+    found, cached = reloaded.get([1, 2, 3, 4, 5])
+    assert found.all()
+    np.testing.assert_array_equal(cached, vectors.astype(np.float16).astype(np.float32))
+
+
+def test_other_model_or_dim_starts_empty(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", DIM)
+    cache.put([1], _vectors(1))
+    cache.close()
+
+    assert len(EmbeddingCache(str(tmp_path), "model", DIM * 2)) == 0
+    assert len(EmbeddingCache(str(tmp_path), "other", DIM)) == 0
+
+
+def test_growth_beyond_initial_capacity(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=5000)
+    vectors = _vectors(3000)
+    for start in range(0, 3000, 700):
+        cache.put(list(range(start, min(start + 700, 3000))), vectors[start:start + 700])
+    cache.close()
+
+    found, cached = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=5000).get(list(range(3000)))
+    assert found.all()
+    np.testing.assert_array_equal(cached, vectors.astype(np.float16).astype(np.float32))
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=10)
+    vectors = _vectors(15)
+    for key in range(10):
+        cache.put([key], vectors[key:key + 1])
+    # Keys 0-2 are used again, so 3 onwards are the oldest
+    cache.get([0, 1, 2])
+    cache.put(list(range(10, 13)), vectors[10:13])
+
+    assert len(cache) == 10
+    found, _ = cache.get(list(range(13)))
+    assert found.tolist() == [True] * 3 + [False] * 3 + [True] * 7
+
+    # Reused rows hold the new keys' embeddings, also after a reload
+    cache.close()
+    reloaded = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=10)
+    found, cached = reloaded.get([0, 10, 11, 12, 9])
+    assert found.all()
+    np.testing.assert_array_equal(
+        cached, vectors[[0, 10, 11, 12, 9]].astype(np.float16).astype(np.float32)
+    )
+
+
+def test_lowered_max_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=10)
+    vectors = _vectors(10)
+    for key in range(8):
+        cache.put([key], vectors[key:key + 1])
+    cache.get([1, 6])
+    cache.close()
+
+    # The 5 most recently used entries are kept
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=5)
+    found, cached = cache.get(list(range(8)))
+    assert found.tolist() == [False, True, False, False, True, True, True, True]
+    np.testing.assert_array_equal(
+        cached, vectors[[1, 4, 5, 6, 7]].astype(np.float16).astype(np.float32)
+    )
+
+    cache.put([8, 9], vectors[8:10])
+    assert len(cache) <= 5
+    found, cached = cache.get([8, 9])
+    assert found.all()
+    np.testing.assert_array_equal(cached, vectors[8:10].astype(np.float16).astype(np.float32))
+    cache.close()
+
+    reloaded = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=5)
+    found, cached = reloaded.get([8, 9])
+    assert found.all()
+    np.testing.assert_array_equal(cached, vectors[8:10].astype(np.float16).astype(np.float32))
+
+
+def test_close_releases_cache(semantic_config, write_config, fake_encoder):
+    classifier = HybridClassifier(write_config(semantic_config))
+    assert classifier.semantic_classifier.cache is not None
+    classifier.classify_batch(TEXTS, show_progress=False)
+    classifier.close()
+
+    # Saved, and no longer locked
+    reopened = HybridClassifier(write_config(semantic_config))
+    assert len(reopened.semantic_classifier.cache) == len(set(TEXTS))
+    reopened.close()
+
+
+def _classify(config, write_config, embedding_cache=True):
+    classifier = HybridClassifier(write_config(config), embedding_cache=embedding_cache)
+    results = classifier.classify_batch(TEXTS, show_progress=False)
+    classifier.close()
+    return results
+
+
+def test_results_do_not_depend_on_cache(semantic_config, write_config, fake_encoder):
+    # Not opened (like classify workers), but configured: float16 precision
+    uncached = _classify(semantic_config, write_config, embedding_cache=False)
+
+    fake_encoder.clear()
+    cold = _classify(semantic_config, write_config)
+    assert len(fake_encoder) > 0
+
+    fake_encoder.clear()
+    warm = _classify(semantic_config, write_config)
+    # Texts come from the embedding cache, prototypes from the prototype cache
+    assert fake_encoder == []
+
+    assert cold == uncached
+    assert warm == uncached
+    assert [r.method for r in uncached].count("hybrid") > 0
+
+    # Partly warm: some texts cached, some new
+    mixed_texts = TEXTS[::2] + ["Una frase nueva.", "Otra frase nueva."]
+    classifier = HybridClassifier(write_config(semantic_config))
+    mixed = classifier.classify_batch(mixed_texts, show_progress=False)
+    fresh = HybridClassifier(write_config(semantic_config), embedding_cache=False)
+    assert mixed == fresh.classify_batch(mixed_texts, show_progress=False)
+
+
+def test_float32_without_cache(semantic_config, write_config, fake_encoder):
+    semantic_config['classification']['embedding_cache']['enabled'] = False
+    classifier = HybridClassifier(write_config(semantic_config))
+    assert classifier.semantic_classifier.cache is None
+
+    embeddings = classifier.semantic_classifier.encode(TEXTS)
+    model = classifier.semantic_classifier.model
+    np.testing.assert_array_equal(embeddings, np.stack([model.encode([t])[0] for t in TEXTS]))
@@ -0,0 +1,150 @@
+"""Tests for the incremental extraction manifest."""
+
+import os
+import random
+from datetime import timedelta
+
+import pytest
+import srt
+
+from dialog_extractor import batch_extract_dialogs
+from extraction_manifest import ExtractionManifest, hash_config, hash_file
+
+LINES = [
+    "¿Qué haces aquí, nen?",
+    "Mi madre está en casa.",
+    "Vamos a cenar esta noche.",
+    "Ostras, qué frío hace hoy.",
+    "No lo sé, la verdad.",
+    "Apa, que llegamos tarde.",
+]
+
+
+def _write_srt(path, seed, num_cues=40):
+    rng = random.Random(seed)
+    subtitles = [
+        srt.Subtitle(index=i + 1, start=timedelta(seconds=3 * i),
+                     end=timedelta(seconds=3 * i + 2), content=rng.choice(LINES))
+        for i in range(num_cues)
+    ]
+    path.write_text(srt.compose(subtitles), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def srt_files(tmp_path):
+    (tmp_path / "raw").mkdir()
+    return [_write_srt(tmp_path / "raw" / f"Pelicula {i}_2001_{i}.srt", seed=i) for i in range(4)]
+
+
+def _record(manifest, path):
+    manifest.update(path, hash_file(path), num_dialogs=1)
+    manifest.shard_path(path).parent.mkdir(parents=True, exist_ok=True)
+    manifest.shard_path(path).write_text("{}\n")
+
+
+def test_unchanged_file_hits(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    _record(manifest, srt_files[0])
+    manifest.save()
+
+    reloaded = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    assert reloaded.lookup(srt_files[0]) is not None
+    assert reloaded.lookup(srt_files[1]) is None
+
+
+def test_touched_file_with_same_content_hits(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    _record(manifest, srt_files[0])
+
+    stat = os.stat(srt_files[0])
+    os.utime(srt_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manifest.lookup(srt_files[0]) is not None
+
+
+def test_changed_content_misses(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    _record(manifest, srt_files[0])
+    _record(manifest, srt_files[1])
+
+    # Same size, different bytes
+    data = bytearray(open(srt_files[0], 'rb').read())
+    data[-2] = ord('X') if data[-2] != ord('X') else ord('Y')
+    stat = os.stat(srt_files[0])
+    with open(srt_files[0], 'wb') as f:
+        f.write(data)
+    os.utime(srt_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manifest.lookup(srt_files[0]) is None
+
+    # Different size
+    with open(srt_files[1], 'ab') as f:
+        f.write(b"\n")
+    assert manifest.lookup(srt_files[1]) is None
+
+
+def test_missing_shard_misses(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    _record(manifest, srt_files[0])
+    manifest.shard_path(srt_files[0]).unlink()
+    assert manifest.lookup(srt_files[0]) is None
+
+
+def test_prune_drops_removed_files_and_shards(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    for path in srt_files:
+        _record(manifest, path)
+
+    assert manifest.prune(srt_files[1:]) == 1
+    assert srt_files[0] not in manifest.entries
+    assert not manifest.shard_path(srt_files[0]).exists()
+    assert manifest.lookup(srt_files[1]) is not None
+
+
+def test_extraction_config_change_clears(tmp_path, config, srt_files):
+    manifest = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    _record(manifest, srt_files[0])
+    manifest.save()
+
+    config['processing']['min_dialog_length'] += 1
+    reloaded = ExtractionManifest(str(tmp_path / "out.jsonl"), config)
+    assert reloaded.lookup(srt_files[0]) is None
+
+
+def test_classification_keys_do_not_affect_hash(config):
+    before = hash_config(config)
+    config['processing']['min_classification_confidence'] = 0.99
+    config['classification'] = {'batch_size': 1}
+    assert hash_config(config) == before
+
+
+def test_lexicon_contents_affect_hash(tmp_path, config):
+    lexicon = tmp_path / "borrowings.txt"
+    lexicon.write_text("nen\n", encoding='utf-8')
+    config['catalan_markers']['lexicon_files'] = {'lexical_borrowings': [str(lexicon)]}
+
+    before = hash_config(config)
+    lexicon.write_text("nen\nnena\n", encoding='utf-8')
+    assert hash_config(config) != before
+
+
+def test_incremental_extraction_matches_full(tmp_path, config, write_config, srt_files):
+    config_path = write_config(config)
+    raw_dir = os.path.dirname(srt_files[0])
+    incremental = str(tmp_path / "incremental.jsonl")
+    full = str(tmp_path / "full.jsonl")
+
+    def assert_same_as_full():
+        batch_extract_dialogs(raw_dir, incremental, config_path, incremental=True)
+        batch_extract_dialogs(raw_dir, full, config_path, incremental=False)
+        assert open(incremental, 'rb').read() == open(full, 'rb').read()
+
+    assert_same_as_full()
+    # Cached run
+    assert_same_as_full()
+
+    # One file changed, one removed, one added
+    with open(srt_files[1], 'ab') as f:
+        f.write(b"\n999\n01:00:00,000 --> 01:00:02,000\nOstras, nen, esto es nuevo.\n")
+    os.remove(srt_files[2])
+    _write_srt(tmp_path / "raw" / "Nueva_2002_9.srt", seed=9, num_cues=20)
+    assert_same_as_full()
@@ -0,0 +1,117 @@
+"""Tests for keyword scenario classification."""
+
+import random
+import re
+from collections import defaultdict
+
+import pytest
+
+from scenario_classifier import ClassificationResult, KeywordClassifier
+
+FILLER = "pues la el que no sí y a de mañana hoy muy bien, ¿vale? ¡ostras! nen".split()
+
+
+def legacy_classify(classifier, text):
+    """The original classify(): one re.findall per keyword."""
+    text_lower = text.lower()
+    scenario_scores = defaultdict(float)
+    matched_keywords = defaultdict(list)
+
+    for keyword, scenarios in classifier.keyword_to_scenario.items():
+        pattern = r'\b' + re.escape(keyword) + r'\b'
+        matches = len(re.findall(pattern, text_lower))
+        if matches > 0:
+            for scenario in scenarios:
+                scenario_scores[scenario] += len(keyword.split()) * matches
+                matched_keywords[scenario].append(keyword)
+
+    if not scenario_scores:
+        return ClassificationResult("unclassified", 0.0, "keyword", [], [])
+
+    total_score = sum(scenario_scores.values())
+    sorted_scenarios = sorted(
+        ((s, score / total_score) for s, score in scenario_scores.items()),
+        key=lambda x: x[1],
+        reverse=True
+    )
+    top_scenario, top_confidence = sorted_scenarios[0]
+    return ClassificationResult(
+        scenario=top_scenario,
+        confidence=top_confidence,
+        method="keyword",
+        matched_keywords=matched_keywords[top_scenario],
+        secondary_scenarios=[(s, c) for s, c in sorted_scenarios[1:] if c > 0.1]
+    )
+
+
+def random_texts(classifier, count, seed):
+    rng = random.Random(seed)
+    keywords = list(classifier.keyword_to_scenario)
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(0, 12))]
+        for _ in range(rng.randint(0, 4)):
+            keyword = rng.choice(keywords)
+            # Capitalized, glued to punctuation, or inside a longer word
+            keyword = rng.choice([keyword, keyword.upper(), f"¿{keyword}?", f"{keyword}es"])
+            words.insert(rng.randint(0, len(words)), keyword)
+        texts.append(' '.join(words))
+    return texts
+
+
+@pytest.fixture
+def classifier(config, write_config):
+    return KeywordClassifier(write_config(config))
+
+
+def test_count_keywords_matches_findall(classifier):
+    texts = random_texts(classifier, 300, seed=1) + ["casa casa casa", "aa aaa a", ""]
+    for text in texts:
+        text_lower = text.lower()
+        expected = {}
+        for keyword_id, keyword in enumerate(classifier._keywords):
+            matches = len(re.findall(r'\b' + re.escape(keyword) + r'\b', text_lower))
+            if matches:
+                expected[keyword_id] = matches
+        assert classifier.count_keywords(text_lower) == expected, text
+
+
+def test_overlapping_keywords_counted_like_findall(config, write_config):
+    config['personal_social_scenarios'] = {
+        'a': {'keywords': ["la casa", "casa", "casa de"]},
+        'b': {'keywords': ["de la", "la"]},
+    }
+    classifier = KeywordClassifier(write_config(config))
+    for text in ["la casa de la casa", "la la la", "casa de la casa de"]:
+        assert classifier.classify(text) == legacy_classify(classifier, text)
+
+
+def test_classify_matches_legacy(classifier):
+    for text in random_texts(classifier, 500, seed=2):
+        assert classifier.classify(text) == legacy_classify(classifier, text), text
+
+
+def test_classify_corpus_matches_classify(classifier):
+    texts = random_texts(classifier, 1000, seed=3) + ["", "sin palabras clave"]
+    assert classifier.classify_corpus(texts) == [classifier.classify(t) for t in texts]
+
+
+def test_classify_corpus_ties(config, write_config):
+    # Equal scores, keywords shared between scenarios, and a scenario whose
+    # keywords come later in the config but match earlier in the text
+    config['personal_social_scenarios'] = {
+        'a': {'keywords': ["hola", "casa", "la playa"]},
+        'b': {'keywords': ["adiós", "casa", "perro"]},
+        'c': {'keywords': ["perro", "hola", "gato"]},
+        'd': {'keywords': ["la playa", "gato"]},
+    }
+    classifier = KeywordClassifier(write_config(config))
+    texts = [
+        "hola adiós", "adiós hola", "casa", "perro", "gato perro hola",
+        "la playa gato", "gato la playa", "casa perro hola gato adiós",
+        "hola hola adiós adiós perro", "la playa, la playa",
+    ]
+    results = classifier.classify_corpus(texts)
+    assert results == [classifier.classify(t) for t in texts]
+    assert results == [legacy_classify(classifier, t) for t in texts]
+    assert [r.scenario for r in results[:4]] == ["a", "a", "a", "b"]
@@ -0,0 +1,151 @@
+"""Tests for the IVF kNN index."""
+
+import numpy as np
+import pytest
+
+from knn_index import IVFIndex
+
+DIM = 16
+SCENARIOS = ["a", "b", "c", "d"]
+
+
+def _clustered(count, seed, centers=20):
+    """Unit-ish vectors around a few random directions, with their keys and labels."""
+    rng = np.random.default_rng(seed)
+    directions = rng.standard_normal((centers, DIM))
+    cluster = rng.integers(centers, size=count)
+    vectors = (directions[cluster] + 0.5 * rng.standard_normal((count, DIM))).astype(np.float32)
+    # Above 2**63, like half of all text keys
+    keys = rng.integers(2**63, 2**64, size=count, dtype=np.uint64)
+    assert len(np.unique(keys)) == count
+    return keys, vectors, cluster % len(SCENARIOS)
+
+
+def _index(path, **kwargs):
+    return IVFIndex(str(path), "model/x", DIM, SCENARIOS, **kwargs)
+
+
+def _exact(index, queries, k):
+    """Brute-force cosine neighbours over every row: (similarities, keys)."""
+    vectors = index.vectors.astype(np.float32)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    sims = queries @ vectors.T
+    top = np.argsort(-sims, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(sims, top, axis=1), index.keys[top]
+
+
+def test_recall_against_exact_search(tmp_path):
+    keys, vectors, labels = _clustered(4000, seed=0)
+    index = _index(tmp_path)
+    index.add(keys, vectors, labels)
+    queries = _clustered(200, seed=1)[1]
+    _, exact_keys = _exact(index, queries, 10)
+
+    def recall(nprobe):
+        index.nprobe = nprobe
+        found = index.keys[index.search(queries, 10)[1]]
+        return np.mean([len(set(f) & set(e)) / 10 for f, e in zip(found, exact_keys)])
+
+    # About 100 lists; recall grows with the lists probed
+    assert recall(4) < recall(8) < recall(16)
+    assert recall(8) > 0.85
+    assert recall(16) > 0.95
+
+    # Probing every list is exact
+    index.nprobe = len(index.centroids)
+    sims, rows = index.search(queries, 10)
+    exact_sims, _ = _exact(index, queries, 10)
+    np.testing.assert_allclose(sims, exact_sims, atol=1e-5)
+
+
+def test_missing_neighbours(tmp_path):
+    index = _index(tmp_path)
+    sims, rows = index.search(np.ones((2, DIM)), 3)
+    assert (rows == -1).all() and np.isneginf(sims).all()
+
+    keys, vectors, labels = _clustered(2, seed=0)
+    index.add(keys, vectors, labels)
+    sims, rows = index.search(np.ones((1, DIM)), 3)
+    assert sorted(rows[0, :2]) == [0, 1] and rows[0, 2] == -1
+
+
+def test_small_adds_match_one_add(tmp_path):
+    keys, vectors, labels = _clustered(3000, seed=2)
+    bulk = _index(tmp_path / "bulk")
+    bulk.add(keys[:1000], vectors[:1000], labels[:1000])
+    bulk.add(keys[1000:], vectors[1000:], labels[1000:])
+
+    small = _index(tmp_path / "small")
+    small.add(keys[:1000], vectors[:1000], labels[:1000])
+    for start in range(1000, 3000, 7):
+        small.add(keys[start:start + 7], vectors[start:start + 7], labels[start:start + 7])
+        assert len(small) == start + len(keys[start:start + 7])
+
+    queries = _clustered(50, seed=3)[1]
+    for got, expected in zip(small.search(queries, 5), bulk.search(queries, 5)):
+        np.testing.assert_array_equal(got, expected)
+    for name in ('centroids', 'vectors', 'labels', 'lists', 'keys', 'offsets'):
+        np.testing.assert_array_equal(getattr(small, name), getattr(bulk, name))
+
+
+def test_known_keys_skipped(tmp_path):
+    keys, vectors, labels = _clustered(100, seed=4)
+    index = _index(tmp_path)
+    # Repeated within a batch: the first one is kept
+    assert index.add(np.concatenate([keys[:50], keys[:10]]),
+                     np.concatenate([vectors[:50], -vectors[:10]]),
+                     np.concatenate([labels[:50], labels[:10]])) == 50
+    # Repeated across adds, while the rows are still pending
+    assert index.add(keys[40:60], vectors[40:60], labels[40:60]) == 10
+    assert index.add(keys[55:100], vectors[55:100], labels[55:100]) == 40
+    assert index.add(keys, vectors, labels) == 0
+    assert len(index) == 100
+
+    index.search(vectors[:1], 1)
+    assert sorted(index.keys.tolist()) == sorted(keys.tolist())
+    # The first copy of each key was kept
+    row = int(np.flatnonzero(index.keys == keys[0])[0])
+    assert index.vectors[row].astype(np.float32) @ vectors[0] > 0
+
+
+def test_retrains_as_it_grows(tmp_path):
+    keys, vectors, labels = _clustered(1000, seed=5)
+    index = _index(tmp_path, retrain_factor=2.0)
+    index.add(keys[:100], vectors[:100], labels[:100])
+    assert index.trained_size == 100
+
+    index.add(keys[100:199], vectors[100:199], labels[100:199])
+    assert index.trained_size == 100
+    index.add(keys[199:250], vectors[199:250], labels[199:250])
+    assert index.trained_size == 250
+    assert (np.diff(index.lists) >= 0).all()
+
+
+def test_save_and_reload(tmp_path):
+    keys, vectors, labels = _clustered(2000, seed=6)
+    index = _index(tmp_path)
+    index.add(keys[:1500], vectors[:1500], labels[:1500])
+    # Pending rows are written too
+    index.add(keys[1500:], vectors[1500:], labels[1500:])
+    index.save()
+
+    reloaded = _index(tmp_path)
+    assert len(reloaded) == 2000
+    assert reloaded.trained_size == index.trained_size
+    for name in ('centroids', 'vectors', 'labels', 'lists', 'keys', 'offsets'):
+        np.testing.assert_array_equal(getattr(reloaded, name), getattr(index, name))
+    assert reloaded.add(keys, vectors, labels) == 0
+
+    # Another model or other scenarios start empty
+    assert len(IVFIndex(str(tmp_path), "model/y", DIM, SCENARIOS)) == 0
+    assert len(IVFIndex(str(tmp_path), "model/x", DIM, SCENARIOS[:3])) == 0
+
+
+@pytest.mark.parametrize("nlist", [1, 7])
+def test_fixed_nlist(tmp_path, nlist):
+    keys, vectors, labels = _clustered(500, seed=7)
+    index = _index(tmp_path, nlist=nlist, nprobe=nlist)
+    index.add(keys, vectors, labels)
+    assert len(index.centroids) == nlist
+    sims, _ = index.search(vectors[:20], 5)
+    np.testing.assert_allclose(sims, _exact(index, vectors[:20], 5)[0], atol=1e-5)
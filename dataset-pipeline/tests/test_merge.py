@@ -0,0 +1,92 @@
+"""Tests for merging consecutive dialogs into segments."""
+
+import random
+from datetime import timedelta
+
+import pytest
+
+from dialog_extractor import DialogEntry, SubtitleParser, find_merge_groups
+from dialog_store import DialogStore
+
+
+def legacy_merge(dialogs, max_gap_seconds):
+    """The original one-dialog-at-a-time merge loop."""
+    if not dialogs:
+        return []
+
+    merged = []
+    current = dialogs[0]
+    for next_dialog in dialogs[1:]:
+        if current.source_file != next_dialog.source_file:
+            merged.append(current)
+            current = next_dialog
+            continue
+
+        gap = (next_dialog.start_time - current.end_time).total_seconds()
+        if gap <= max_gap_seconds:
+            current = DialogEntry(
+                id=current.id,
+                text=f"{current.text} {next_dialog.text}",
+                start_time=current.start_time,
+                end_time=next_dialog.end_time,
+                source_file=current.source_file,
+                film_title=current.film_title,
+                film_year=current.film_year,
+                context_before=current.context_before,
+                context_after=next_dialog.context_after
+            )
+        else:
+            merged.append(current)
+            current = next_dialog
+
+    merged.append(current)
+    return merged
+
+
+def random_dialogs(seed, count=300):
+    rng = random.Random(seed)
+    dialogs = []
+    source = 0
+    time_ms = 0
+    for i in range(count):
+        if rng.random() < 0.05:
+            source += 1
+            time_ms = 0
+        start = time_ms + rng.choice([0, 40, 500, 1999, 2000, 2001, 2500, 8000])
+        end = start + rng.randint(300, 4000)
+        time_ms = end
+        dialogs.append(DialogEntry(
+            id=f"film{source}_{i}",
+            text=f"line {i}",
+            start_time=timedelta(milliseconds=start),
+            end_time=timedelta(milliseconds=end),
+            source_file=f"film{source}.srt",
+            film_title=f"film{source}",
+            film_year=2000 + source,
+            context_before=[f"before {i}"],
+            context_after=[f"after {i}"]
+        ))
+    return dialogs
+
+
+def test_find_merge_groups():
+    # Gaps of 1s, 2s (merged at the limit), 3s, then a new source
+    starts = [0, 2000, 5000, 9000, 9500]
+    ends = [1000, 3000, 6000, 9400, 9600]
+    sources = [0, 0, 0, 0, 1]
+    assert find_merge_groups(starts, ends, sources, 2.0).tolist() == [0, 3, 4]
+    assert find_merge_groups([], [], [], 2.0).tolist() == []
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("max_gap_seconds", [0.0, 2.0, 5.0])
+def test_merge_matches_legacy(config, write_config, seed, max_gap_seconds):
+    parser = SubtitleParser(write_config(config))
+    dialogs = random_dialogs(seed)
+    expected = [d.to_dict() for d in legacy_merge(dialogs, max_gap_seconds)]
+
+    merged = parser.merge_consecutive_dialogs(dialogs, max_gap_seconds)
+    assert [d.to_dict() for d in merged] == expected
+
+    store = DialogStore.from_records(d.to_dict() for d in dialogs)
+    assert list(parser.merge_store(store, max_gap_seconds).iter_dicts()) == expected
@@ -0,0 +1,46 @@
+"""Tests for batch_extract_dialogs with worker processes."""
+
+import random
+from datetime import timedelta
+from pathlib import Path
+
+import srt
+
+from dialog_extractor import batch_extract_dialogs
+
+CONFIG_PATH = str(Path(__file__).parent.parent / "config" / "settings.yaml")
+LINES = [
+    "¿Qué haces aquí, nen?",
+    "Mi madre está en casa.",
+    "Vamos a cenar esta noche.",
+    "Ostras, qué frío hace hoy.",
+    "No lo sé, la verdad.",
+    "Apa, que llegamos tarde.",
+]
+
+
+def _write_srt(path, seed, num_cues=30):
+    rng = random.Random(seed)
+    subtitles = [
+        srt.Subtitle(index=i + 1, start=timedelta(seconds=3 * i),
+                     end=timedelta(seconds=3 * i + 2), content=rng.choice(LINES))
+        for i in range(num_cues)
+    ]
+    path.write_text(srt.compose(subtitles), encoding='utf-8')
+
+
+def test_workers_match_serial(tmp_path):
+    srt_dir = tmp_path / "raw"
+    srt_dir.mkdir()
+    # Written out of name order; extraction sorts them
+    for i in (3, 0, 5, 1, 4, 2):
+        _write_srt(srt_dir / f"Pelicula {i}_2001_{i}.srt", seed=i)
+
+    serial = tmp_path / "serial.json"
+    batch_extract_dialogs(str(srt_dir), str(serial), CONFIG_PATH)
+    assert serial.stat().st_size > 100
+
+    for workers in (2, 4):
+        output = tmp_path / f"workers_{workers}.json"
+        batch_extract_dialogs(str(srt_dir), str(output), CONFIG_PATH, workers=workers)
+        assert output.read_bytes() == serial.read_bytes()
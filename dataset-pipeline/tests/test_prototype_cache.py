@@ -0,0 +1,38 @@
+"""Tests for the scenario prototype cache."""
+
+import numpy as np
+
+from embedding_cache import load_prototypes, save_prototypes
+from scenario_classifier import SemanticClassifier
+
+EXAMPLES = {"b": ["Hola"], "a": ["Adiós", "Hasta luego"]}
+
+
+def test_save_and_load(tmp_path):
+    prototypes = {"b": np.arange(4, dtype=np.float32), "a": np.ones(4, dtype=np.float32)}
+    assert load_prototypes(str(tmp_path), "model", "rev1", EXAMPLES) is None
+
+    save_prototypes(str(tmp_path), "model", "rev1", EXAMPLES, prototypes)
+    loaded = load_prototypes(str(tmp_path), "model", "rev1", EXAMPLES)
+    assert list(loaded) == ["b", "a"]
+    for scenario in EXAMPLES:
+        np.testing.assert_array_equal(loaded[scenario], prototypes[scenario])
+
+    # Another revision or example set is a miss
+    assert load_prototypes(str(tmp_path), "model", "rev2", EXAMPLES) is None
+    assert load_prototypes(str(tmp_path), "model", "rev1", dict(EXAMPLES, c=["Vale"])) is None
+
+
+def test_second_start_encodes_nothing(tmp_path, fake_encoder):
+    prototype_dir = str(tmp_path / "prototypes")
+    first = SemanticClassifier(prototype_cache_dir=prototype_dir)
+    assert len(fake_encoder) == sum(len(e) for e in SemanticClassifier.SCENARIO_EXAMPLES.values())
+
+    fake_encoder.clear()
+    second = SemanticClassifier(prototype_cache_dir=prototype_dir)
+    assert fake_encoder == []
+
+    assert second.scenario_names == first.scenario_names
+    np.testing.assert_array_equal(second.prototypes, first.prototypes)
+    uncached = SemanticClassifier()
+    np.testing.assert_allclose(second.prototypes, uncached.prototypes, rtol=1e-6)
@@ -0,0 +1,96 @@
+"""Tests for prototype similarity scoring in SemanticClassifier."""
+
+import numpy as np
+import pytest
+
+from scenario_classifier import BACKEND_CACHE_SUFFIXES, BACKENDS, SemanticClassifier
+
+
+def legacy_classify_embedding(scenario_embeddings, text_embedding):
+    """The original per-prototype loop: (scenario, confidence, secondary)."""
+    similarities = {}
+    for scenario, scenario_emb in scenario_embeddings.items():
+        similarity = np.dot(text_embedding, scenario_emb) / (
+            np.linalg.norm(text_embedding) * np.linalg.norm(scenario_emb)
+        )
+        similarities[scenario] = float(similarity)
+
+    sorted_scenarios = sorted(similarities.items(), key=lambda x: x[1], reverse=True)
+    top_scenario, top_similarity = sorted_scenarios[0]
+    confidence = max(0, min(1, (top_similarity - 0.3) / 0.5))
+    secondary = [
+        (s, max(0, min(1, (sim - 0.3) / 0.5)))
+        for s, sim in sorted_scenarios[1:4]
+        if sim > 0.4
+    ]
+    return top_scenario, confidence, secondary
+
+
+def assert_same(result, expected):
+    """Same ranking; scores equal up to float32 rounding."""
+    if not isinstance(expected, tuple):
+        expected = (expected.scenario, expected.confidence, expected.secondary_scenarios)
+    scenario, confidence, secondary = expected
+    assert result.method == "semantic"
+    assert result.scenario == scenario
+    assert result.confidence == pytest.approx(confidence, abs=1e-6)
+    assert [s for s, _ in result.secondary_scenarios] == [s for s, _ in secondary]
+    assert [c for _, c in result.secondary_scenarios] == pytest.approx(
+        [c for _, c in secondary], abs=1e-6
+    )
+
+
+def test_classify_embeddings_matches_loop(fake_encoder):
+    semantic = SemanticClassifier()
+    rng = np.random.default_rng(0)
+    prototypes = np.stack(list(semantic.scenario_embeddings.values()))
+
+    # Random texts, and texts close to one or two prototypes (high similarity,
+    # several secondary scenarios)
+    embeddings = np.concatenate([
+        rng.standard_normal((200, prototypes.shape[1])),
+        prototypes[rng.integers(len(prototypes), size=200)]
+        + 0.3 * prototypes[rng.integers(len(prototypes), size=200)]
+        + 0.2 * rng.standard_normal((200, prototypes.shape[1])),
+    ]).astype(np.float32)
+
+    results = semantic.classify_embeddings(embeddings)
+    for result, embedding in zip(results, embeddings):
+        assert_same(result, legacy_classify_embedding(semantic.scenario_embeddings, embedding))
+        assert_same(semantic.classify_embedding(embedding), result)
+
+
+def test_ties_keep_scenario_order(fake_encoder, monkeypatch):
+    examples = {
+        "first": ["Hola", "Buenas"],
+        "second": ["Adiós"],
+        "third": ["Hola", "Buenas"],
+        "fourth": ["Gracias"],
+    }
+    monkeypatch.setattr(SemanticClassifier, 'SCENARIO_EXAMPLES', examples)
+    semantic = SemanticClassifier()
+
+    # Exactly as similar to "first" and "third"
+    embeddings = np.stack([
+        semantic.scenario_embeddings["first"],
+        semantic.scenario_embeddings["first"] + semantic.scenario_embeddings["second"],
+    ]).astype(np.float32)
+    results = semantic.classify_embeddings(embeddings)
+
+    assert results[0].scenario == "first"
+    assert results[0].secondary_scenarios[0][0] == "third"
+    for result, embedding in zip(results, embeddings):
+        assert_same(result, legacy_classify_embedding(semantic.scenario_embeddings, embedding))
+
+
+def test_classify_encodes_text(fake_encoder):
+    semantic = SemanticClassifier()
+    texts = ["Hola, ¿qué tal?", "Lo siento mucho."]
+    for result, text in zip(semantic.classify_batch(texts), texts):
+        assert_same(result, semantic.classify(text))
+
+
+def test_cache_names_per_backend(fake_encoder):
+    assert set(BACKEND_CACHE_SUFFIXES) == set(BACKENDS)
+    assert len(set(BACKEND_CACHE_SUFFIXES.values())) == len(BACKENDS)
+    assert SemanticClassifier(model_name="some/model").cache_name == "some/model"
@@ -0,0 +1,106 @@
+"""Tests for charset detection and the SRT scanner."""
+
+import codecs
+from datetime import timedelta
+
+import pytest
+import srt
+
+from dialog_extractor import SubtitleParser
+from srt_scanner import (
+    SrtBuffer, SrtParseError, detect_encoding, format_srt_timestamp, parse_srt_timestamp
+)
+from synthetic_corpus import generate_corpus
+
+SPANISH = "1\n00:00:01,000 --> 00:00:02,500\n¿Qué pasa, niño?\n\n2\n00:00:03,000 --> 00:00:04,000\n¡Olé!\n"
+CURLY = "1\n00:00:01,000 --> 00:00:02,500\n“Vale”… cuesta 5 €\n"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (codecs.BOM_UTF8 + SPANISH.encode('utf-8'), 'utf-8-sig'),
+    (SPANISH.encode('utf-16'), 'utf-16'),
+    (codecs.BOM_UTF16_BE + SPANISH.encode('utf-16-be'), 'utf-16'),
+    (SPANISH.encode('utf-8'), 'utf-8'),
+    (b"1\n00:00:01,000 --> 00:00:02,000\nHola\n", 'utf-8'),
+    (CURLY.encode('cp1252'), 'cp1252'),
+    (SPANISH.encode('latin-1'), 'latin-1'),
+    # 0x81 is undefined in cp1252
+    (b"Caf\xe9 \x81", 'latin-1'),
+])
+def test_detect_encoding(raw, expected):
+    assert detect_encoding(raw) == expected
+
+
+def test_detect_encoding_decodes_back():
+    for encoding in ('utf-8-sig', 'utf-16', 'utf-8', 'cp1252'):
+        raw = CURLY.encode(encoding)
+        assert str(raw, detect_encoding(raw)) == CURLY
+
+
+@pytest.mark.parametrize("encoding", ['utf-8', 'utf-8-sig', 'cp1252', 'latin-1', 'utf-16'])
+@pytest.mark.parametrize("newline", ['\n', '\r\n'])
+def test_parse_srt_file_any_encoding(tmp_path, config, write_config, encoding, newline):
+    path = tmp_path / "film.srt"
+    path.write_bytes(SPANISH.replace('\n', newline).encode(encoding))
+
+    subtitles = SubtitleParser(write_config(config)).parse_srt_file(str(path))
+    assert [s.content for s in subtitles] == ["¿Qué pasa, niño?", "¡Olé!"]
+    assert [s.start.total_seconds() for s in subtitles] == [1.0, 3.0]
+
+
+def _scanned(data, strict=True):
+    with SrtBuffer(data) as buffer:
+        return [
+            (record.index, record.start_ms, record.end_ms, buffer.text(record))
+            for record in buffer.records(strict)
+        ]
+
+
+def _parsed(text):
+    return [
+        (s.index, s.start // timedelta(milliseconds=1), s.end // timedelta(milliseconds=1),
+         s.content.replace('\r\n', '\n'))
+        for s in srt.parse(text)
+    ]
+
+
+def test_records_match_srt_library(tmp_path):
+    paths = generate_corpus(str(tmp_path), num_files=10, cues_per_file=60, seed=11)
+    for path in paths:
+        raw = open(path, 'rb').read()
+        text = str(raw, detect_encoding(raw))
+        assert _scanned(raw) == _parsed(text), path
+
+        with SrtBuffer.open(path) as buffer:
+            assert len(list(buffer.records())) == len(_parsed(text))
+
+
+@pytest.mark.parametrize("text", [
+    # Blank line inside a cue's text
+    "1\n00:00:01,000 --> 00:00:02,000\nUno\n\nsigue\n\n2\n00:00:03,000 --> 00:00:04,000\nDos\n",
+    # Missing blank line between blocks
+    "1\n00:00:01,000 --> 00:00:02,000\nUno\n2\n00:00:03,000 --> 00:00:04,000\nDos\n",
+    # '.' as millisecond separator, no index, trailing position info
+    "00:00:01.5 --> 00:00:02.250 X1:10\nUno\n",
+    # Leading whitespace and no final newline
+    "\n\n1\n00:00:01,000 --> 00:00:02,000\nUno",
+    # Bare CR line endings
+    "1\r00:00:01,000 --> 00:00:02,000\rUno\r\r2\r00:00:03,000 --> 00:00:04,000\rDos\r",
+])
+def test_edge_cases_match_srt_library(text):
+    assert _scanned(text.encode('utf-8')) == _parsed(text.replace('\r', '\n'))
+
+
+def test_unparseable_data():
+    data = b"basura\n\n1\n00:00:01,000 --> 00:00:02,000\nUno\n"
+    with pytest.raises(SrtParseError):
+        _scanned(data)
+    with pytest.raises(srt.SRTParseError):
+        _parsed(data.decode('utf-8'))
+    assert _scanned(data, strict=False) == [(1, 1000, 2000, "Uno")]
+
+
+def test_timestamps_round_trip():
+    for ms in (0, 5, 61234, 3600000 + 59999, 100 * 3600000):
+        assert parse_srt_timestamp(format_srt_timestamp(ms)) == ms
+    assert parse_srt_timestamp("00:01:02.5") == 62005
@@ -0,0 +1,66 @@
+"""Tests for the distilled static embedding backend."""
+
+import json
+
+import numpy as np
+import pytest
+
+from static_embeddings import StaticEmbeddingEncoder, build_vocabulary, tokenize
+
+EXAMPLES = {
+    "greetings": ["¡Hola! ¿Cómo estás?", "Buenos días"],
+    "apologies": ["Lo siento mucho", "Perdona"],
+}
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / "unique_dialogs.jsonl"
+    texts = ["Hola, nen.", "Hola, ¿qué tal?", "Lo siento, nen.", "Adiós."] * 3
+    path.write_text(''.join(json.dumps({"text": t}) + '\n' for t in texts), encoding='utf-8')
+    return str(path)
+
+
+def _load(tmp_path, corpus_file, **settings):
+    return StaticEmbeddingEncoder.load_or_distill(
+        "fake-model", EXAMPLES, str(tmp_path / "static"), corpus_file=corpus_file, **settings
+    )
+
+
+def test_build_vocabulary():
+    vocabulary = build_vocabulary(["a b b c c c", "c d"], vocab_size=2, min_count=2, required=["z"])
+    assert vocabulary == {"c": 4, "b": 2, "z": 1}
+    assert tokenize("¿Qué TAL, nen?") == ["qué", "tal", "nen"]
+
+
+def test_encode_is_weighted_word_mean(tmp_path, corpus_file, fake_encoder):
+    encoder = _load(tmp_path, corpus_file)
+    embeddings = encoder.encode(["Hola nen", "", "palabras desconocidas"])
+
+    ids = [encoder.word_ids["hola"], encoder.word_ids["nen"]]
+    expected = encoder.weighted_vectors[ids].sum(axis=0) / encoder.weights[ids].sum()
+    np.testing.assert_allclose(embeddings[0], expected, rtol=1e-6)
+    assert not embeddings[1:].any()
+    assert set(encoder.scenario_prototypes) == set(EXAMPLES)
+
+
+def test_table_reused_only_with_same_settings(tmp_path, corpus_file, fake_encoder):
+    _load(tmp_path, corpus_file, vocab_size=50, min_count=2)
+    meta = json.loads((tmp_path / "static" / "fake-model" / "meta.json").read_text())
+    assert meta['settings'] == {"corpus_file": corpus_file, "vocab_size": 50, "min_count": 2}
+
+    fake_encoder.clear()
+    _load(tmp_path, corpus_file, vocab_size=50, min_count=2)
+    assert fake_encoder == []
+
+    fake_encoder.clear()
+    assert "adiós" in _load(tmp_path, corpus_file, vocab_size=50, min_count=1).word_ids
+    assert fake_encoder != []
+
+    fake_encoder.clear()
+    assert "adiós" not in _load(tmp_path, corpus_file, vocab_size=3, min_count=1).word_ids
+    assert fake_encoder != []
+
+    fake_encoder.clear()
+    _load(tmp_path, None, vocab_size=3, min_count=1)
+    assert fake_encoder != []
@@ -0,0 +1,58 @@
+"""Tests for the synthetic SRT corpus and the extraction benchmark's comparison."""
+
+import codecs
+from pathlib import Path
+
+import srt
+
+from bench_extraction import compare_results
+from dialog_extractor import SubtitleParser
+from synthetic_corpus import ENCODINGS, generate_corpus
+
+
+def test_same_seed_same_files(tmp_path):
+    first = generate_corpus(str(tmp_path / "a"), num_files=6, cues_per_file=40, seed=3)
+    second = generate_corpus(str(tmp_path / "b"), num_files=6, cues_per_file=40, seed=3)
+    other = generate_corpus(str(tmp_path / "c"), num_files=6, cues_per_file=40, seed=4)
+
+    assert [Path(p).name for p in first] == [Path(p).name for p in second]
+    assert [Path(p).read_bytes() for p in first] == [Path(p).read_bytes() for p in second]
+    assert [Path(p).read_bytes() for p in first] != [Path(p).read_bytes() for p in other]
+
+
+def test_files_parse_in_their_encodings(tmp_path):
+    paths = generate_corpus(str(tmp_path), num_files=10, cues_per_file=80, seed=0)
+    assert len(paths) == 10 and paths == sorted(paths)
+
+    parser = SubtitleParser()
+    encodings = set()
+    for path in paths:
+        raw = Path(path).read_bytes()
+        # Files rotate through the encodings by the number ending their name
+        file_number = int(Path(path).stem.rsplit('_', 1)[1]) - 100000
+        encoding = ENCODINGS[file_number % len(ENCODINGS)]
+        encodings.add(encoding)
+        if encoding in ('utf-8-sig', 'utf-16'):
+            assert raw.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE))
+
+        expected = list(srt.parse(raw.decode(encoding)))
+        # Each file varies by +/-25% around cues_per_file
+        assert 60 <= len(expected) <= 100
+        parsed = parser.parse_srt_file(path)
+        assert [(s.start, s.end, s.content) for s in parsed] == \
+               [(s.start, s.end, s.content) for s in expected]
+    assert encodings == set(ENCODINGS)
+
+
+def test_compare_results_counts_regressions():
+    def results(cues_per_sec, peak_rss_mb):
+        return {"stages": {
+            "scan": {"cues_per_sec": cues_per_sec, "peak_rss_mb": peak_rss_mb},
+            "extract": {"cues_per_sec": 100.0, "peak_rss_mb": 50.0},
+        }}
+
+    baseline = results(1000.0, 40.0)
+    assert compare_results(results(950.0, 45.0), baseline, tolerance=0.1) == 0
+    assert compare_results(results(850.0, 40.0), baseline, tolerance=0.1) == 1
+    # Stages missing from the baseline are skipped
+    assert compare_results(results(10.0, 40.0), {"stages": {}}, tolerance=0.1) == 0
@@ -0,0 +1,93 @@
+"""Tests for time-window context lookup."""
+
+import random
+from datetime import timedelta
+
+import pytest
+import srt
+
+from dialog_extractor import SubtitleParser, TimeWindowIndex
+
+ONE_MS = timedelta(milliseconds=1)
+LINES = ["¿Qué haces aquí, nen?", "Mi madre está en casa.", "Vale.", "[MÚSICA]",
+         "<i>Ostras, qué frío hace.</i>", "- ¿Quedamos mañana?\n- Sí, claro."]
+
+
+def random_srt(path, seed, num_cues=200):
+    """An SRT file with random durations and gaps, some cues cleaning to nothing."""
+    rng = random.Random(seed)
+    subtitles = []
+    time_ms = rng.randint(1000, 60000)
+    for index in range(1, num_cues + 1):
+        start = time_ms
+        end = start + rng.randint(700, 5000)
+        time_ms = end + rng.choice([40, 120, 300, 800, 1500, 2500, 6000])
+        subtitles.append(srt.Subtitle(index, start * ONE_MS, end * ONE_MS, rng.choice(LINES)))
+    path.write_text(''.join(s.to_srt() for s in subtitles), encoding='utf-8')
+    return str(path)
+
+
+def brute_force(starts, ends, window_start, window_end):
+    return [q for q in range(len(starts)) if starts[q] <= window_end and ends[q] >= window_start]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlapping_matches_brute_force(seed):
+    rng = random.Random(seed)
+    starts = sorted(rng.randint(0, 100000) for _ in range(300))
+    # Mostly short subtitles, a few long ones spanning many others
+    ends = [s + (rng.randint(10000, 40000) if rng.random() < 0.05 else rng.randint(0, 3000))
+            for s in starts]
+    index = TimeWindowIndex(starts, ends)
+
+    for _ in range(500):
+        window_start = rng.randint(-5000, 105000)
+        window_end = window_start + rng.randint(0, 15000)
+        lo, hi, positions = index.overlapping(window_start, window_end)
+        expected = brute_force(starts, ends, window_start, window_end)
+
+        assert positions == expected
+        assert all(lo <= q < hi for q in positions)
+        if len(positions) == hi - lo:
+            assert positions == list(range(lo, hi))
+
+
+def test_empty_index():
+    assert TimeWindowIndex([], []).overlapping(0, 1000) == (0, 0, [])
+
+
+def test_time_context_matches_brute_force(tmp_path, config, write_config):
+    config['processing']['context_mode'] = 'time'
+    config['processing']['context_window_seconds'] = 4
+    parser = SubtitleParser(write_config(config))
+    window_ms = 4000
+
+    for path in [random_srt(tmp_path / f"Pelicula_2001_{seed}.srt", seed) for seed in range(3)]:
+        subtitles = parser.parse_srt_file(path)
+        # Overlapping cues and one long cue out of start-time order
+        subtitles[5].end = subtitles[40].end
+        subtitles[10].start, subtitles[11].start = subtitles[11].start, subtitles[10].start
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(s.to_srt() for s in subtitles))
+
+        subtitles = parser.parse_srt_file(path)
+        ms = [(s.start // ONE_MS, s.end // ONE_MS) for s in subtitles]
+        order = sorted(range(len(subtitles)), key=lambda k: ms[k][0])
+        texts = [parser.clean_text(s.content) for s in subtitles]
+
+        dialogs = iter(parser.extract_dialogs(path))
+        for i, (start, end) in enumerate(ms):
+            if not parser.is_valid_dialog(texts[i]):
+                continue
+            window = [
+                k for k in order
+                if ms[k][0] <= end + window_ms and ms[k][1] >= start - window_ms
+            ]
+            p = window.index(i)
+
+            dialog = next(dialogs)
+            assert dialog.text == texts[i]
+            assert dialog.context_before == [texts[k] for k in window[:p] if texts[k]]
+            assert dialog.context_after == [texts[k] for k in window[p + 1:] if texts[k]]
+
+        assert next(dialogs, None) is None